@@ -1,11 +1,18 @@
-import pymel.core as pm
-from pymel.core import datatypes
-from pymel import util as pmu
-
-
 import mgear
-from mgear.core import icon, applyop, node, transform
-from mgear.core import primitive, meshNavigation, string
+from mgear.rigbits import lazy, profiler
+
+# PyMEL and the mgear.core modules are imported on the first helper call,
+# so the tool submodules, i.e: rigbits.lazy, can be imported without PyMEL
+pm = lazy.LazyModule("pymel.core")
+datatypes = lazy.LazyModule("pymel.core.datatypes")
+pmu = lazy.LazyModule("pymel.util")
+icon = lazy.LazyModule("mgear.core.icon")
+applyop = lazy.LazyModule("mgear.core.applyop")
+node = lazy.LazyModule("mgear.core.node")
+transform = lazy.LazyModule("mgear.core.transform")
+primitive = lazy.LazyModule("mgear.core.primitive")
+meshNavigation = lazy.LazyModule("mgear.core.meshNavigation")
+string = lazy.LazyModule("mgear.core.string")
 
 
 def addNPO(objs=None, *args):
@@ -273,6 +280,7 @@ def alignToPointsLoop(points=None, loc=None, name=None, *args):
     loc.setTransformation(trans)
 
 
+@profiler.profiled()
 def connectWorldTransform(source, target):
     """Connect the source world transform of one object to another object.
 
@@ -433,6 +441,7 @@ def matchPosfromBBox(*args):
 # Gimmicks
 #######################################
 
+@profiler.profiled()
 def spaceJump(ref=None, space=None, *args):
     """Space Jump gimmick
 
@@ -516,6 +525,7 @@ def createInterpolateTransform(objects=None, blend=.5, *args):
     return intTrans
 
 
+@profiler.profiled()
 def addBlendedJoint(oSel=None,
                     compScale=True,
                     blend=.5,
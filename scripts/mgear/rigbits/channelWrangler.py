@@ -3,10 +3,12 @@
 import json
 
 import pymel.core as pm
+import maya.cmds as cmds
 from maya.app.general.mayaMixin import MayaQWidgetDockableMixin
 from mgear.vendor.Qt import QtWidgets, QtCore
 
 import mgear.rigbits.channelWranglerUI as channelWranglerUI
+import mgear.rigbits.channelWranglerPlan as channelWranglerPlan
 from mgear.core import attribute, pyqt
 
 
@@ -15,40 +17,215 @@ from mgear.core import attribute, pyqt
 ######################################################################
 
 
-# apply the channel configuration from a dictionary
-def _applyChannelConfig(configDic):
-    tableMap = configDic["map"]
-    movePolicy = configDic["movePolicy"]
-    proxyPolicy = configDic["proxyPolicy"]
-    for rule in tableMap:
-        attr = rule[0]
-        sourceNode = rule[1]
-        targetNode = rule[2]
-        option = rule[3]
-        # proxy
-        if option:
-            node = pm.PyNode(sourceNode)
-            sourceAttrs = node.attr(attr)
-            target = pm.PyNode(targetNode)
-            attribute.addProxyAttribute(sourceAttrs, target, proxyPolicy)
-        # move
+# channel types rebuilt by the channel wrangler, the other types are moved
+# with attribute.moveChannel
+_CHANNEL_TYPES = ("bool",
+                  "long",
+                  "short",
+                  "byte",
+                  "enum",
+                  "float",
+                  "double",
+                  "doubleAngle",
+                  "doubleLinear")
+
+# addAttr flag, attributeQuery exists flag, attributeQuery value flag
+_CHANNEL_LIMITS = (("minValue", "minExists", "minimum"),
+                   ("maxValue", "maxExists", "maximum"),
+                   ("softMinValue", "softMinExists", "softMin"),
+                   ("softMaxValue", "softMaxExists", "softMax"))
+
+
+def _queryChannel(node, attr):
+    """Return the data to rebuild the channel, None if the type is not
+    supported"""
+    attrType = cmds.attributeQuery(attr, node=node, attributeType=True)
+    if (attrType not in _CHANNEL_TYPES
+            or cmds.attributeQuery(attr, node=node, multi=True)):
+        return None
+    plug = "{}.{}".format(node, attr)
+    info = {"attributeType": attrType,
+            "niceName": cmds.attributeQuery(attr, node=node, niceName=True),
+            "keyable": cmds.getAttr(plug, keyable=True),
+            "channelBox": cmds.getAttr(plug, channelBox=True),
+            "lock": cmds.getAttr(plug, lock=True),
+            "value": cmds.getAttr(plug),
+            "defaultValue": cmds.attributeQuery(attr,
+                                                node=node,
+                                                listDefault=True)[0]}
+    if attrType == "enum":
+        info["enumName"] = cmds.attributeQuery(attr,
+                                               node=node,
+                                               listEnum=True)[0]
+    else:
+        for flag, exists, query in _CHANNEL_LIMITS:
+            if cmds.attributeQuery(attr, node=node, **{exists: True}):
+                info[flag] = cmds.attributeQuery(attr,
+                                                 node=node,
+                                                 **{query: True})[0]
+    return info
+
+
+def _addChannel(node, name, info, niceName=True):
+    """Add the channel from the data of _queryChannel"""
+    kwargs = {"longName": name,
+              "attributeType": info["attributeType"],
+              "defaultValue": info["defaultValue"],
+              "keyable": info["keyable"]}
+    if niceName:
+        kwargs["niceName"] = info["niceName"]
+    for flag in ("enumName",) + tuple(f for f, _, _ in _CHANNEL_LIMITS):
+        if flag in info:
+            kwargs[flag] = info[flag]
+    cmds.addAttr(node, **kwargs)
+    plug = "{}.{}".format(node, name)
+    if not info["keyable"]:
+        cmds.setAttr(plug, channelBox=info["channelBox"])
+    cmds.setAttr(plug, info["value"])
+    return plug
+
+
+def _nodeConnections(node):
+    """Return the input and the output plugs of the node channels
+
+    Returns:
+        dict, dict: channel name -> source plug, channel name -> list of
+            destination plugs
+    """
+    inputs = {}
+    outputs = {}
+    for source, connections in ((True, inputs), (False, outputs)):
+        cnx = cmds.listConnections(node,
+                                   source=source,
+                                   destination=not source,
+                                   connections=True,
+                                   plugs=True) or []
+        for plug, other in zip(cnx[::2], cnx[1::2]):
+            connections.setdefault(plug.split(".", 1)[1], []).append(other)
+    return inputs, outputs
+
+
+def _applyChannelBatch(batch, movePolicy):
+    """Apply a batch of resolved steps
+
+    The channels data and the connections are queried once per source node
+    before any change, then the channels are created, rewired and the moved
+    channels deleted.
+    """
+    # Read
+    connections = {}
+    infos = {}
+    names = {}
+    for step in batch:
+        source = step["source"]
+        attr = step["attr"]
+        if step["op"] == channelWranglerPlan.PROXY:
+            continue
+        if source not in connections:
+            connections[source] = _nodeConnections(source)
+        if step["op"] == channelWranglerPlan.MOVE:
+            infos[id(step)] = _queryChannel(source, attr)
+        # the connections can be listed with the short name
+        names[id(step)] = set([attr, cmds.attributeQuery(attr,
+                                                         node=source,
+                                                         shortName=True)])
+
+    # Edit
+    for step in batch:
+        attr = step["attr"]
+        source = step["source"]
+        sourcePlug = "{}.{}".format(source, attr)
+        targetPlug = "{}.{}".format(step["target"], step["name"])
+        if step["op"] == channelWranglerPlan.PROXY:
+            cmds.addAttr(step["target"], longName=step["name"],
+                         proxy=sourcePlug)
+            continue
+
+        info = infos.get(id(step))
+        if step["op"] == channelWranglerPlan.MOVE and info is None:
+            # not supported type
+            attribute.moveChannel(attr, source, step["target"], movePolicy)
+            continue
+        if step["op"] == channelWranglerPlan.MOVE:
+            _addChannel(step["target"], step["name"], info,
+                        niceName=step["name"] == attr)
+        inputs, outputs = connections[source]
+        for name in names[id(step)]:
+            for plug in outputs.get(name, []):
+                cmds.connectAttr(targetPlug, plug, force=True)
+            if step["op"] == channelWranglerPlan.MOVE:
+                for plug in inputs.get(name, []):
+                    cmds.connectAttr(plug, targetPlug, force=True)
+        if info and info["lock"]:
+            cmds.setAttr(targetPlug, lock=True)
+        cmds.setAttr(sourcePlug, lock=False)
+        cmds.deleteAttr(sourcePlug)
+
+
+def _applyChannelPlan(plan):
+    """Apply the steps of a channel plan
+
+    The nodes channels are queried once per node and the steps are resolved
+    before changing the scene, tracking the channels renamed by the
+    duplicated name policies. The steps are applied in batches, the channels
+    data and the connections of each batch are queried once per node. The
+    plan is applied in one undo chunk.
+
+    Like attribute.moveChannel, the steps with a node or a channel not in
+    the scene don't stop the apply: they are skipped with a warning naming
+    the rule. The steps with a channel that can't be added to the target
+    are skipped too.
+
+    Args:
+        plan (ChannelPlan): The plan to apply
+    """
+    for error in plan.errors:
+        pm.displayWarning(error)
+
+    channels = {}
+    for nodeName in plan.nodes:
+        if cmds.objExists(nodeName):
+            channels[nodeName] = set(cmds.listAttr(nodeName) or [])
         else:
-            attribute.moveChannel(attr, sourceNode, targetNode, movePolicy)
+            pm.displayWarning("{} not found in the scene".format(nodeName))
+    batches, warnings = channelWranglerPlan.resolvePlan(plan, channels)
+    for warning in warnings:
+        pm.displayWarning(warning)
+
+    cmds.undoInfo(openChunk=True, chunkName="channelWrangler")
+    try:
+        for batch in batches:
+            _applyChannelBatch(batch, plan.movePolicy)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+
+# apply the channel configuration from a dictionary
+def _applyChannelConfig(configDic, dryRun=False):
+    plan = channelWranglerPlan.planChannelConfig(configDic)
+    if dryRun:
+        return plan
+    _applyChannelPlan(plan)
 
 # apply the configuration stored in a  json file. This will be to use outside
 # the interface
 
 
-def applyChannelConfig(filePath):
+def applyChannelConfig(filePath, dryRun=False):
     """Apply the configuration stored in a  json file.
 
     This will be to use outside the interface
 
     Args:
         filePath (str): Path to the  channel wrangler configuration file
+        dryRun (bool, optional): If True will return the plan without
+            changing the scene
+
+    Returns:
+        ChannelPlan: The plan if dryRun is True
     """
     configDict = json.load(open(filePath))
-    _applyChannelConfig(configDict)
+    return _applyChannelConfig(configDict, dryRun)
 
 
 ######################################################################
@@ -411,24 +588,7 @@ class channelWrangler(MayaQWidgetDockableMixin, QtWidgets.QDialog):
     def applyChannelConfig(self):
         with pm.UndoChunk():
             configDict = self._buildConfigDict()
-            # TODO add checker to avoid error if the datas is not
-            # found in the scene
-            for rule in configDict["map"]:
-                # proxy
-                if rule[3]:
-                    source = pm.PyNode("{}.{}".format(rule[1], rule[0]))
-                    target = pm.PyNode(rule[2])
-                    attribute.addProxyAttribute(source,
-                                                target,
-                                                configDict["proxyPolicy"])
-                # move
-                else:
-                    source = pm.PyNode(rule[1])
-                    target = pm.PyNode(rule[2])
-                    attribute.moveChannel(rule[0],
-                                          source,
-                                          target,
-                                          configDict["movePolicy"])
+            _applyChannelConfig(configDict)
 
     def _setOperator(self, operator):
         """set the channel wrangle operator
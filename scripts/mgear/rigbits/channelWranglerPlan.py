@@ -0,0 +1,266 @@
+"""Channel wrangler configuration planner
+
+Validate a channel wrangler configuration and compute the plan of the
+operations to apply. The planner doesn't use Maya, so the configurations
+can be validated outside Maya.
+
+The configuration is a dictionary with the "movePolicy", "proxyPolicy" and
+"map" keys. Each rule of the map is [channel, source, target, option], where
+option 0 is move and 1 is proxy.
+
+Example:
+    >>> from mgear.rigbits import channelWranglerPlan
+    >>> plan = channelWranglerPlan.planChannelConfig(
+    ...     {"movePolicy": "merge",
+    ...      "proxyPolicy": "index",
+    ...      "map": [["shoulder_ik", "armUI_R0_ctl", "armUI_L0_ctl", 0]]})
+    >>> plan.steps[0]["op"]
+    'move'
+"""
+
+import json
+
+MOVE = "move"
+PROXY = "proxy"
+# move to a channel already in the target, with the merge policy
+MERGE = "merge"
+
+MOVE_POLICIES = ("merge", "index", "fullName")
+PROXY_POLICIES = ("index", "fullName")
+
+try:
+    _string_types = (str, unicode)
+except NameError:
+    _string_types = (str,)
+
+
+class ChannelPlan(object):
+    """The operations to apply a channel configuration
+
+    Attributes:
+        movePolicy (str): The move duplicated name policy
+        proxyPolicy (str): The proxy duplicated name policy
+        steps (list of dict): The operations in apply order. Each step has
+            the "op", "attr", "source", "target" and "rule" keys. "rule" is
+            the index of the rule in the map
+        nodes (dict): node name -> indices of the steps using the node
+        errors (list of str): The invalid rules, not added to the steps
+        warnings (list of str): The redirected or ignored rules
+    """
+
+    def __init__(self, movePolicy="merge", proxyPolicy="index"):
+        self.movePolicy = movePolicy
+        self.proxyPolicy = proxyPolicy
+        self.steps = []
+        self.nodes = {}
+        self.errors = []
+        self.warnings = []
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def addStep(self, op, attr, source, target, rule):
+        index = len(self.steps)
+        self.steps.append({"op": op,
+                           "attr": attr,
+                           "source": source,
+                           "target": target,
+                           "rule": rule})
+        for node in (source, target):
+            self.nodes.setdefault(node, []).append(index)
+
+    def asDict(self):
+        return {"movePolicy": self.movePolicy,
+                "proxyPolicy": self.proxyPolicy,
+                "steps": self.steps,
+                "nodes": self.nodes,
+                "errors": self.errors,
+                "warnings": self.warnings}
+
+    def toJson(self, indent=4):
+        return json.dumps(self.asDict(), indent=indent, sort_keys=True)
+
+
+def _ruleError(i, rule):
+    if not isinstance(rule, (list, tuple)) or len(rule) != 4:
+        return "Rule {}: expected [channel, source, target, option]".format(i)
+    attr, source, target, option = rule
+    for label, value in (("channel", attr),
+                         ("source", source),
+                         ("target", target)):
+        if not value or not isinstance(value, _string_types):
+            return "Rule {}: invalid {}: {!r}".format(i, label, value)
+    if option not in (0, 1):
+        return "Rule {}: invalid option: {!r}".format(i, option)
+    if source == target:
+        return "Rule {}: source and target are the same node: {}".format(
+            i, source)
+    return None
+
+
+def planChannelConfig(configDic):
+    """Compute the plan to apply a channel configuration
+
+    The invalid rules are reported as errors and the duplicated rules are
+    ignored. With the merge move policy, the rules using a channel already
+    moved by a previous rule are redirected to the node where the channel
+    was moved, so the channel is not looked up in the old node. With the
+    other policies the moved channel can be renamed, so these rules are
+    only reported as warnings.
+
+    Args:
+        configDic (dict): The channel configuration
+
+    Returns:
+        ChannelPlan: The plan
+    """
+    plan = ChannelPlan(configDic.get("movePolicy", "merge"),
+                       configDic.get("proxyPolicy", "index"))
+    if plan.movePolicy not in MOVE_POLICIES:
+        plan.errors.append("Invalid move policy: {}".format(plan.movePolicy))
+    if plan.proxyPolicy not in PROXY_POLICIES:
+        plan.errors.append("Invalid proxy policy: {}".format(
+            plan.proxyPolicy))
+
+    # (node, channel) -> node where the channel was moved
+    moved = {}
+    seen = set()
+    for i, rule in enumerate(configDic.get("map", [])):
+        error = _ruleError(i, rule)
+        if error:
+            plan.errors.append(error)
+            continue
+        attr, source, target, option = rule
+        key = (attr, source, target, option)
+        if key in seen:
+            plan.warnings.append("Rule {}: duplicated rule ignored".format(i))
+            continue
+        seen.add(key)
+
+        current = source
+        while (current, attr) in moved:
+            current = moved[(current, attr)]
+        if current != source and plan.movePolicy != "merge":
+            plan.warnings.append(
+                "Rule {}: {}.{} was moved by a previous rule".format(
+                    i, source, attr))
+            current = source
+        elif current != source:
+            plan.warnings.append(
+                "Rule {}: {}.{} was moved to {}".format(i,
+                                                        source,
+                                                        attr,
+                                                        current))
+            if current == target:
+                plan.warnings.append(
+                    "Rule {}: channel already in the target, "
+                    "rule ignored".format(i))
+                continue
+
+        if option:
+            plan.addStep(PROXY, attr, current, target, i)
+        else:
+            plan.addStep(MOVE, attr, current, target, i)
+            moved[(current, attr)] = target
+            # the channel is in the target now
+            moved.pop((target, attr), None)
+
+    return plan
+
+
+def _targetName(attr, source, target, policy, channels):
+    """Return the channel name in the target, None if can't be added"""
+    if attr not in channels[target]:
+        return attr
+    if policy == "index":
+        i = 0
+        while "{}{}".format(attr, i) in channels[target]:
+            i += 1
+        return "{}{}".format(attr, i)
+    if policy == "fullName":
+        name = "{}_{}".format(source.split("|")[-1], attr)
+        if name not in channels[target]:
+            return name
+    return None
+
+
+def resolvePlan(plan, channels):
+    """Resolve the plan steps against the channels of the nodes
+
+    The channel names in the targets are resolved with the duplicated name
+    policies, and the channels of the nodes are updated with each step, so
+    the renamed channels are tracked. The steps are grouped in batches. The
+    steps of a batch don't use the channels created or removed by the other
+    steps of the same batch, so each batch can be queried and applied at
+    once.
+
+    Each resolved step has the "op", "attr", "source", "target", "name" and
+    "rule" keys. "name" is the channel name in the target. The op is MERGE
+    for the moves to a channel already in the target, with the merge policy.
+
+    Args:
+        plan (ChannelPlan): The plan
+        channels (dict): node name -> set of the node channels names. The
+            sets are updated with the resolved steps. The steps using a node
+            not in the dictionary are skipped
+
+    Returns:
+        list of list of dict, list of str: The batches of resolved steps
+            and the warnings of the skipped steps
+    """
+    batches = []
+    warnings = []
+    batch = []
+    # (node, channel) created or removed by the current batch
+    changed = set()
+    for step in plan.steps:
+        attr = step["attr"]
+        source = step["source"]
+        target = step["target"]
+        missing = [n for n in (source, target) if n not in channels]
+        if missing:
+            warnings.append("Rule {}: {} not found, rule skipped".format(
+                step["rule"], ", ".join(missing)))
+            continue
+        if attr not in channels[source]:
+            warnings.append("Rule {}: {}.{} not found".format(step["rule"],
+                                                             source,
+                                                             attr))
+            continue
+
+        if step["op"] == PROXY:
+            op = PROXY
+            name = _targetName(attr, source, target, plan.proxyPolicy,
+                               channels)
+        elif attr in channels[target] and plan.movePolicy == "merge":
+            op = MERGE
+            name = attr
+        else:
+            op = MOVE
+            name = _targetName(attr, source, target, plan.movePolicy,
+                               channels)
+        if name is None:
+            warnings.append("Rule {}: {}.{} already exists".format(
+                step["rule"], target, attr))
+            continue
+
+        if (source, attr) in changed or (target, name) in changed:
+            batches.append(batch)
+            batch = []
+            changed = set()
+        batch.append({"op": op,
+                      "attr": attr,
+                      "source": source,
+                      "target": target,
+                      "name": name,
+                      "rule": step["rule"]})
+        channels[target].add(name)
+        changed.add((target, name))
+        if op != PROXY:
+            channels[source].discard(attr)
+            changed.add((source, attr))
+
+    if batch:
+        batches.append(batch)
+    return batches, warnings
@@ -0,0 +1,722 @@
+"""Rigbits utilities without PyMEL
+
+maya.cmds and OpenMaya 2.0 implementation of the rigbits core utilities.
+The functions have the same signatures than the rigbits functions but work
+with the nodes names and return names. This avoid the PyMEL node wrapping
+cost in bulk pipeline scripts.
+
+The batch variants take lists of objects and apply all the edits with one
+modifier.
+
+Example::
+
+    from mgear.rigbits import cmds_utils
+    npos = cmds_utils.addNPO(["arm_L0_fk0_ctl", "arm_L0_fk1_ctl"])
+"""
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+
+######################################################################
+# Helpers
+######################################################################
+
+def _as_list(objs):
+    if objs is None:
+        return []
+    if isinstance(objs, (list, tuple)):
+        return [str(o) for o in objs]
+    return [str(objs)]
+
+
+def _selected():
+    return cmds.ls(selection=True, long=True) or []
+
+
+def _long_name(name):
+    return cmds.ls(name, long=True)[0]
+
+
+def _short_name(name):
+    return name.split("|")[-1]
+
+
+def _get_plug(name, attr):
+    sel = om2.MSelectionList()
+    sel.add("{}.{}".format(name, attr))
+    return sel.getPlug(0)
+
+
+def _get_dag_paths(names):
+    sel = om2.MSelectionList()
+    for name in names:
+        sel.add(name)
+    return [sel.getDagPath(i) for i in range(sel.length())]
+
+
+def _get_nodes(names):
+    sel = om2.MSelectionList()
+    for name in names:
+        sel.add(name)
+    return [sel.getDependNode(i) for i in range(sel.length())]
+
+
+def _full_path(node):
+    return om2.MFnDagNode(node).fullPathName()
+
+
+def _get_parent(dag_path):
+    parent = om2.MFnDagNode(dag_path).parent(0)
+    if parent.hasFn(om2.MFn.kWorld):
+        return om2.MObject.kNullObj
+    return parent
+
+
+def _createDGNode(mod, typeName):
+    # MDagModifier.createNode only accepts DAG node types
+    return om2.MDGModifier.createNode(mod, typeName)
+
+
+def _setPlugValues(mod, fn_node, attr, values):
+    for axis, value in zip("XYZ", values):
+        mod.newPlugValueDouble(fn_node.findPlug(attr + axis, False), value)
+
+
+def get_set(name):
+    """Return the set, created if doesn't exist
+
+    Args:
+        name (str): The set name
+
+    Returns:
+        str: The set name
+    """
+    if cmds.objExists(name) and cmds.nodeType(name) == "objectSet":
+        return name
+    return cmds.sets(name=name, empty=True)
+
+
+def _connectWorldTransform(source, target):
+    mulmat_node = cmds.createNode("multMatrix")
+    cmds.connectAttr(source + ".worldMatrix[0]", mulmat_node + ".matrixIn[0]")
+    cmds.connectAttr(target + ".parentInverseMatrix[0]",
+                     mulmat_node + ".matrixIn[1]")
+    dm_node = cmds.createNode("decomposeMatrix")
+    cmds.connectAttr(mulmat_node + ".matrixSum", dm_node + ".inputMatrix")
+    cmds.connectAttr(dm_node + ".outputTranslate", target + ".t")
+    cmds.connectAttr(dm_node + ".outputRotate", target + ".r")
+    cmds.connectAttr(dm_node + ".outputScale", target + ".s")
+
+
+######################################################################
+# Core utilities
+######################################################################
+
+def addNPO(objs=None, *args):
+    """Add a transform node as a neutral pose
+
+    Args:
+        objs (None or list of str, optional): The objects. If None will use
+            the current selection
+        *args: Maya's dummy
+
+    Returns:
+        list of str: The NPOs long names
+    """
+    npoList = []
+    objs = _as_list(objs) or _selected()
+    # the long names change when an object of a selected chain is reparented
+    # so the nodes are resolved up front and the names queried when used
+    for node in _get_nodes(objs):
+        obj = _full_path(node)
+        oParent = cmds.listRelatives(obj, parent=True, fullPath=True)
+        kwargs = {"name": _short_name(obj) + "_npo", "skipSelect": True}
+        if oParent:
+            kwargs["parent"] = oParent[0]
+        oTra = _long_name(cmds.createNode("transform", **kwargs))
+        cmds.xform(oTra,
+                   matrix=cmds.xform(obj, q=True, matrix=True, os=True),
+                   os=True)
+        npoList.append(_get_nodes([oTra])[0])
+        cmds.parent(obj, oTra)
+
+    return [_full_path(npo) for npo in npoList]
+
+
+def addJnt(obj=False,
+           parent=False,
+           noReplace=False,
+           grp=None,
+           jntName=None,
+           *args):
+    """Create one joint for each selected object.
+
+    Args:
+        obj (bool or str, optional): The object to drive the new joint. If
+            False will use the current selection.
+        parent (bool or str, optional): The parent for the joint. If False
+            will try to parent to jnt_org. If jnt_org doesn't exist will
+            parent the joint under the obj
+        noReplace (bool, optional): If True will add the extension "_jnt"
+            to the new joint name
+        grp (str or None, optional): The set to add the new joint. If none
+            will use "rig_deformers_grp"
+        jntName (str or None, optional): The joint name
+        *args: Maya's dummy
+
+    Returns:
+        str: The last created joint long name.
+    """
+    oSel = _as_list(obj) if obj else _selected()
+
+    jnt = None
+    defSet = grp or get_set("rig_deformers_grp")
+    for obj in oSel:
+        if parent:
+            oParent = str(parent)
+        elif cmds.objExists("jnt_org"):
+            oParent = "jnt_org"
+        else:
+            oParent = obj
+        name = jntName
+        if not name:
+            if noReplace:
+                name = _short_name(obj) + "_jnt"
+            else:
+                name = "_".join(_short_name(obj).split("_")[:-1]) + "_jnt"
+        jnt = cmds.createNode("joint", name=name, parent=oParent)
+        jnt = _long_name(jnt)
+        cmds.sets(jnt, add=defSet)
+
+        cmds.setAttr(jnt + ".jointOrient", 0, 0, 0)
+        try:
+            _connectWorldTransform(obj, jnt)
+        except RuntimeError:
+            for axis in ["tx", "ty", "tz", "rx", "ry", "rz"]:
+                cmds.setAttr(jnt + "." + axis, 0.0)
+
+    return jnt
+
+
+def connectLocalTransform(objects=None, s=True, r=True, t=True, *args):
+    """Connect scale, rotation and translation.
+
+    All the connections are done with one modifier.
+
+    Args:
+        objects (None or list of str, optional): Source and targets. If None
+            will use the current selection.
+        s (bool, optional): If True will connect the local scale
+        r (bool, optional): If True will connect the local rotation
+        t (bool, optional): If True will connect the local translation
+        *args: Maya's dummy
+    """
+    objects = _as_list(objects) or _selected()
+    if len(objects) < 2:
+        cmds.warning("Please at less select 2 objects. Source + target/s")
+        return
+
+    source = objects[0]
+    attrs = [a for a, v in (("translate", t), ("scale", s), ("rotate", r))
+             if v]
+    mod = om2.MDGModifier()
+    for target in objects[1:]:
+        for attr in attrs:
+            mod.connect(_get_plug(source, attr), _get_plug(target, attr))
+    mod.doIt()
+
+
+def _connectInvertSRT(mod, source, target, srt, axis):
+    for t in srt:
+        mul_node = mod.createNode("multiplyDivide")
+        fn_node = om2.MFnDependencyNode(mul_node)
+        for a, out_a in zip(axis, "XYZ"):
+            mod.connect(_get_plug(source, t + a),
+                        fn_node.findPlug("input1" + out_a, False))
+            mod.newPlugValueDouble(fn_node.findPlug("input2" + out_a, False),
+                                   -1.0)
+            mod.connect(fn_node.findPlug("output" + out_a, False),
+                        _get_plug(target, t + a))
+
+
+def connectInvertSRT(source, target, srt="srt", axis="xyz"):
+    """Connect the local transformations with inverted values.
+
+    Args:
+        source (str): The source driver dagNode
+        target (str): The target driven dagNode
+        srt (string, optional): String value for the scale(s), rotate(r),
+            translation(t). Default value is "srt". Posible values "s", "r",
+            "t" or any combination
+        axis (string, optional):  String value for the axis. Default
+            value is "xyz". Posible values "x", "y", "z" or any combination
+    """
+    connectInvertSRTBatch([(source, target)], srt, axis)
+
+
+def connectInvertSRTBatch(pairs, srt="srt", axis="xyz"):
+    """Connect the local transformations with inverted values.
+
+    All the nodes and connections are done with one modifier.
+
+    Args:
+        pairs (list): (source, target) pairs
+        srt (string, optional): The channels to connect. "s", "r", "t" or
+            any combination
+        axis (string, optional): The axis to connect. "x", "y", "z" or any
+            combination
+    """
+    mod = om2.MDGModifier()
+    for source, target in pairs:
+        _connectInvertSRT(mod, str(source), str(target), srt, axis)
+    mod.doIt()
+
+
+######################################################################
+# Batch NPO and joints
+######################################################################
+
+def addNPOBatch(objs=None):
+    """Add a neutral pose transform to each object
+
+    The local matrices are read in one pass and all the NPOs are created,
+    set and parented with one DAG modifier. The local transformation of
+    each object is moved to the NPO.
+
+    Args:
+        objs (None or list of str, optional): The objects. If None will use
+            the current selection
+
+    Returns:
+        list of str: The NPOs long names
+    """
+    objs = _as_list(objs) or _selected()
+    if not objs:
+        return []
+    dag_paths = _get_dag_paths(objs)
+
+    # Read
+    matrices = []
+    for dag_path in dag_paths:
+        plug = om2.MFnDagNode(dag_path).findPlug("matrix", False)
+        matrices.append(om2.MTransformationMatrix(
+            om2.MFnMatrixData(plug.asMObject()).matrix()))
+
+    # Edit
+    mod = om2.MDagModifier()
+    npos = []
+    for dag_path, matrix in zip(dag_paths, matrices):
+        obj = dag_path.node()
+        npo = mod.createNode("transform", _get_parent(dag_path))
+        mod.renameNode(npo, _short_name(dag_path.partialPathName()) + "_npo")
+        fn_npo = om2.MFnDependencyNode(npo)
+        translation = matrix.translation(om2.MSpace.kTransform)
+        rotation = matrix.rotation()
+        _setPlugValues(mod, fn_npo, "translate",
+                       (translation.x, translation.y, translation.z))
+        _setPlugValues(mod, fn_npo, "rotate",
+                       (rotation.x, rotation.y, rotation.z))
+        _setPlugValues(mod, fn_npo, "scale",
+                       matrix.scale(om2.MSpace.kTransform))
+        for attr, value in zip(("shearXY", "shearXZ", "shearYZ"),
+                               matrix.shear(om2.MSpace.kTransform)):
+            mod.newPlugValueDouble(fn_npo.findPlug(attr, False), value)
+
+        # the object local transformation is now in the NPO
+        fn_obj = om2.MFnDependencyNode(obj)
+        _setPlugValues(mod, fn_obj, "translate", (0.0, 0.0, 0.0))
+        _setPlugValues(mod, fn_obj, "rotate", (0.0, 0.0, 0.0))
+        _setPlugValues(mod, fn_obj, "scale", (1.0, 1.0, 1.0))
+        for attr in ("shearXY", "shearXZ", "shearYZ"):
+            mod.newPlugValueDouble(fn_obj.findPlug(attr, False), 0.0)
+        if obj.hasFn(om2.MFn.kJoint):
+            _setPlugValues(mod, fn_obj, "jointOrient", (0.0, 0.0, 0.0))
+            # like cmds.parent, the joint under the NPO no longer
+            # compensates the parent joint scale
+            inverseScale = fn_obj.findPlug("inverseScale", False)
+            source = inverseScale.source()
+            if not source.isNull:
+                mod.disconnect(source, inverseScale)
+            _setPlugValues(mod, fn_obj, "inverseScale", (1.0, 1.0, 1.0))
+
+        mod.reparentNode(obj, npo)
+        npos.append(npo)
+    mod.doIt()
+
+    return [om2.MFnDagNode(npo).fullPathName() for npo in npos]
+
+
+def addJntBatch(objs=None, parent=None, noReplace=False, grp=None):
+    """Create one joint driven by each object
+
+    All the joints and the matrix nodes are created and connected with one
+    DAG modifier and the joints are added to the set with one sets call.
+
+    Args:
+        objs (None or list of str, optional): The objects to drive the
+            joints. If None will use the current selection
+        parent (None or str, optional): The parent for the joints. If None
+            will try to parent to jnt_org. If jnt_org doesn't exist will
+            parent each joint under the obj
+        noReplace (bool, optional): If True will add the extension "_jnt"
+            to the object name. Else will replace the last name token
+        grp (None or str, optional): The set to add the new joints. If None
+            will use "rig_deformers_grp"
+
+    Returns:
+        list of str: The joints long names
+    """
+    objs = _as_list(objs) or _selected()
+    if not objs:
+        return []
+    dag_paths = _get_dag_paths(objs)
+
+    if not parent and cmds.objExists("jnt_org"):
+        parent = "jnt_org"
+    parent_obj = None
+    if parent:
+        parent_obj = _get_dag_paths([str(parent)])[0].node()
+
+    mod = om2.MDagModifier()
+    fn = om2.MFnDependencyNode
+    jnts = []
+    for dag_path in dag_paths:
+        name = _short_name(dag_path.partialPathName())
+        if noReplace:
+            name = name + "_jnt"
+        else:
+            name = "_".join(name.split("_")[:-1]) + "_jnt"
+        jnt = mod.createNode("joint", parent_obj or dag_path.node())
+        mod.renameNode(jnt, name)
+        fn_jnt = fn(jnt)
+
+        mulmat_node = fn(_createDGNode(mod, "multMatrix"))
+        dm_node = fn(_createDGNode(mod, "decomposeMatrix"))
+        world_matrix = fn(dag_path.node()).findPlug("worldMatrix", False)
+        mod.connect(
+            world_matrix.elementByLogicalIndex(dag_path.instanceNumber()),
+            mulmat_node.findPlug("matrixIn", False).elementByLogicalIndex(0))
+        mod.connect(
+            fn_jnt.findPlug("parentInverseMatrix",
+                            False).elementByLogicalIndex(0),
+            mulmat_node.findPlug("matrixIn", False).elementByLogicalIndex(1))
+        mod.connect(mulmat_node.findPlug("matrixSum", False),
+                    dm_node.findPlug("inputMatrix", False))
+        for out_attr, attr in (("outputTranslate", "translate"),
+                               ("outputRotate", "rotate"),
+                               ("outputScale", "scale")):
+            mod.connect(dm_node.findPlug(out_attr, False),
+                        fn_jnt.findPlug(attr, False))
+        jnts.append(jnt)
+    mod.doIt()
+
+    jnts = [om2.MFnDagNode(jnt).fullPathName() for jnt in jnts]
+    cmds.sets(jnts, add=grp or get_set("rig_deformers_grp"))
+    return jnts
+
+
+def replaceShape(source=None, targets=None, *args):
+    """Replace the shape of one object by another.
+
+    Args:
+        source (None, str): Source object with the original shape.
+        targets (None, list of str): Targets object to apply the source
+            shape.
+        *args: Maya's dummy
+
+    Returns:
+        None: Return None if nothing is selected or the source and targets
+            are None
+    """
+    if not source and not targets:
+        oSel = _selected()
+        if len(oSel) < 2:
+            cmds.warning("At less 2 objects must be selected")
+            return None
+        source = oSel[0]
+        targets = oSel[1:]
+
+    for target in _as_list(targets):
+        source2 = cmds.duplicate(source, returnRootsOnly=True)[0]
+        shapes = cmds.listRelatives(target, shapes=True, fullPath=True) or []
+        cnx = []
+        if shapes:
+            # Incoming connections, restored in the new shapes
+            inputs = cmds.listConnections(shapes[0],
+                                          plugs=True,
+                                          connections=True,
+                                          source=True,
+                                          destination=False) or []
+            cnx = [(inputs[i + 1], inputs[i].split(".", 1)[-1])
+                   for i in range(0, len(inputs), 2)]
+            cmds.delete(shapes)
+        new_shapes = cmds.listRelatives(source2, shapes=True,
+                                        fullPath=True) or []
+        new_shapes = cmds.parent(new_shapes, target, r=True, s=True)
+
+        for i, sh in enumerate(new_shapes):
+            # Restore shapes connections
+            for src, attr in cnx:
+                cmds.connectAttr(src, "{}.{}".format(sh, attr))
+            cmds.rename(sh, _short_name(target) + "_%s_Shape" % str(i))
+
+        cmds.delete(source2)
+
+
+def addBlendedJoint(oSel=None,
+                    compScale=True,
+                    blend=.5,
+                    name=None,
+                    select=True,
+                    *args):
+    """Create and gimmick blended joint
+
+    Args:
+        oSel (None or str or list, optional): The joints. If None will use
+            the selected joints.
+        compScale (bool, optional): Set the compScale option of the blended
+            joint. Default is True.
+        blend (float, optional): blend rotation value
+        name (None, optional): Name for the blended o_node
+        select (bool, optional): If True will select the new joints
+        *args: Maya's dummy
+
+    Returns:
+        list: blended joints long names
+    """
+    oSel = _as_list(oSel) or _selected()
+    jnt_list = []
+    for x in oSel:
+        if cmds.nodeType(x) != "joint":
+            cmds.warning("Blended Joint can't be added to: %s. Because "
+                         "is not ot type Joint" % x)
+            continue
+        parent = cmds.listRelatives(x, parent=True, fullPath=True)
+        bname = "blend_" + (name or _short_name(x))
+
+        jnt = cmds.createNode("joint", name=bname, parent=x)
+        if parent:
+            jnt = cmds.parent(jnt, parent[0])[0]
+        else:
+            jnt = cmds.parent(jnt, world=True)[0]
+        jnt = _long_name(jnt)
+        jnt_list.append(jnt)
+        cmds.setAttr(jnt + ".radius", 1.5)
+
+        o_node = cmds.createNode("pairBlend")
+        cmds.setAttr(o_node + ".rotInterpolation", 1)
+        cmds.setAttr(o_node + ".weight", blend)
+        cmds.connectAttr(x + ".translate", o_node + ".inTranslate1")
+        cmds.connectAttr(x + ".translate", o_node + ".inTranslate2")
+        cmds.connectAttr(x + ".rotate", o_node + ".inRotate1")
+        cmds.connectAttr(o_node + ".outRotate", jnt + ".rotate")
+        cmds.connectAttr(o_node + ".outTranslate", jnt + ".translate")
+        cmds.connectAttr(x + ".scale", jnt + ".scale")
+
+        cmds.setAttr(jnt + ".overrideEnabled", 1)
+        cmds.setAttr(jnt + ".overrideColor", 17)
+        cmds.setAttr(jnt + ".segmentScaleCompensate", compScale)
+
+    if jnt_list:
+        cmds.sets(jnt_list, add=get_set("rig_deformers_grp"))
+        if select:
+            cmds.select(jnt_list)
+
+    return jnt_list
+
+
+def addSupportJoint(oSel=None, select=True, *args):
+    """Add an extra joint to the blended joint.
+
+    Args:
+        oSel (None or str or list, optional): The blended joints. If None
+            will use the current selection.
+        select (bool, optional): If True will select the new joints
+        *args: Mays's dummy
+
+    Returns:
+        list: support joints long names
+    """
+    oSel = _as_list(oSel) or _selected()
+    jnt_list = []
+    for x in oSel:
+        if _short_name(x).split("_")[0] != "blend":
+            cmds.warning("Support Joint can't be added to: %s. Because "
+                         "is not blend joint" % x)
+            continue
+        children = cmds.listRelatives(x, allDescendents=True,
+                                      type="joint") or []
+        name = _short_name(x).replace("blend",
+                                      "blendSupport_%s" % len(children))
+        jnt = _long_name(cmds.createNode("joint", name=name, parent=x))
+        jnt_list.append(jnt)
+        cmds.setAttr(jnt + ".radius", 1.5)
+        cmds.setAttr(jnt + ".overrideEnabled", 1)
+        cmds.setAttr(jnt + ".overrideColor", 17)
+
+    if jnt_list:
+        cmds.sets(jnt_list, add=get_set("rig_deformers_grp"))
+        if select:
+            cmds.select(jnt_list)
+
+    return jnt_list
+
+
+######################################################################
+# Batch blended joints
+######################################################################
+
+def _asFactors(values, count, default):
+    if values is None:
+        return [default] * count
+    if isinstance(values, (int, float)):
+        return [float(values)] * count
+    if len(values) != count:
+        raise ValueError("Expected {} values, got {}".format(count,
+                                                              len(values)))
+    return [float(v) for v in values]
+
+
+def addBlendedJointBatch(joints=None,
+                         blend=.5,
+                         compScale=True,
+                         names=None,
+                         select=False):
+    """Create the gimmick blended joints for a list of joints
+
+    All the joints and pairBlend nodes are created and connected with one
+    DAG modifier. The translate and rotate channels are connected as
+    compound plugs and all the joints are added to the deformers set with
+    one sets call.
+
+    Args:
+        joints (None or list of str, optional): The joints. If None will use
+            the selected joints
+        blend (float or list of float, optional): The rotation blend, one
+            value for all the joints or one value per joint
+        compScale (bool, optional): The segmentScaleCompensate of the
+            blended joints
+        names (None or list of str, optional): The name for each blended
+            joint, one name per joint, "blend_" is added as prefix. By
+            default the joint name
+        select (bool, optional): If True will select the new joints
+
+    Returns:
+        list: blended joints long names
+    """
+    joints = _as_list(joints) or _selected()
+    blends = _asFactors(blend, len(joints), .5)
+    if names is None:
+        names = [None] * len(joints)
+    elif len(names) != len(joints):
+        raise ValueError("Expected {} names, got {}".format(len(joints),
+                                                            len(names)))
+    dag_paths = []
+    valid_blends = []
+    valid_names = []
+    for dag_path, b, n in zip(_get_dag_paths(joints), blends, names):
+        if not dag_path.hasFn(om2.MFn.kJoint):
+            cmds.warning("Blended Joint can't be added to: %s. Because "
+                         "is not ot type Joint" % dag_path.partialPathName())
+            continue
+        dag_paths.append(dag_path)
+        valid_blends.append(b)
+        valid_names.append(n or _short_name(dag_path.partialPathName()))
+    if not dag_paths:
+        return []
+
+    mod = om2.MDagModifier()
+    fn = om2.MFnDependencyNode
+    jnts = []
+    for i, dag_path in enumerate(dag_paths):
+        fn_x = fn(dag_path.node())
+        jnt = mod.createNode("joint", _get_parent(dag_path))
+        mod.renameNode(jnt, "blend_" + valid_names[i])
+        fn_jnt = fn(jnt)
+
+        # same orientation than the source joint in the rest pose
+        orient = [fn_x.findPlug("jointOrient" + a, False).asDouble()
+                  for a in "XYZ"]
+        _setPlugValues(mod, fn_jnt, "jointOrient", orient)
+        mod.newPlugValueInt(fn_jnt.findPlug("rotateOrder", False),
+                            fn_x.findPlug("rotateOrder", False).asInt())
+        mod.newPlugValueDouble(fn_jnt.findPlug("radius", False), 1.5)
+        mod.newPlugValueBool(fn_jnt.findPlug("overrideEnabled", False), True)
+        mod.newPlugValueInt(fn_jnt.findPlug("overrideColor", False), 17)
+        mod.newPlugValueBool(
+            fn_jnt.findPlug("segmentScaleCompensate", False), compScale)
+
+        o_node = fn(_createDGNode(mod, "pairBlend"))
+        mod.newPlugValueInt(o_node.findPlug("rotInterpolation", False), 1)
+        mod.newPlugValueDouble(o_node.findPlug("weight", False),
+                               valid_blends[i])
+        translate = fn_x.findPlug("translate", False)
+        mod.connect(translate, o_node.findPlug("inTranslate1", False))
+        mod.connect(translate, o_node.findPlug("inTranslate2", False))
+        mod.connect(fn_x.findPlug("rotate", False),
+                    o_node.findPlug("inRotate1", False))
+        mod.connect(o_node.findPlug("outRotate", False),
+                    fn_jnt.findPlug("rotate", False))
+        mod.connect(o_node.findPlug("outTranslate", False),
+                    fn_jnt.findPlug("translate", False))
+        mod.connect(fn_x.findPlug("scale", False),
+                    fn_jnt.findPlug("scale", False))
+        jnts.append(jnt)
+    mod.doIt()
+
+    jnts = [om2.MFnDagNode(jnt).fullPathName() for jnt in jnts]
+    cmds.sets(jnts, add=get_set("rig_deformers_grp"))
+    if select:
+        cmds.select(jnts)
+    return jnts
+
+
+def addSupportJointBatch(blendJoints=None, select=False):
+    """Add one support joint to each blended joint
+
+    All the joints are created with one DAG modifier and added to the
+    deformers set with one sets call.
+
+    Args:
+        blendJoints (None or list of str, optional): The blended joints. If
+            None will use the current selection
+        select (bool, optional): If True will select the new joints
+
+    Returns:
+        list: support joints long names
+    """
+    blendJoints = _as_list(blendJoints) or _selected()
+    valid = []
+    for x in blendJoints:
+        if _short_name(x).split("_")[0] != "blend":
+            cmds.warning("Support Joint can't be added to: %s. Because "
+                         "is not blend joint" % x)
+        else:
+            valid.append(x)
+    if not valid:
+        return []
+
+    mod = om2.MDagModifier()
+    fn = om2.MFnDependencyNode
+    jnts = []
+    for dag_path in _get_dag_paths(valid):
+        name = _short_name(dag_path.partialPathName())
+        children = cmds.listRelatives(dag_path.fullPathName(),
+                                      allDescendents=True,
+                                      type="joint") or []
+        jnt = mod.createNode("joint", dag_path.node())
+        mod.renameNode(jnt, name.replace(
+            "blend", "blendSupport_%s" % len(children)))
+        fn_jnt = fn(jnt)
+        mod.newPlugValueDouble(fn_jnt.findPlug("radius", False), 1.5)
+        mod.newPlugValueBool(fn_jnt.findPlug("overrideEnabled", False), True)
+        mod.newPlugValueInt(fn_jnt.findPlug("overrideColor", False), 17)
+        jnts.append(jnt)
+    mod.doIt()
+
+    jnts = [om2.MFnDagNode(jnt).fullPathName() for jnt in jnts]
+    cmds.sets(jnts, add=get_set("rig_deformers_grp"))
+    if select:
+        cmds.select(jnts)
+    return jnts
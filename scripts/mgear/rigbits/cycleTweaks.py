@@ -2,12 +2,18 @@
 
 This module content the tools and procedures to rig tweaks with a benigne cycle
 """
+import math
+from collections import OrderedDict
+from timeit import default_timer
+
 import pymel.core as pm
 import pymel.core.datatypes as datatypes
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
 
 from mgear.core import icon, skin, node
 from mgear import rigbits
-from mgear.rigbits import rivet, blendShapes
+from mgear.rigbits import rivet, blendShapes, profiler, cmds_utils
 
 
 def inverseTranslateParent(obj):
@@ -56,6 +62,7 @@ def initCycleTweakBase(outMesh, baseMesh, rotMesh, transMesh, staticJnt=None):
                    n='%s_skinCluster' % transMesh.name())
 
 
+@profiler.profiled()
 def cycleTweak(name,
                edgePair,
                mirrorAxis,
@@ -69,7 +76,8 @@ def cycleTweak(name,
                iconType="square",
                size=.025,
                color=13,
-               ro=datatypes.Vector(1.5708, 0, 1.5708 / 2)):
+               ro=datatypes.Vector(1.5708, 0, 1.5708 / 2),
+               rivetMode=rivet.LOFT):
     """The command to create a cycle tweak.
 
     A cycle tweak is a tweak that cycles to the parent position but doesn't
@@ -93,6 +101,7 @@ def cycleTweak(name,
         size (float, optional): The control size
         color (int, optional): The control color
         ro (TYPE, optional): The control shape rotation offset
+        rivetMode (str, optional): The rivet mode, rivet.LOFT or rivet.PIN
 
     Returns:
         multi: the tweak control and the list of related joints.
@@ -100,9 +109,10 @@ def cycleTweak(name,
     # rotation sctructure
     rRivet = rivet.rivet()
     rBase = rRivet.create(
-        baseMesh, edgePair[0], edgePair[1], setupParent, name + "_rRivet_loc")
+        baseMesh, edgePair[0], edgePair[1], setupParent, name + "_rRivet_loc",
+        mode=rivetMode)
 
-    pos = rBase.getTranslation(space="world")
+    pos = rivet.getWorldPosition(rBase)
 
     # translation structure
     tRivetParent = pm.createNode("transform",
@@ -114,7 +124,8 @@ def cycleTweak(name,
                           edgePair[0],
                           edgePair[1],
                           tRivetParent,
-                          name + "_tRivet_loc")
+                          name + "_tRivet_loc",
+                          mode=rivetMode)
 
     # create the control
     tweakBase = pm.createNode("transform", n=name + "_tweakBase", p=ctlParent)
@@ -130,7 +141,7 @@ def cycleTweak(name,
                            d=size,
                            ro=ro)
     inverseTranslateParent(tweakCtl)
-    pm.pointConstraint(tBase, tweakBase)
+    rivet.constrainPosition(tBase, tweakBase, rivetMode)
 
     # rot
     rotBase = pm.createNode("transform", n=name + "_rotBase", p=setupParent)
@@ -149,7 +160,7 @@ def cycleTweak(name,
                         rotJointDriver.attr("ty"),
                         rotJointDriver.attr("tz")])
 
-    pm.pointConstraint(rBase, rotNPO)
+    rivet.constrainPosition(rBase, rotNPO, rivetMode)
     pm.connectAttr(tweakCtl.r, rotNPO.r)
     pm.connectAttr(tweakCtl.s, rotNPO.s)
 
@@ -185,3 +196,303 @@ def cycleTweak(name,
     pm.skinCluster(tSK, e=True, ai=tJoint, lw=True, wt=0)
 
     return tweakCtl, [rJoint, tJoint]
+
+
+######################################################################
+# Batch builder
+######################################################################
+
+def _getMObject(node):
+    sel = om2.MSelectionList()
+    sel.add(pm.PyNode(node).longName())
+    return sel.getDependNode(0)
+
+
+def _plug(mobj, name, index=None):
+    plug = om2.MFnDependencyNode(mobj).findPlug(name, False)
+    if index is not None:
+        plug = plug.elementByLogicalIndex(index)
+    return plug
+
+
+def _setVector(mod, mobj, attr, values):
+    for axis, value in zip("XYZ", values):
+        mod.newPlugValueDouble(_plug(mobj, attr + axis), value)
+
+
+def _createTransform(mod, name, parentObj, translation=(0, 0, 0),
+                     rotation=(0, 0, 0), scale=(1, 1, 1)):
+    mobj = mod.createNode("transform", parentObj)
+    mod.renameNode(mobj, name)
+    _setVector(mod, mobj, "translate", translation)
+    _setVector(mod, mobj, "rotate", rotation)
+    _setVector(mod, mobj, "scale", scale)
+    return mobj
+
+
+def _worldLocal(worldMatrix, parentInverse, mirror=False):
+    """Return the local translation, rotation and scale of a world matrix
+
+    With mirror, the local Y rotation is rotated 180 degrees and the Z
+    scale is -1, like the cycleTweak mirror behaviour.
+    """
+    tm = om2.MTransformationMatrix(worldMatrix * parentInverse)
+    t = tm.translation(om2.MSpace.kTransform)
+    r = tm.rotation()
+    s = tm.scale(om2.MSpace.kTransform)
+    rotation = [r.x, r.y, r.z]
+    scale = list(s)
+    if mirror:
+        rotation[1] += math.pi
+        scale[2] = -1
+    return [t.x, t.y, t.z], rotation, scale
+
+
+def _connectInverse(mod, source, target):
+    mul_node = om2.MDGModifier.createNode(mod, "multiplyDivide")
+    mod.connect(_plug(source, "translate"), _plug(mul_node, "input1"))
+    _setVector(mod, mul_node, "input2", (-1, -1, -1))
+    mod.connect(_plug(mul_node, "output"), _plug(target, "translate"))
+
+
+def _connectWorldPosition(mod, source, target):
+    # point constraint without offset
+    mulmat_node = om2.MDGModifier.createNode(mod, "multMatrix")
+    dm_node = om2.MDGModifier.createNode(mod, "decomposeMatrix")
+    mod.connect(_plug(source, "worldMatrix", 0),
+                _plug(mulmat_node, "matrixIn", 0))
+    mod.connect(_plug(target, "parentInverseMatrix", 0),
+                _plug(mulmat_node, "matrixIn", 1))
+    mod.connect(_plug(mulmat_node, "matrixSum"),
+                _plug(dm_node, "inputMatrix"))
+    mod.connect(_plug(dm_node, "outputTranslate"),
+                _plug(target, "translate"))
+
+
+def _parentInverse(parent):
+    if not parent:
+        return om2.MMatrix()
+    return om2.MMatrix(
+        pm.PyNode(parent).getMatrix(worldSpace=True)).inverse()
+
+
+def _parentObj(parent):
+    if not parent:
+        return om2.MObject.kNullObj
+    return _getMObject(parent)
+
+
+@profiler.profiled("cycleTweaks.cycleTweakBatch")
+def cycleTweakBatch(definitions,
+                    baseMesh,
+                    rotMesh,
+                    transMesh,
+                    setupParent,
+                    ctlParent,
+                    jntOrg=None,
+                    grp=None,
+                    iconType="square",
+                    size=.025,
+                    color=13,
+                    ro=datatypes.Vector(1.5708, 0, 1.5708 / 2),
+                    rivetMode=rivet.LOFT):
+    """Create a list of cycle tweaks in one pass
+
+    Batch version of cycleTweak. The rivets of each mesh are created in
+    one pass, the setup transforms with one modifier and the connections
+    with a second modifier, after the controls are created. The joints are
+    created with one modifier and added to each skinCluster with one edit.
+
+    The position constraints of the tweak and rotation structures are
+    matrix connections instead of pointConstraint nodes.
+
+    Args:
+        definitions (list of dict): The cycle tweaks definitions. Each
+            definition has the "name", "edgePair" and "mirrorAxis" keys,
+            and can override the "setupParent", "ctlParent", "iconType",
+            "size" and "color" arguments.
+        baseMesh (Mesh): The base mesh for the cycle tweak.
+        rotMesh (Mesh): The mesh that will support the rotation
+                transformations for the cycle tweak
+        transMesh (Mesh): The mesh that will support the translation and
+                scale transformations for the cycle tweak
+        setupParent (dagNode): The parent for the setup objects
+        ctlParent (dagNode): The parent for the control objects
+        jntOrg (None or dagNode, optional): The parent for the joints
+        grp (None or set, optional): The set to add the controls
+        iconType (str, optional): The controls shape
+        size (float, optional): The control size
+        color (int, optional): The control color
+        ro (TYPE, optional): The control shape rotation offset
+        rivetMode (str, optional): The rivet mode, rivet.LOFT or rivet.PIN
+
+    Returns:
+        multi: the tweak controls, the list of [rotJoint, posJoint] for
+            each tweak and the build report. The report has the number of
+            tweaks, the created nodes count per type and the time of each
+            build stage.
+    """
+    timings = OrderedDict()
+    start = default_timer()
+    last = [start]
+
+    def stage(label):
+        now = default_timer()
+        timings[label] = now - last[0]
+        last[0] = now
+
+    defs = []
+    for d in definitions:
+        d = dict(d)
+        d.setdefault("setupParent", setupParent)
+        d.setdefault("ctlParent", ctlParent)
+        d.setdefault("iconType", iconType)
+        d.setdefault("size", size)
+        d.setdefault("color", color)
+        d.setdefault("mirrorAxis", False)
+        defs.append(d)
+    if not defs:
+        return [], [], {"tweaks": 0, "nodes": {}, "timings": timings}
+
+    with profiler.count_nodes() as nodeCounts:
+        # rivets, one pass per mesh and parent
+        rBases = [None] * len(defs)
+        bySetupParent = OrderedDict()
+        for i, d in enumerate(defs):
+            bySetupParent.setdefault(d["setupParent"], []).append(i)
+        for parent, indexList in bySetupParent.items():
+            rivets = rivet.createRivets(
+                baseMesh,
+                [defs[i]["edgePair"] for i in indexList],
+                parent,
+                [defs[i]["name"] + "_rRivet_loc" for i in indexList],
+                mode=rivetMode)
+            for i, base in zip(indexList, rivets):
+                rBases[i] = base
+        tBases = rivet.createRivets(transMesh,
+                                    [d["edgePair"] for d in defs],
+                                    None,
+                                    [d["name"] + "_tRivet_loc" for d in defs],
+                                    mode=rivetMode)
+        positions = [om2.MMatrix(rivet.getWorldMatrix(b)) for b in rBases]
+        stage("rivets")
+
+        # setup transforms
+        mod = om2.MDagModifier()
+        objs = []
+        for d, tBase, rivetMatrix in zip(defs, tBases, positions):
+            name = d["name"]
+            mirror = d["mirrorAxis"]
+            ctlInverse = _parentInverse(d["ctlParent"])
+            setupInverse = _parentInverse(d["setupParent"])
+            ctlParentObj = _parentObj(d["ctlParent"])
+            setupParentObj = _parentObj(d["setupParent"])
+            posMatrix = om2.MMatrix()
+            posMatrix.setElement(3, 0, rivetMatrix.getElement(3, 0))
+            posMatrix.setElement(3, 1, rivetMatrix.getElement(3, 1))
+            posMatrix.setElement(3, 2, rivetMatrix.getElement(3, 2))
+
+            # translation structure
+            tRivetParent = _createTransform(
+                mod,
+                name + "_tRivetBase",
+                ctlParentObj,
+                *_worldLocal(om2.MMatrix(), ctlInverse))
+            mod.reparentNode(_getMObject(tBase), tRivetParent)
+
+            # control structure
+            tweakBase = _createTransform(
+                mod,
+                name + "_tweakBase",
+                ctlParentObj,
+                *_worldLocal(posMatrix, ctlInverse, mirror))
+            tweakNpo = _createTransform(mod, name + "_tweakNpo", tweakBase)
+
+            # rot
+            rotBase = _createTransform(
+                mod,
+                name + "_rotBase",
+                setupParentObj,
+                *_worldLocal(posMatrix, setupInverse, mirror))
+            rotNPO = _createTransform(mod, name + "_rot_npo", rotBase)
+            rotJointDriver = _createTransform(mod,
+                                              name + "_rotJointDriver",
+                                              rotNPO)
+
+            # transform, keeps the parent orientation
+            posLocal = om2.MPoint(rivetMatrix.getElement(3, 0),
+                                  rivetMatrix.getElement(3, 1),
+                                  rivetMatrix.getElement(3, 2)) * setupInverse
+            rotation = (0, math.pi, 0) if mirror else (0, 0, 0)
+            scale = (1, 1, -1) if mirror else (1, 1, 1)
+            posNPO = _createTransform(mod,
+                                      name + "_pos_npo",
+                                      setupParentObj,
+                                      (posLocal.x, posLocal.y, posLocal.z),
+                                      rotation,
+                                      scale)
+            posJointDriver = _createTransform(mod,
+                                              name + "_posJointDriver",
+                                              posNPO)
+            objs.append((tweakBase, tweakNpo, rotNPO, rotJointDriver,
+                         posJointDriver))
+        mod.doIt()
+        stage("transforms")
+
+        # controls
+        tweakCtls = []
+        for d, (tweakBase, tweakNpo, _, _, _) in zip(defs, objs):
+            npo = pm.PyNode(om2.MFnDagNode(tweakNpo).fullPathName())
+            tweakCtls.append(icon.create(npo,
+                                         d["name"] + "_ctl",
+                                         npo.getMatrix(worldSpace=True),
+                                         d["color"],
+                                         d["iconType"],
+                                         w=d["size"],
+                                         d=d["size"],
+                                         ro=ro))
+        stage("controls")
+
+        # connections
+        mod = om2.MDGModifier()
+        for tweakCtl, tBase, rBase, o in zip(tweakCtls, tBases, rBases, objs):
+            tweakBase, tweakNpo, rotNPO, rotJointDriver, posJointDriver = o
+            ctlObj = _getMObject(tweakCtl)
+            _connectInverse(mod, ctlObj, tweakNpo)
+            _connectWorldPosition(mod, _getMObject(tBase), tweakBase)
+            _connectInverse(mod, rotNPO, rotJointDriver)
+            _connectWorldPosition(mod, _getMObject(rBase), rotNPO)
+            for attr in ("rotate", "scale"):
+                mod.connect(_plug(ctlObj, attr), _plug(rotNPO, attr))
+            mod.connect(_plug(ctlObj, "translate"),
+                        _plug(posJointDriver, "translate"))
+        mod.doIt()
+        stage("connections")
+
+        # joints
+        rotDrivers = [om2.MFnDagNode(o[3]).fullPathName() for o in objs]
+        posDrivers = [om2.MFnDagNode(o[4]).fullPathName() for o in objs]
+        jntParent = str(jntOrg) if jntOrg else None
+        jntGrp = str(grp) if grp else None
+        rJoints = cmds_utils.addJntBatch(rotDrivers, jntParent, True, jntGrp)
+        tJoints = cmds_utils.addJntBatch(posDrivers, jntParent, True, jntGrp)
+        stage("joints")
+
+        # one edit per skinCluster
+        for mesh, joints in ((rotMesh, rJoints), (transMesh, tJoints)):
+            skinCluster = skin.getSkinCluster(mesh)
+            current = set(cmds.skinCluster(str(skinCluster),
+                                           query=True,
+                                           influence=True) or [])
+            joints = [j for j in joints if j.split("|")[-1] not in current]
+            if joints:
+                pm.skinCluster(skinCluster, e=True, ai=joints, lw=True, wt=0)
+        stage("skin")
+
+    timings["total"] = default_timer() - start
+    report = {"tweaks": len(defs),
+              "nodes": dict(nodeCounts),
+              "timings": timings}
+
+    joints = [[pm.PyNode(r), pm.PyNode(t)] for r, t in zip(rJoints, tJoints)]
+    return tweakCtls, joints, report
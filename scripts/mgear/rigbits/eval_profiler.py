@@ -0,0 +1,324 @@
+"""Rigbits evaluation cost profiler
+
+Find which rigbits builders dominate the rig evaluation cost. The nodes are
+tagged with the builder that created them, using a profiler session with
+tag=True, then the tagged nodes are sampled over a frame range and the cost
+is aggregated per builder and per node type.
+
+The default sampler dirties each tagged node and times the pull of its
+connected outputs through the API, so only the node itself is computed. The
+geometry outputs are not pulled. Any callable with the same signature can be
+used as sampler.
+
+Example::
+
+    from mgear.rigbits import profiler, eval_profiler
+    with profiler.session("face", tag=True):
+        eye_rigger.eyesFromfile(path)
+    report = eval_profiler.profile_evaluation(range(1, 25))
+    print(report.table())
+"""
+
+import json
+from collections import OrderedDict
+from timeit import default_timer
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+from mgear.rigbits.profiler import PROVENANCE_ATTR
+
+
+######################################################################
+# Report
+######################################################################
+
+class CostRecord(object):
+    """Aggregated evaluation cost of a group of nodes"""
+
+    __slots__ = ("nodes", "total")
+
+    def __init__(self):
+        self.nodes = 0
+        self.total = 0.0
+
+    def as_dict(self, frames):
+        return {"nodes": self.nodes,
+                "total": self.total,
+                "per_frame": self.total / frames if frames else 0.0}
+
+
+class EvalReport(object):
+    """Evaluation cost per builder and per node type
+
+    Attributes:
+        frames (int): Number of sampled frames
+        playback (float): Wall time of the playback of the frames
+        builders (OrderedDict): builder -> CostRecord, most expensive first
+        node_types (OrderedDict): node type -> CostRecord, most expensive
+            first
+        nodes (OrderedDict): node -> seconds, most expensive first
+    """
+
+    def __init__(self, frames=0, playback=0.0):
+        self.frames = frames
+        self.playback = playback
+        self.builders = OrderedDict()
+        self.node_types = OrderedDict()
+        self.nodes = OrderedDict()
+
+    @classmethod
+    def from_costs(cls, costs, builders, node_types, frames, playback=0.0):
+        """Aggregate the cost of each node
+
+        Args:
+            costs (dict): node -> sampled seconds
+            builders (dict): node -> builder name
+            node_types (dict): node -> node type
+            frames (int): Number of sampled frames
+            playback (float, optional): Wall time of the playback
+
+        Returns:
+            EvalReport: The report
+        """
+        report = cls(frames, playback)
+        builder_records = {}
+        type_records = {}
+        for node, cost in costs.items():
+            for key, records in ((builders.get(node), builder_records),
+                                 (node_types.get(node), type_records)):
+                record = records.get(key)
+                if record is None:
+                    record = records[key] = CostRecord()
+                record.nodes += 1
+                record.total += cost
+
+        def by_cost(records):
+            return OrderedDict(sorted(records.items(),
+                                      key=lambda item: -item[1].total))
+
+        report.builders = by_cost(builder_records)
+        report.node_types = by_cost(type_records)
+        report.nodes = OrderedDict(sorted(costs.items(),
+                                          key=lambda item: -item[1]))
+        return report
+
+    @property
+    def total(self):
+        return sum(r.total for r in self.builders.values())
+
+    def as_dict(self, top=50):
+        return {"frames": self.frames,
+                "playback": self.playback,
+                "total": self.total,
+                "builders": OrderedDict(
+                    (k, v.as_dict(self.frames))
+                    for k, v in self.builders.items()),
+                "node_types": OrderedDict(
+                    (k, v.as_dict(self.frames))
+                    for k, v in self.node_types.items()),
+                "nodes": OrderedDict(list(self.nodes.items())[:top])}
+
+    def to_json(self, indent=4):
+        return json.dumps(self.as_dict(), indent=indent)
+
+    def save(self, filePath):
+        """Write the report as json file
+
+        Args:
+            filePath (str): Destination path
+        """
+        with open(filePath, "w") as f:
+            f.write(self.to_json())
+
+    def table(self, top=10):
+        """Return the report formatted as a console table
+
+        Args:
+            top (int, optional): Max number of nodes listed
+
+        Returns:
+            str: The report table
+        """
+        total = self.total
+        lines = ["Evaluation profile: %i frames, playback %.3f s"
+                 % (self.frames, self.playback)]
+        for title, records in (("Builder", self.builders),
+                               ("Node type", self.node_types)):
+            width = max([len(str(k)) for k in records] + [len(title)]) + 2
+            lines.append("-" * (width + 36))
+            lines.append(title.ljust(width)
+                         + "Nodes".rjust(8)
+                         + "ms/frame".rjust(12)
+                         + "%".rjust(8))
+            for key, record in records.items():
+                percent = record.total * 100.0 / total if total else 0.0
+                per_frame = record.total * 1000.0 / max(self.frames, 1)
+                lines.append(str(key).ljust(width)
+                             + str(record.nodes).rjust(8)
+                             + ("%.4f" % per_frame).rjust(12)
+                             + ("%.1f" % percent).rjust(8))
+        if self.nodes:
+            lines.append("-" * 40)
+            lines.append("Most expensive nodes")
+            for node, cost in list(self.nodes.items())[:top]:
+                lines.append("    %s  %.4f ms/frame"
+                             % (node, cost * 1000.0 / max(self.frames, 1)))
+        return "\n".join(lines)
+
+
+######################################################################
+# Sampling
+######################################################################
+
+def tagged_nodes():
+    """Return the nodes tagged with the builder name
+
+    Returns:
+        dict: node -> builder name
+    """
+    nodes = cmds.ls("*." + PROVENANCE_ATTR, objectsOnly=True,
+                    recursive=True) or []
+    return dict((n, cmds.getAttr("{}.{}".format(n, PROVENANCE_ATTR)))
+                for n in nodes)
+
+
+# typed attribute data not pulled by the sampler
+GEOMETRY_DATA = (om2.MFnData.kMesh,
+                 om2.MFnData.kNurbsCurve,
+                 om2.MFnData.kNurbsSurface,
+                 om2.MFnData.kLattice,
+                 om2.MFnData.kSubdSurface)
+
+
+def _is_geometry(attr):
+    """True if the attribute can hold geometry data"""
+    if attr.hasFn(om2.MFn.kGenericAttribute):
+        return True
+    if attr.hasFn(om2.MFn.kTypedAttribute):
+        return om2.MFnTypedAttribute(attr).attrType() in GEOMETRY_DATA
+    return False
+
+
+def _is_scalar(attr):
+    """True if the value of the attribute can be read as a double"""
+    if attr.hasFn(om2.MFn.kUnitAttribute):
+        return True
+    return (attr.hasFn(om2.MFn.kNumericAttribute)
+            and not attr.hasFn(om2.MFn.kCompoundAttribute))
+
+
+def _output_plugs(node):
+    """Return the connected output plugs of the node
+
+    The message and the geometry plugs are skipped.
+
+    Returns:
+        list of (MPlug, bool): The plugs and True if the plug is scalar
+    """
+    cnx = cmds.listConnections(node,
+                               source=False,
+                               destination=True,
+                               plugs=True,
+                               connections=True) or []
+    names = []
+    for plug in cnx[::2]:
+        if plug not in names and not plug.endswith(".message"):
+            names.append(plug)
+    plugs = []
+    for name in names:
+        sel = om2.MSelectionList()
+        try:
+            sel.add(name)
+        except RuntimeError:
+            continue
+        plug = sel.getPlug(0)
+        attr = plug.attribute()
+        if not _is_geometry(attr):
+            plugs.append((plug, _is_scalar(attr)))
+    return plugs
+
+
+def _pull(plug, scalar):
+    if scalar:
+        plug.asDouble()
+    else:
+        plug.asMObject()
+
+
+def dirty_sampler(nodes, frames):
+    """Sample the cost of each node by dirty propagation
+
+    In each frame the node is dirtied and the connected outputs are pulled
+    with MPlug, so the node is computed with the inputs already clean. The
+    geometry outputs are skipped, so the cost of the deformers is not
+    sampled.
+
+    Args:
+        nodes (list of str): The nodes to sample
+        frames (list of float): The frames to sample
+
+    Returns:
+        dict: node -> seconds
+    """
+    outputs = dict((n, _output_plugs(n)) for n in nodes)
+    costs = dict.fromkeys(nodes, 0.0)
+    for frame in frames:
+        cmds.currentTime(frame, update=True)
+        for node in nodes:
+            plugs = outputs[node]
+            if not plugs:
+                continue
+            cmds.dgdirty(node)
+            start = default_timer()
+            for plug, scalar in plugs:
+                try:
+                    _pull(plug, scalar)
+                except RuntimeError:
+                    pass
+            costs[node] += default_timer() - start
+    return costs
+
+
+def _playback(frames):
+    start = default_timer()
+    for frame in frames:
+        cmds.currentTime(frame, update=True)
+        cmds.refresh(force=True)
+    return default_timer() - start
+
+
+def profile_evaluation(frames=None, nodes=None, sampler=dirty_sampler):
+    """Sample the evaluation cost of the tagged nodes
+
+    Args:
+        frames (list of float, optional): The frames to sample. By default
+            the playback range
+        nodes (dict, optional): node -> builder name. By default all the
+            tagged nodes in the scene
+        sampler (callable, optional): The sampler. sampler(nodes, frames)
+            returns a dictionary node -> seconds
+
+    Returns:
+        EvalReport: The report
+    """
+    if frames is None:
+        frames = list(range(
+            int(cmds.playbackOptions(q=True, minTime=True)),
+            int(cmds.playbackOptions(q=True, maxTime=True)) + 1))
+    else:
+        frames = list(frames)
+    if nodes is None:
+        nodes = tagged_nodes()
+    nodes = dict((n, b) for n, b in nodes.items() if cmds.objExists(n))
+    node_types = dict((n, cmds.nodeType(n)) for n in nodes)
+
+    current = cmds.currentTime(q=True)
+    try:
+        playback = _playback(frames)
+        costs = sampler(list(nodes), frames)
+    finally:
+        cmds.currentTime(current, update=True)
+
+    return EvalReport.from_costs(costs, nodes, node_types, len(frames),
+                                 playback)
@@ -13,6 +13,7 @@ from mgear.vendor.Qt import QtCore, QtWidgets
 from pymel.core import datatypes
 
 from mgear import rigbits
+from mgear.rigbits import profiler
 
 
 ##########################################################
@@ -20,6 +21,7 @@ from mgear import rigbits
 ##########################################################
 
 
+@profiler.profiled()
 def eyeRig(eyeMesh,
            edgeLoop,
            blinkH,
@@ -11,6 +11,7 @@ from mgear.vendor.Qt import QtCore, QtWidgets
 from pymel.core import datatypes
 
 from mgear import rigbits
+from mgear.rigbits import profiler
 from mgear.core import meshNavigation, curve, applyop, primitive, icon
 from mgear.core import transform, attribute, skin, pickWalk, vector
 from mgear.core import node
@@ -20,6 +21,7 @@ from mgear.rigbits.facial_rigger import helpers
 from mgear.rigbits.facial_rigger import constraints
 
 
+@profiler.profiled("brow_rigger.rig")
 def rig(edge_loop,
         name_prefix,
         thickness,
@@ -869,29 +871,31 @@ def rig(edge_loop,
                                  if getSide(crv) in "LR"]
             leftSec = []
             rightSec = []
+            cnsParents = []
+            cnsChildren = []
             for secCtl in secondaryControls:
                 # tag_parent = None
                 if getSide(secCtl) is "L":
                     # connect secondary controla rotate/scale to ctl_parent_L.
-                    constraints.matrixConstraint(ctl_parent_L,
-                                                 secCtl.getParent(2),
-                                                 'rs',
-                                                 True)
+                    cnsParents.append(ctl_parent_L)
+                    cnsChildren.append(secCtl.getParent(2))
                     leftSec.append(secCtl)
                     tag_parent = parent_tag_L
 
                 if getSide(secCtl) is "R":
                     # connect secondary controla rotate/scale to ctl_parent_L.
-                    constraints.matrixConstraint(ctl_parent_R,
-                                                 secCtl.getParent(2),
-                                                 'rs',
-                                                 True)
+                    cnsParents.append(ctl_parent_R)
+                    cnsChildren.append(secCtl.getParent(2))
                     rightSec.append(secCtl)
                     tag_parent = parent_tag_R
 
                 # controls tags
                 node.add_controller_tag(secCtl, tagParent=tag_parent)
 
+            constraints.matrixConstraintBatch(cnsParents,
+                                              cnsChildren,
+                                              'rs',
+                                              True)
             secControlsMerged.append(rightSec)
             secControlsMerged.append(leftSec)
 
@@ -900,16 +904,18 @@ def rig(edge_loop,
             tempMainUpvCurves = mainCtlUpvs
             secControlsMerged.append(secondaryControls)
 
+            constraints.matrixConstraintBatch(
+                [ctl_parent_L] * len(secondaryControls),
+                [secCtl.getParent(2) for secCtl in secondaryControls],
+                'rs',
+                True)
             for secCtl in secondaryControls:
-                constraints.matrixConstraint(ctl_parent_L,
-                                             secCtl.getParent(2),
-                                             'rs',
-                                             True)
-
                 # controls tags
                 node.add_controller_tag(secCtl, tagParent=parent_tag_L)
 
         # create hooks on the main ctl curve
+        hooks = []
+        hookedNpos = []
         for j, crv in enumerate(secondaryCurves):
             side = getSide(crv)
 
@@ -952,12 +958,11 @@ def rig(edge_loop,
                 pm.connectAttr(oTransUpV.attr("worldMatrix[0]"),
                                cns.attr("worldUpMatrix"))
 
-                # connect secondary control to oTrans hook.
-                constraints.matrixConstraint(
-                    oTrans,
-                    secControlsMerged[j][i].getParent(2),
-                    't',
-                    True)
+                hooks.append(oTrans)
+                hookedNpos.append(secControlsMerged[j][i].getParent(2))
+
+        # connect secondary control to oTrans hook.
+        constraints.matrixConstraintBatch(hooks, hookedNpos, 't', True)
 
     ##################
     # Wires and connections
@@ -1,8 +1,14 @@
 import pymel.core as pm
 import maya.OpenMaya as om
+import maya.api.OpenMaya as om2
 
 import pymel.core.datatypes as datatypes
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 ##################
 # Helper functions
 ##################
@@ -155,3 +161,296 @@ def matrixBlendConstraint(parent=None,  # should be a list
         decomposeMatrixConnect(wtMat_node, child, transform)
 
         return wtMat_node
+
+
+##################
+# Batch constraints
+##################
+
+class DagPathCache(object):
+    """Cache of the DAG nodes by name
+
+    The cached nodes are checked with an object handle and the node name,
+    so a deleted or renamed node is looked up again. The DAG path is
+    computed from the node, so it is valid after a reparent.
+    """
+
+    def __init__(self):
+        self._handles = {}
+
+    def get(self, node):
+        """Return the om2 DAG path of the node
+
+        Args:
+            node (str or dagNode): The node
+
+        Returns:
+            MDagPath: The DAG path
+        """
+        name = str(node)
+        handle = self._handles.get(name)
+        if (handle is not None
+                and handle.isValid()
+                and om2.MFnDependencyNode(handle.object()).name()
+                == _shortName(name)):
+            return om2.MDagPath.getAPathTo(handle.object())
+        sel = om2.MSelectionList()
+        sel.add(name)
+        path = sel.getDagPath(0)
+        self._handles[name] = om2.MObjectHandle(path.node())
+        return path
+
+    def clear(self):
+        self._handles = {}
+
+
+dagPathCache = DagPathCache()
+
+
+def _shortName(node):
+    return str(node).split("|")[-1]
+
+
+def _matrixRows(matrix):
+    return [[matrix.getElement(i, j) for j in range(4)] for i in range(4)]
+
+
+def getLocalOffsets(parents, children, cache=None):
+    """Return the local offset of each child in the parent space
+
+    The world matrices are fetched once per node and the offsets are
+    computed in one pass with numpy, if available.
+
+    Args:
+        parents (list): The parent of each child
+        children (list): The children
+        cache (DagPathCache, optional): The DAG path cache
+
+    Returns:
+        list of om2.MMatrix: The offsets
+    """
+    cache = cache or dagPathCache
+    worldMatrices = {}
+    for n in list(parents) + list(children):
+        name = str(n)
+        if name not in worldMatrices:
+            worldMatrices[name] = cache.get(name).inclusiveMatrix()
+
+    if np is not None and children:
+        childW = np.array([_matrixRows(worldMatrices[str(c)])
+                           for c in children])
+        parentW = np.array([_matrixRows(worldMatrices[str(p)])
+                            for p in parents])
+        offsets = np.matmul(childW, np.linalg.inv(parentW))
+        return [om2.MMatrix(m.ravel().tolist()) for m in offsets]
+
+    return [worldMatrices[str(c)] * worldMatrices[str(p)].inverse()
+            for p, c in zip(parents, children)]
+
+
+def _findPlug(cache, node, attr, index=None):
+    fn = om2.MFnDependencyNode(cache.get(node).node())
+    plug = fn.findPlug(attr, False)
+    if index is not None:
+        plug = plug.elementByLogicalIndex(index)
+    return plug
+
+
+def _nodePlug(mobj, attr, index=None):
+    plug = om2.MFnDependencyNode(mobj).findPlug(attr, False)
+    if index is not None:
+        plug = plug.elementByLogicalIndex(index)
+    return plug
+
+
+def _setMatrix(mod, plug, matrix):
+    mod.newPlugValue(plug, om2.MFnMatrixData().create(matrix))
+
+
+def _forceConnect(mod, source, destination):
+    if destination.isDestination:
+        mod.disconnect(destination.source(), destination)
+    mod.connect(source, destination)
+
+
+def _createNode(mod, nodeType, name):
+    mobj = mod.createNode(nodeType)
+    mod.renameNode(mobj, name)
+    return mobj
+
+
+def _decomposeMatrixConnect(mod, cache, matrixPlug, child, transform):
+    dm_node = _createNode(mod,
+                          "decomposeMatrix",
+                          setName(_shortName(child) + "_decompMatrix"))
+    mod.connect(matrixPlug, _nodePlug(dm_node, "inputMatrix"))
+    for channel, attr in (("t", "Translate"),
+                          ("r", "Rotate"),
+                          ("s", "Scale")):
+        if channel in transform:
+            _forceConnect(mod,
+                          _nodePlug(dm_node, "output" + attr),
+                          _findPlug(cache, child, attr.lower()))
+    return dm_node
+
+
+def matrixConstraintBatch(parents,
+                          children,
+                          transform='srt',
+                          offset=False,
+                          cache=None):
+    """Create matrix constraints for a list of parent and child pairs
+
+    Batch version of matrixConstraint. All the nodes are created and
+    connected with one modifier.
+
+    Args:
+        parents (list of dagNode): The parent of each child
+        children (list of dagNode): The constrained children
+        transform (str, optional): The constrained channels, 's', 'r', 't'
+        offset (bool, optional): If True keeps the child offset
+        cache (DagPathCache, optional): The DAG path cache
+
+    Returns:
+        list of str: The multMatrix nodes
+    """
+    cache = cache or dagPathCache
+    if offset:
+        offsets = getLocalOffsets(parents, children, cache)
+        first = 1
+    else:
+        offsets = [None] * len(children)
+        first = 0
+
+    mod = om2.MDGModifier()
+    nodes = []
+    for parent, child, localOffset in zip(parents, children, offsets):
+        node = _createNode(mod,
+                           "multMatrix",
+                           setName(_shortName(parent) + "_multMatrix"))
+        if localOffset is not None:
+            _setMatrix(mod, _nodePlug(node, "matrixIn", 0), localOffset)
+        mod.connect(_findPlug(cache, parent, "worldMatrix", 0),
+                    _nodePlug(node, "matrixIn", first))
+        mod.connect(_findPlug(cache, child, "parentInverseMatrix", 0),
+                    _nodePlug(node, "matrixIn", first + 1))
+        _decomposeMatrixConnect(mod,
+                                cache,
+                                _nodePlug(node, "matrixSum"),
+                                child,
+                                transform)
+        nodes.append(node)
+    mod.doIt()
+
+    return [om2.MFnDependencyNode(n).name() for n in nodes]
+
+
+def _addWeightAttrs(hosts, parents, weights, cache):
+    """Add the weight attributes of the blend constraints in one pass"""
+    mod = om2.MDGModifier()
+    fnAttr = om2.MFnNumericAttribute()
+    for host, parentList, weightList in zip(hosts, parents, weights):
+        if not host:
+            continue
+        for p, weight in zip(parentList, weightList):
+            attr = fnAttr.create(setName(_shortName(p) + "_wtWeight"),
+                                 setName(_shortName(p) + "_wtWeight"),
+                                 om2.MFnNumericData.kFloat,
+                                 weight)
+            fnAttr.setMin(0.0)
+            fnAttr.setMax(1.0)
+            fnAttr.keyable = True
+            mod.addAttribute(cache.get(host).node(), attr)
+    mod.doIt()
+
+
+def matrixBlendConstraintBatch(parents,
+                               children,
+                               weights=None,
+                               transform='rt',
+                               offset=False,
+                               hosts=None,
+                               cache=None):
+    """Create matrix blend constraints for a list of children
+
+    Batch version of matrixBlendConstraint. The weight attributes are added
+    with one modifier and all the nodes are created and connected with a
+    second one.
+
+    Args:
+        parents (list of list): The parents of each child
+        children (list of dagNode): The constrained children
+        weights (list of list, optional): The weights of each child
+            parents. By default the parents have the same weight
+        transform (str, optional): The constrained channels, 's', 'r', 't'
+        offset (bool, optional): If True keeps the child offset
+        hosts (list, optional): The host of the weight attributes of each
+            child. If None the weights are set in the wtAddMatrix node
+        cache (DagPathCache, optional): The DAG path cache
+
+    Returns:
+        list of str: The wtAddMatrix nodes
+    """
+    cache = cache or dagPathCache
+    if weights is None:
+        weights = [[1.0 / len(p)] * len(p) for p in parents]
+    for parentList, weightList in zip(parents, weights):
+        if len(parentList) != len(weightList):
+            pm.displayWarning("weights list should be equal to parents list.")
+            return
+    hosts = hosts or [None] * len(children)
+    _addWeightAttrs(hosts, parents, weights, cache)
+
+    pairs = [(p, c) for parentList, c in zip(parents, children)
+             for p in parentList]
+    if offset:
+        offsets = iter(getLocalOffsets([p for p, c in pairs],
+                                       [c for p, c in pairs],
+                                       cache))
+
+    mod = om2.MDGModifier()
+    nodes = []
+    for parentList, child, weightList, host in zip(parents,
+                                                   children,
+                                                   weights,
+                                                   hosts):
+        wtMat_node = _createNode(
+            mod,
+            "wtAddMatrix",
+            setName(_shortName(child) + "_wtAddMatrix"))
+        fnWtMat = om2.MFnDependencyNode(wtMat_node)
+        for x, (p, weight) in enumerate(zip(parentList, weightList)):
+            wtMatrix = _nodePlug(wtMat_node, "wtMatrix", x)
+            matrixIn = wtMatrix.child(fnWtMat.attribute("matrixIn"))
+            weightIn = wtMatrix.child(fnWtMat.attribute("weightIn"))
+            worldMatrix = _findPlug(cache, p, "worldMatrix", 0)
+            if offset:
+                offset_node = _createNode(
+                    mod,
+                    "multMatrix",
+                    setName(_shortName(p) + "_offsetMultMatrix"))
+                _setMatrix(mod,
+                           _nodePlug(offset_node, "matrixIn", 0),
+                           next(offsets))
+                mod.connect(worldMatrix, _nodePlug(offset_node, "matrixIn", 1))
+                mod.connect(_nodePlug(offset_node, "matrixSum"), matrixIn)
+            else:
+                mod.connect(worldMatrix, matrixIn)
+
+            if host:
+                mod.connect(_findPlug(cache,
+                                      host,
+                                      setName(_shortName(p) + "_wtWeight")),
+                            weightIn)
+            else:
+                mod.newPlugValueFloat(weightIn, weight)
+
+        _decomposeMatrixConnect(mod,
+                                cache,
+                                _nodePlug(wtMat_node, "matrixSum"),
+                                child,
+                                transform)
+        nodes.append(wtMat_node)
+    mod.doIt()
+
+    return [om2.MFnDependencyNode(n).name() for n in nodes]
@@ -14,6 +14,7 @@ from mgear.vendor.Qt import QtCore, QtWidgets
 from pymel.core import datatypes
 
 from mgear import rigbits
+from mgear.rigbits import profiler
 from . import lib
 
 
@@ -22,6 +23,7 @@ from . import lib
 ##########################################################
 
 
+@profiler.profiled("eye_rigger.rig")
 def rig(eyeMesh=None,
         edgeLoop="",
         blinkH=20,
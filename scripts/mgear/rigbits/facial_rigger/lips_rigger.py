@@ -10,6 +10,7 @@ from mgear.vendor.Qt import QtCore, QtWidgets
 from pymel.core import datatypes
 
 from mgear import rigbits
+from mgear.rigbits import profiler
 from mgear.core import meshNavigation, curve, applyop, primitive, icon
 from mgear.core import transform, attribute, skin, vector
 
@@ -20,6 +21,7 @@ from . import lib
 ##########################################################
 
 
+@profiler.profiled("lips_rigger.rig")
 def rig(edge_loop="",
         up_vertex="",
         low_vertex="",
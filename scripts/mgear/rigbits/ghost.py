@@ -2,10 +2,14 @@
 
 Helper tools to create layered controls rigs
 """
+from collections import OrderedDict
+
 import pymel.core as pm
+import maya.api.OpenMaya as om2
 
 from mgear.core import node, primitive
 from mgear import rigbits
+from mgear.rigbits import profiler, rivet
 
 
 def createGhostCtl(ctl, parent=None, connect=True):
@@ -170,3 +174,357 @@ def ghostSlider(ghostControls, surface, sliderParent):
                             worldUpObject=gDriver)
 
         pm.parent(ctlGhost.getParent(), slider)
+
+
+######################################################################
+# Batch builders
+######################################################################
+
+# uvPin nodes shared by the sliders of the same surface
+GHOST_PIN_SUFFIX = "_ghostPin"
+
+
+def _getMObject(node):
+    sel = om2.MSelectionList()
+    sel.add(pm.PyNode(node).longName())
+    return sel.getDependNode(0)
+
+
+def _plug(mobj, name, index=None):
+    plug = om2.MFnDependencyNode(mobj).findPlug(name, False)
+    if index is not None:
+        plug = plug.elementByLogicalIndex(index)
+    return plug
+
+
+def _createDGNode(dagMod, typeName):
+    # MDagModifier.createNode only accepts DAG node types
+    return om2.MDGModifier.createNode(dagMod, typeName)
+
+
+def _worldMatrix(node):
+    return om2.MMatrix(pm.PyNode(node).getMatrix(worldSpace=True))
+
+
+def _setLocalMatrix(dagMod, mobj, matrix):
+    """Set the local transformation values of a transform in the modifier"""
+    tm = om2.MTransformationMatrix(matrix)
+    translation = tm.translation(om2.MSpace.kTransform)
+    rotation = tm.rotation()
+    scale = tm.scale(om2.MSpace.kTransform)
+    for axis, t, r, s in zip("XYZ",
+                             (translation.x, translation.y, translation.z),
+                             (rotation.x, rotation.y, rotation.z),
+                             scale):
+        dagMod.newPlugValueDouble(_plug(mobj, "translate" + axis), t)
+        dagMod.newPlugValueDouble(_plug(mobj, "rotate" + axis), r)
+        dagMod.newPlugValueDouble(_plug(mobj, "scale" + axis), s)
+
+
+def _createTransform(dagMod, name, parent, worldMatrix):
+    """Create a transform with the world matrix in the modifier
+
+    Args:
+        dagMod (MDagModifier): The modifier
+        name (str): The transform name
+        parent (dagNode): The parent, the matrix is relative to it
+        worldMatrix (MMatrix): The world matrix
+
+    Returns:
+        MObject: The transform
+    """
+    parentObj = _getMObject(parent) if parent else om2.MObject.kNullObj
+    mobj = dagMod.createNode("transform", parentObj)
+    dagMod.renameNode(mobj, name)
+    if parent:
+        worldMatrix = worldMatrix * _worldMatrix(parent).inverse()
+    _setLocalMatrix(dagMod, mobj, worldMatrix)
+    return mobj
+
+
+def _copyShapes(source, target):
+    """Copy the shapes of the source under the target transform
+
+    The curves are copied directly. Other shape types are duplicated.
+    """
+    shapes = source.getShapes()
+    curves = [s for s in shapes if s.type() == "nurbsCurve"]
+    fnCurve = om2.MFnNurbsCurve()
+    targetObj = _getMObject(target)
+    for shape in curves:
+        fnCurve.copy(_getMObject(shape), targetObj)
+    if len(curves) != len(shapes):
+        source2 = pm.duplicate(source)[0]
+        for shape in source2.getShapes():
+            if shape.type() != "nurbsCurve":
+                pm.parent(shape, target, r=True, s=True)
+        pm.delete(source2)
+    for shape in target.getShapes():
+        pm.rename(shape, target.name() + "Shape")
+
+
+def _connectUserDefinedChannels(dagMod, source, target):
+    """Connect the user defined channels in the modifier
+
+    The channels without contrapart or already connected in the target are
+    skipped with a warning, so the modifier doesn't fail.
+    """
+    sourceObj = _getMObject(source)
+    targetObj = _getMObject(target)
+    fnTarget = om2.MFnDependencyNode(targetObj)
+    for attr in pm.listAttr(source, ud=True) or []:
+        sourcePlug = _plug(sourceObj, attr)
+        if sourcePlug.isChild or sourcePlug.isElement:
+            continue
+        if not fnTarget.hasAttribute(attr):
+            pm.displayWarning("%s.%s don't have contrapart channel "
+                              "on %s" % (source, attr, target))
+            continue
+        targetPlug = _plug(targetObj, attr)
+        if targetPlug.isDestination or targetPlug.isLocked:
+            pm.displayWarning("%s.%s is already connected or locked"
+                              % (target, attr))
+            continue
+        dagMod.connect(sourcePlug, targetPlug)
+
+
+@profiler.profiled()
+def createGhostCtlBatch(ctls, parent=None, connect=True):
+    """Create a duplicated Ghost control for each control
+
+    Batch version of createGhostCtl. The controls are duplicated with one
+    command and the NPOs, parenting and connections are done with one
+    modifier. The sets are updated once per set.
+
+    Args:
+        ctls (list of dagNode): Original Controls to duplicate
+        parent (dagNode, optional): Parent for the new created controls
+        connect (bool, optional): If True will connect the local transforms
+            and the user defined channels
+
+    Returns:
+        list of pyNode: The new created controls, in the same order
+    """
+    ctls = [pm.PyNode(c) for c in ctls]
+    if not ctls:
+        return []
+    if parent:
+        parent = pm.PyNode(parent)
+
+    # Read
+    setMembers = OrderedDict()
+    for ctl in ctls:
+        for grp in ctl.listConnections(t="objectSet"):
+            setMembers.setdefault(grp, []).append(ctl)
+    names = [ctl.nodeName() for ctl in ctls]
+    npoMatrices = [_worldMatrix(ctl.getParent()) if ctl.getParent()
+                   else om2.MMatrix() for ctl in ctls]
+
+    for grp, members in setMembers.items():
+        pm.sets(grp, remove=members)
+
+    dagMod = om2.MDagModifier()
+    for ctl, name in zip(ctls, names):
+        dagMod.renameNode(_getMObject(ctl), name + "_ghost")
+    dagMod.doIt()
+
+    newCtls = [pm.PyNode(n) for n in pm.duplicate(ctls, po=True)]
+    for ctl, newCtl, name in zip(ctls, newCtls, names):
+        pm.rename(newCtl, name)
+        _copyShapes(ctl, newCtl)
+
+    # Edit
+    dagMod = om2.MDagModifier()
+    for ctl, newCtl, npoMatrix in zip(ctls, newCtls, npoMatrices):
+        newObj = _getMObject(newCtl)
+        if parent:
+            npo = _createTransform(dagMod,
+                                   newCtl.nodeName() + "_npo",
+                                   parent,
+                                   npoMatrix)
+            dagMod.reparentNode(newObj, npo)
+        if connect:
+            ctlObj = _getMObject(ctl)
+            for attr in ("translate", "rotate", "scale"):
+                dagMod.connect(_plug(newObj, attr), _plug(ctlObj, attr))
+            _connectUserDefinedChannels(dagMod, newCtl, ctl)
+    dagMod.doIt()
+
+    ctlMap = dict(zip(ctls, newCtls))
+    for grp, members in setMembers.items():
+        pm.sets(grp, add=[ctlMap[c] for c in members])
+
+    # add control tag
+    for newCtl in newCtls:
+        node.add_controller_tag(newCtl, parent)
+
+    return newCtls
+
+
+def _getGhostPin(dagMod, surfaceShape):
+    """Return the uvPin shared by the ghost sliders of the surface
+
+    A new uvPin is created in the modifier if the surface doesn't have one.
+
+    Returns:
+        tuple: The uvPin MObject and the next free coordinate index
+    """
+    for pin in surfaceShape.attr("worldSpace[0]").listConnections(
+            d=True, s=False, type="uvPin"):
+        if pin.nodeName().endswith(GHOST_PIN_SUFFIX):
+            indices = pin.attr("coordinate").getArrayIndices()
+            return _getMObject(pin), max(indices) + 1 if indices else 0
+
+    pin = _createDGNode(dagMod, "uvPin")
+    dagMod.renameNode(pin, surfaceShape.getParent().nodeName()
+                      + GHOST_PIN_SUFFIX)
+    dagMod.connect(_plug(_getMObject(surfaceShape), "worldSpace", 0),
+                   _plug(pin, "deformedGeometry"))
+    dagMod.newPlugValueBool(_plug(pin, "normalizedIsoParms"), False)
+    # normal Z, tangent Y, like the normalConstraint of the slider
+    dagMod.newPlugValueInt(_plug(pin, "normalAxis"), 2)
+    dagMod.newPlugValueInt(_plug(pin, "tangentAxis"), 1)
+    return pin, 0
+
+
+@profiler.profiled()
+def ghostSliderBatch(ghostControls, surface, sliderParent, shared=True):
+    """Make a list of ghost controls slide on top of a surface
+
+    Batch version of ghostSlider. The slider networks are created with one
+    modifier and the existing connections are checked before the edit, so
+    no connection is done or removed by trial.
+
+    With shared=True all the sliders of the surface use the same uvPin
+    node (Maya 2020+) to compute the position and orientation on the
+    surface, instead of one normalConstraint per slider. Each slider still
+    needs a closestPointOnSurface node, since the node has only one input
+    position. The rotation of the control is applied to the ghost control,
+    on top of the surface orientation. If uvPin is not available the
+    sliders use the normalConstraint like ghostSlider.
+
+    Args:
+        ghostControls (list of dagNode): The ghost controls
+        surface (Surface): The NURBS surface
+        sliderParent (dagNode): The parent for the sliders
+        shared (bool, optional): If True the sliders share one uvPin node
+
+    Returns:
+        list of pyNode: The sliders, in the same order
+    """
+    if not isinstance(ghostControls, list):
+        ghostControls = [ghostControls]
+    ghostControls = [pm.PyNode(g) for g in ghostControls]
+    if not ghostControls:
+        return []
+    surface = pm.PyNode(surface)
+    surfaceShape = surface.getShape()
+    sliderParent = pm.PyNode(sliderParent)
+    if shared and not rivet.hasPinSupport():
+        pm.displayWarning("uvPin node not available, using normal "
+                          "constraints")
+        shared = False
+    slideAttrs = ["translate", "scale"]
+    if not shared:
+        slideAttrs.append("rotate")
+
+    # Read
+    data = []
+    for ctlGhost in ghostControls:
+        ctl = pm.listConnections(ctlGhost, t="transform")[-1]
+        connected = {}
+        for attr in slideAttrs:
+            plug = _plug(_getMObject(ctlGhost), attr)
+            source = plug.source()
+            connected[attr] = (not source.isNull
+                               and source.node() == _getMObject(ctl))
+        # the npo takes the ghost local transformation, except the
+        # channels still driven by the control
+        local = om2.MTransformationMatrix(
+            om2.MMatrix(ctlGhost.getMatrix()))
+        if shared:
+            local.setRotation(om2.MEulerRotation())
+        npoMatrix = local.asMatrix() * _worldMatrix(ctlGhost.getParent())
+        data.append((ctlGhost, ctl, _worldMatrix(ctl), connected, npoMatrix))
+
+    # Edit
+    dagMod = om2.MDagModifier()
+    surfaceObj = _getMObject(surfaceShape)
+    if shared:
+        pin, index = _getGhostPin(dagMod, surfaceShape)
+        fnPin = om2.MFnDependencyNode(pin)
+    sliders = []
+    drivers = []
+    for ctlGhost, ctl, t, connected, npoMatrix in data:
+        ghostObj = _getMObject(ctlGhost)
+        ctlObj = _getMObject(ctl)
+        gDriver = _createTransform(dagMod,
+                                   ctl.nodeName() + "_slideDriver",
+                                   ctlGhost.getParent(),
+                                   t)
+        for attr in slideAttrs:
+            dagMod.connect(_plug(ctlObj, attr), _plug(gDriver, attr))
+            if connected[attr]:
+                dagMod.disconnect(_plug(ctlObj, attr), _plug(ghostObj, attr))
+
+        dm_node = _createDGNode(dagMod, "decomposeMatrix")
+        cps_node = _createDGNode(dagMod, "closestPointOnSurface")
+        dagMod.connect(_plug(gDriver, "worldMatrix", 0),
+                       _plug(dm_node, "inputMatrix"))
+        dagMod.connect(_plug(dm_node, "outputTranslate"),
+                       _plug(cps_node, "inPosition"))
+        dagMod.connect(_plug(surfaceObj, "worldSpace", 0),
+                       _plug(cps_node, "inputSurface"))
+
+        if shared:
+            slider = _createTransform(dagMod,
+                                      ctl.nodeName() + "_slideDriven",
+                                      sliderParent,
+                                      _worldMatrix(sliderParent))
+            coordinate = _plug(pin, "coordinate", index)
+            dagMod.connect(_plug(cps_node, "parameterU"),
+                           coordinate.child(fnPin.attribute("coordinateU")))
+            dagMod.connect(_plug(cps_node, "parameterV"),
+                           coordinate.child(fnPin.attribute("coordinateV")))
+            dagMod.connect(_plug(pin, "outputMatrix", index),
+                           _plug(slider, "offsetParentMatrix"))
+            index += 1
+        else:
+            slider = _createTransform(dagMod,
+                                      ctl.nodeName() + "_slideDriven",
+                                      sliderParent,
+                                      t)
+            dagMod.connect(_plug(cps_node, "position"),
+                           _plug(slider, "translate"))
+        sliders.append(slider)
+        drivers.append(gDriver)
+    dagMod.doIt()
+
+    sliders = [pm.PyNode(om2.MFnDagNode(s).fullPathName()) for s in sliders]
+    drivers = [pm.PyNode(om2.MFnDagNode(d).fullPathName()) for d in drivers]
+    if not shared:
+        for slider, gDriver in zip(sliders, drivers):
+            pm.normalConstraint(surfaceShape,
+                                slider,
+                                aimVector=[0, 0, 1],
+                                upVector=[0, 1, 0],
+                                worldUpType="objectrotation",
+                                worldUpVector=[0, 1, 0],
+                                worldUpObject=gDriver)
+
+    # the sliders are evaluated now, the npos keep the ghosts world pose
+    dagMod = om2.MDagModifier()
+    for (ctlGhost, ctl, t, connected, npoMatrix), slider in zip(data,
+                                                                 sliders):
+        npoName = "_".join(ctlGhost.name().split("_")[:-1]) + "_npo"
+        npo = _createTransform(dagMod, npoName, slider, npoMatrix)
+        ghostObj = _getMObject(ctlGhost)
+        dagMod.reparentNode(ghostObj, npo)
+        for attr in slideAttrs:
+            value = 1.0 if attr == "scale" else 0.0
+            for axis in "XYZ":
+                dagMod.newPlugValueDouble(_plug(ghostObj, attr + axis),
+                                          value)
+    dagMod.doIt()
+
+    return sliders
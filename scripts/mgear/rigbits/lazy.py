@@ -0,0 +1,152 @@
+"""Rigbits lazy loading
+
+The rigbits menu commands load the tool modules only when the command is
+first used. The import time of each module loaded with this facade is
+recorded, and the heavy UI modules can be pre-warmed, one module per idle
+event, after Maya startup.
+
+Example::
+
+    from mgear.rigbits import lazy
+    lazy.run("mgear.rigbits.rope", "rope_UI")
+    print(lazy.report())
+"""
+
+import importlib
+import sys
+from collections import OrderedDict
+from timeit import default_timer
+
+# heavy tool modules imported by prewarm
+HEAVY_MODULES = ("mgear.rigbits.rbf_manager_ui",
+                 "mgear.rigbits.sdk_manager.SDK_manager_ui",
+                 "mgear.rigbits.facial_rigger",
+                 "mgear.rigbits.channelWrangler",
+                 "mgear.rigbits.mirror_controls",
+                 "mgear.rigbits.postSpring",
+                 "mgear.rigbits.rope")
+
+# module name -> import time in seconds
+_import_times = OrderedDict()
+
+
+def load(name):
+    """Import the module and record the import time
+
+    Args:
+        name (str): The full module name. i.e: "mgear.rigbits.rope"
+
+    Returns:
+        module: The module
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = default_timer()
+    module = importlib.import_module(name)
+    _import_times[name] = default_timer() - start
+    return module
+
+
+def run(name, func, *args, **kwargs):
+    """Load the module and call the function
+
+    Args:
+        name (str): The full module name
+        func (str): The function name
+        *args: The function arguments
+        **kwargs: The function keyword arguments
+
+    Returns:
+        The function return
+    """
+    return getattr(load(name), func)(*args, **kwargs)
+
+
+def command(name, func, *args):
+    """Return a menu command string calling the function lazily
+
+    Args:
+        name (str): The full module name
+        func (str): The function name
+        *args: The function arguments, must have a valid repr
+
+    Returns:
+        str: The command
+    """
+    arguments = "".join(", {!r}".format(a) for a in args)
+    return ("from mgear.rigbits import lazy\n"
+            "lazy.run({!r}, {!r}{})".format(name, func, arguments))
+
+
+class LazyModule(object):
+    """Module proxy, the module is loaded on the first attribute access
+
+    Args:
+        name (str): The full module name
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+
+    def __getattr__(self, attr):
+        return getattr(load(self._name), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._name in sys.modules else "not loaded"
+        return "<LazyModule {} ({})>".format(self._name, state)
+
+
+def import_times():
+    """Return the import time of the modules loaded with the facade
+
+    Returns:
+        OrderedDict: module name -> seconds, in load order
+    """
+    return OrderedDict(_import_times)
+
+
+def report():
+    """Return the import times formatted as a table
+
+    Returns:
+        str: The table
+    """
+    if not _import_times:
+        return "No modules loaded"
+    width = max(len(name) for name in _import_times) + 2
+    lines = ["Module".ljust(width) + "Import s".rjust(10)]
+    for name, elapsed in _import_times.items():
+        lines.append(name.ljust(width) + ("%.4f" % elapsed).rjust(10))
+    lines.append("Total".ljust(width)
+                 + ("%.4f" % sum(_import_times.values())).rjust(10))
+    return "\n".join(lines)
+
+
+def prewarm(modules=HEAVY_MODULES):
+    """Import the modules on idle, one module per idle event
+
+    The imports run in the main thread, since Qt and PyMEL modules can't be
+    imported safely from other threads, but only when Maya is idle.
+
+    Args:
+        modules (list of str, optional): The full modules names
+    """
+    import maya.cmds as cmds
+
+    pending = [name for name in modules if name not in sys.modules]
+
+    def load_next():
+        if not pending:
+            return
+        name = pending.pop(0)
+        try:
+            load(name)
+        except Exception as e:
+            cmds.warning("Rigbits prewarm, can't import {}: {}".format(name,
+                                                                      e))
+        if pending:
+            cmds.evalDeferred(load_next, lowestPriority=True)
+
+    if pending:
+        cmds.evalDeferred(load_next, lowestPriority=True)
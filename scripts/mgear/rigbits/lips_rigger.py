@@ -10,6 +10,7 @@ from mgear.vendor.Qt import QtCore, QtWidgets
 from pymel.core import datatypes
 
 from mgear import rigbits
+from mgear.rigbits import profiler
 from mgear.core import meshNavigation, curve, applyop, primitive, icon
 from mgear.core import transform, attribute, skin, vector
 
@@ -18,6 +19,7 @@ from mgear.core import transform, attribute, skin, vector
 ##########################################################
 
 
+@profiler.profiled()
 def lipsRig(eLoop,
             upVertex,
             lowVertex,
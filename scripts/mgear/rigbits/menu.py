@@ -1,17 +1,24 @@
-import pymel.core as pm
+import maya.cmds as cmds
 import mgear
 
 from mgear.core import string
+from mgear.rigbits import lazy
 
 
 menuID = "Rigbits"
 
 
-def install():
+def install(prewarm=False):
     """Install Rigbits submenu
+
+    The commands import the tool modules the first time are used.
+
+    Args:
+        prewarm (bool, optional): If True, the heavy tool modules are
+            imported when Maya is idle
     """
-    pm.setParent(mgear.menu_id, menu=True)
-    pm.menuItem(divider=True)
+    cmds.setParent(mgear.menu_id, menu=True)
+    cmds.menuItem(divider=True)
     commands = (
         ("Add NPO", str_add_NPO),
         ("-----", None),
@@ -54,6 +61,9 @@ def install():
 
     mgear.menu.install(menuID, commands)
 
+    if prewarm:
+        lazy.prewarm()
+
 
 def connect_submenu(parent_menu_id):
     """Create the connect local Scale, rotation and translation submenu
@@ -122,8 +132,8 @@ def _ctl_submenu(parent_menu_id, name, cCtl=False):
     commands = []
     for c in ctls:
         cm = string.removeInvalidCharacter(c).lower()
-        commands.append([c, "rigbits.createCTL('{0}', {1})".format(cm,
-                                                                   str(cCtl))])
+        commands.append(
+            [c, lazy.command("mgear.rigbits", "createCTL", cm, cCtl)])
     mgear.menu.install(name, commands, parent_menu_id)
 
 
@@ -148,167 +158,88 @@ def cCtl_sub(parent_menu_id):
 def install_utils_menu(m):
     """Install rigbit utils submenu
     """
-    pm.setParent(m, menu=True)
-    pm.menuItem(divider=True)
-    pm.menuItem(label="Create mGear Hotkeys", command=str_createHotkeys)
+    cmds.setParent(m, menu=True)
+    cmds.menuItem(divider=True)
+    cmds.menuItem(label="Create mGear Hotkeys", command=str_createHotkeys)
 
 
 # menu str commands
 
-str_add_NPO = """
-from mgear import rigbits
-rigbits.addNPO()
-"""
-
-str_mirror_ctls = """
-from mgear.rigbits import mirror_controls
-mirror_controls.show()
-"""
-
-str_replace_shape = """
-from mgear import rigbits
-rigbits.replaceShape()
-"""
-
-str_matchWorldXform = """
-from mgear import rigbits
-rigbits.matchWorldXform()
-"""
-
-str_matchPosfromBBox = """
-from mgear import rigbits
-rigbits.matchPosfromBBox()
-"""
-
-str_alignToPointsLoop = """
-from mgear import rigbits
-rigbits.alignToPointsLoop()
-"""
-
-str_duplicateSym = """
-from mgear import rigbits
-rigbits.duplicateSym()
-"""
-
-str_rbf_manager_ui = """
-from mgear.rigbits import rbf_manager_ui
-rbf_manager_ui.show()
-"""
-
-str_SDK_manager_ui = """
-from mgear.rigbits.sdk_manager import SDK_manager_ui
-SDK_manager_ui.show()
-"""
-
-str_spaceJump = """
-from mgear import rigbits
-rigbits.spaceJump()
-"""
-
-str_createInterpolateTransform = """
-from mgear import rigbits
-rigbits.createInterpolateTransform()
-"""
-
-str_spring_UI = """
-from mgear.rigbits import postSpring
-postSpring.spring_UI()
-"""
-
-str_rope_UI = """
-from mgear.rigbits import rope
-rope.rope_UI()
-"""
-
-str_openChannelWrangler = """
-from mgear.rigbits import channelWrangler
-channelWrangler.openChannelWrangler()
-"""
-
-str_facial_rigger = """
-from mgear.rigbits import facial_rigger
-facial_rigger.show()
-"""
-
-str_proxySlicer = """
-from mgear.rigbits import proxySlicer
-proxySlicer.slice()
-"""
-
-str_proxySlicer_parent = """
-from mgear.rigbits import proxySlicer
-proxySlicer.slice(True)
-"""
-
-
-str_bakeSprings = """
-from mgear.core.anim_utils import bakeSprings
-bakeSprings()
-"""
-
-str_clearSprings = """
-from mgear.core.anim_utils import clearSprings
-clearSprings()
-"""
+str_add_NPO = lazy.command("mgear.rigbits", "addNPO")
+
+str_mirror_ctls = lazy.command("mgear.rigbits.mirror_controls", "show")
+
+str_replace_shape = lazy.command("mgear.rigbits", "replaceShape")
+
+str_matchWorldXform = lazy.command("mgear.rigbits", "matchWorldXform")
+
+str_matchPosfromBBox = lazy.command("mgear.rigbits", "matchPosfromBBox")
+
+str_alignToPointsLoop = lazy.command("mgear.rigbits", "alignToPointsLoop")
+
+str_duplicateSym = lazy.command("mgear.rigbits", "duplicateSym")
+
+str_rbf_manager_ui = lazy.command("mgear.rigbits.rbf_manager_ui", "show")
+
+str_SDK_manager_ui = lazy.command(
+    "mgear.rigbits.sdk_manager.SDK_manager_ui", "show")
+
+str_spaceJump = lazy.command("mgear.rigbits", "spaceJump")
+
+str_createInterpolateTransform = lazy.command(
+    "mgear.rigbits", "createInterpolateTransform")
+
+str_spring_UI = lazy.command("mgear.rigbits.postSpring", "spring_UI")
+
+str_rope_UI = lazy.command("mgear.rigbits.rope", "rope_UI")
+
+str_openChannelWrangler = lazy.command(
+    "mgear.rigbits.channelWrangler", "openChannelWrangler")
+
+str_facial_rigger = lazy.command("mgear.rigbits.facial_rigger", "show")
+
+str_proxySlicer = lazy.command("mgear.rigbits.proxySlicer", "slice")
+
+str_proxySlicer_parent = lazy.command(
+    "mgear.rigbits.proxySlicer", "slice", True)
+
+
+str_bakeSprings = lazy.command("mgear.core.anim_utils", "bakeSprings")
+
+str_clearSprings = lazy.command("mgear.core.anim_utils", "clearSprings")
 
 
 # connect str commands
 
-str_connect_SRT = """
-from mgear import rigbits
-rigbits.connectLocalTransform(None, 1, 1, 1)
-"""
+str_connect_SRT = lazy.command(
+    "mgear.rigbits", "connectLocalTransform", None, 1, 1, 1)
 
-str_connect_S = """
-from mgear import rigbits
-rigbits.connectLocalTransform(None, 1, 0, 0)
-"""
+str_connect_S = lazy.command(
+    "mgear.rigbits", "connectLocalTransform", None, 1, 0, 0)
 
-str_connect_R = """
-from mgear import rigbits
-rigbits.connectLocalTransform(None, 0, 1, 0)
-"""
+str_connect_R = lazy.command(
+    "mgear.rigbits", "connectLocalTransform", None, 0, 1, 0)
 
-str_connect_T = """
-from mgear import rigbits
-rigbits.connectLocalTransform(None, 0, 0, 1)
-"""
+str_connect_T = lazy.command(
+    "mgear.rigbits", "connectLocalTransform", None, 0, 0, 1)
 
 
 # legacy facial str commands
 
-str_eye_rigger = """
-from mgear.rigbits import eye_rigger
-eye_rigger.showEyeRigUI()
-"""
+str_eye_rigger = lazy.command("mgear.rigbits.eye_rigger", "showEyeRigUI")
 
-str_lips_rigger = """
-from mgear.rigbits import lips_rigger
-lips_rigger.showLipRigUI()
-"""
+str_lips_rigger = lazy.command("mgear.rigbits.lips_rigger", "showLipRigUI")
 
 
 # Gimmick joints str commands
 
-str_addJnt = """
-from mgear import rigbits
-rigbits.addJnt()
-"""
+str_addJnt = lazy.command("mgear.rigbits", "addJnt")
 
-str_addBlendedJoint = """
-from mgear import rigbits
-rigbits.addBlendedJoint()
-"""
+str_addBlendedJoint = lazy.command("mgear.rigbits", "addBlendedJoint")
 
-str_addSupportJoint = """
-from mgear import rigbits
-rigbits.addSupportJoint()
-"""
+str_addSupportJoint = lazy.command("mgear.rigbits", "addSupportJoint")
 
 
 # hotkeys str command
 
-str_createHotkeys = """
-from mgear.rigbits import utils
-utils.createHotkeys()
-"""
+str_createHotkeys = lazy.command("mgear.rigbits.utils", "createHotkeys")
@@ -1,7 +1,11 @@
 import pymel.core as pc
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
 from maya.app.general.mayaMixin import MayaQWidgetDockableMixin
 
 import mgear
+from mgear.rigbits import rig_index
+from mgear.rigbits import symmetry
 from mgear.vendor.Qt import QtCore, QtWidgets
 
 
@@ -15,37 +19,26 @@ def mirror_selection():
     mirror_pairs(pairs)
 
 
-def get_controls_without_string(exclusion_string):
-    nodes = []
-
-    # Find controllers set
-    rig_models = [
-        item for item in pc.ls(transforms=True) if item.hasAttr("is_rig")
-    ]
-    controllers_set = None
-    for node in rig_models[0].rigGroups.inputs():
-        if node.name().endswith("controllers_grp"):
-            controllers_set = node
-            break
-
-    # Collect all transforms from set and subsets.
-    nodes = []
-    for node in controllers_set.members():
-        if node.nodeType() == "objectSet":
-            nodes.extend(node.members())
-        else:
-            nodes.append(node)
+def get_controls_without_string(exclusion_string, index=None):
+    """Return the rig controls without the string in the name
 
-    # Find all nodes without exclusion_string
-    nodes = [x for x in nodes if exclusion_string not in x.name()]
+    Args:
+        exclusion_string (str): The string to exclude. i.e: "_R"
+        index (ControlIndex, optional): The rig control index to use. By
+            default the scene index
 
-    return nodes
+    Returns:
+        list of PyNode: The controls
+    """
+    index = index or rig_index.get_index()
+    exclude = rig_index.substring_pattern(exclusion_string)
+    return [pc.PyNode(name) for name in index.controls(exclude=exclude)]
 
 
 def get_opposite_control(node):
-    target_name = mgear.core.string.convertRLName(node.name())
+    target_name = symmetry.getSymmetryMap().mirrorNode(node.name())
     target = None
-    if pc.objExists(target_name):
+    if target_name:
         target = pc.PyNode(target_name)
     return target
 
@@ -70,41 +63,179 @@ def mirror_right_to_left():
     mirror_pairs(pairs)
 
 
-def mirror_pairs(pairs):
-    # Modify control shapes
+def mirror_pairs(pairs, dry_run=False):
+    """Mirror the control shapes from the source to the target.
+
+    The source CVs are mirrored on the world X axis and computed in the
+    target local space. All the shapes are read in one pass and the
+    targets are written in one batch without temporary nodes.
+
+    Args:
+        pairs (list): [source, target] pairs
+        dry_run (bool, optional): If True the targets are not modified
+
+    Returns:
+        dict: target name -> list of the mirrored shapes data
+    """
+    # Read
+    shapes_data = []
     for source, target in pairs:
-        # Copy shapes
-        source_copy = pc.duplicate(source)[0]
-        mgear.core.attribute.setKeyableAttributes(
-            source_copy,
-            ["tx", "ty", "tz", "ro", "rx", "ry", "rz", "sx", "sy", "sz"]
-        )
-
-        # Delete children except shapes
-        for child in source_copy.getChildren():
-            if child.nodeType() != "nurbsCurve":
-                pc.delete(child)
-
-        # Mirror
-        pc.select(clear=True)
-        grp = pc.group(world=True)
-        pc.parent(source_copy, grp)
-        grp.scaleX.set(-1)
-
-        # Reparent, freeze transforms and match color
-        pc.parent(source_copy, target)
-        pc.makeIdentity(source_copy, apply=True, t=1, r=1, s=1, n=0)
-        pc.parent(source_copy, target.getParent())
-        mgear.core.curve.set_color(
-            source_copy, mgear.core.curve.get_color(target)
-        )
-
-        # Replace shape
-        mgear.rigbits.replaceShape(source_copy, [target])
-
-        # Clean up
-        pc.delete(grp)
-        pc.delete(source_copy)
+        source_path = _get_dag_path(source)
+        target_path = _get_dag_path(target)
+        shapes_data.append(
+            (target_path,
+             get_shapes_data(source_path),
+             _matrix_to_list(source_path.inclusiveMatrix()),
+             _matrix_to_list(target_path.inclusiveMatrixInverse())))
+
+    # Compute
+    result = {}
+    for target_path, shapes, source_matrix, target_inverse in shapes_data:
+        result[target_path.partialPathName()] = mirror_shapes_data(
+            shapes, source_matrix, target_inverse)
+
+    # Write
+    if not dry_run:
+        for target_path, shapes, source_matrix, target_inverse in shapes_data:
+            set_shapes_data(target_path.fullPathName(),
+                            result[target_path.partialPathName()])
+
+    return result
+
+
+# Mirror engine -------------------------------------------------------
+
+# world X axis mirror
+MIRROR_MATRIX = [-1.0, 0.0, 0.0, 0.0,
+                 0.0, 1.0, 0.0, 0.0,
+                 0.0, 0.0, 1.0, 0.0,
+                 0.0, 0.0, 0.0, 1.0]
+
+
+def _get_dag_path(node):
+    sel = om2.MSelectionList()
+    sel.add(str(node))
+    return sel.getDagPath(0)
+
+
+def _matrix_to_list(matrix):
+    return [matrix.getElement(i, j) for i in range(4) for j in range(4)]
+
+
+def mult_matrix(a, b):
+    """Multiply two 4x4 matrices stored as 16 items row major lists"""
+    return [sum(a[i * 4 + k] * b[k * 4 + j] for k in range(4))
+            for i in range(4) for j in range(4)]
+
+
+def transform_points(points, matrix):
+    """Transform the points by the matrix. Row vector convention
+
+    Args:
+        points (list): (x, y, z) points
+        matrix (list): 16 items row major matrix
+
+    Returns:
+        list: The transformed (x, y, z) points
+    """
+    m = matrix
+    return [(x * m[0] + y * m[4] + z * m[8] + m[12],
+             x * m[1] + y * m[5] + z * m[9] + m[13],
+             x * m[2] + y * m[6] + z * m[10] + m[14])
+            for x, y, z in points]
+
+
+def get_shapes_data(dag_path):
+    """Return the nurbsCurve shapes data of a transform
+
+    Args:
+        dag_path (MDagPath): The transform
+
+    Returns:
+        list of dict: degree, form, knots and object space cvs of each
+            shape
+    """
+    shapes = []
+    for i in range(dag_path.numberOfShapesDirectlyBelow()):
+        shape_path = om2.MDagPath(dag_path)
+        shape_path.extendToShape(i)
+        if not shape_path.hasFn(om2.MFn.kNurbsCurve):
+            continue
+        fn_curve = om2.MFnNurbsCurve(shape_path)
+        if fn_curve.isIntermediateObject:
+            continue
+        shapes.append({
+            "degree": fn_curve.degree,
+            # api form is 1 based: open, closed and periodic
+            "form": fn_curve.form - 1,
+            "knots": list(fn_curve.knots()),
+            "cvs": [(p.x, p.y, p.z)
+                    for p in fn_curve.cvPositions(om2.MSpace.kObject)]})
+    return shapes
+
+
+def mirror_shapes_data(shapes, source_matrix, target_inverse_matrix):
+    """Mirror the shapes data from the source to the target local space
+
+    Args:
+        shapes (list of dict): The source shapes data
+        source_matrix (list): The source world matrix
+        target_inverse_matrix (list): The target world inverse matrix
+
+    Returns:
+        list of dict: The mirrored shapes data
+    """
+    matrix = mult_matrix(mult_matrix(source_matrix, MIRROR_MATRIX),
+                         target_inverse_matrix)
+    mirrored = []
+    for shape in shapes:
+        shape = dict(shape)
+        shape["cvs"] = transform_points(shape["cvs"], matrix)
+        mirrored.append(shape)
+    return mirrored
+
+
+def set_shapes_data(target, shapes):
+    """Write the shapes data in the target curve shapes
+
+    The existing shapes are reused, the missing shapes are created and the
+    extra shapes deleted.
+
+    Args:
+        target (str): The target transform
+        shapes (list of dict): The shapes data
+    """
+    target_shapes = cmds.listRelatives(
+        target, shapes=True, type="nurbsCurve", fullPath=True, ni=True) or []
+    color = None
+    for i, shape in enumerate(shapes):
+        if i < len(target_shapes):
+            shape_node = target_shapes[i]
+        else:
+            if color is None:
+                color = mgear.core.curve.get_color(target)
+            shape_node = cmds.createNode(
+                "nurbsCurve",
+                name="{}_{}_Shape".format(target.split("|")[-1], i),
+                parent=target)
+        # same layout than the nurbsCurve data in the .ma files
+        knots = shape["knots"]
+        cvs = shape["cvs"]
+        cmds.setAttr(shape_node + ".create",
+                     shape["degree"],
+                     len(knots) - 2 * shape["degree"] + 1,
+                     shape["form"],
+                     False,
+                     3,
+                     len(knots),
+                     knots,
+                     len(cvs),
+                     *cvs,
+                     type="nurbsCurve")
+    if len(target_shapes) > len(shapes):
+        cmds.delete(target_shapes[len(shapes):])
+    if color is not None:
+        mgear.core.curve.set_color(pc.PyNode(target), color)
 
 
 class mirror_controls_ui(MayaQWidgetDockableMixin, QtWidgets.QDialog):
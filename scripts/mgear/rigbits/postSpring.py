@@ -203,6 +203,8 @@ def spring_UI(*args):
     pm.separator(h=10)
     pm.separator(h=10)
     pm.button(label="Baker", w=50, h=50, command=bake_spring)
+    pm.button(label="Cache", w=50, h=50, command=cache_spring)
+    pm.button(label="Remove Cache", w=50, h=50, command=remove_spring_cache)
 
     pm.showWindow(window)
 
@@ -222,3 +224,31 @@ def build_spring(*args):
 def bake_spring(*args):
     """Shortcut fro the Maya's Bake Simulation Options"""
     pm.BakeSimulationOptions()
+
+
+def cache_spring(*args):
+    """Simulate the scene springs in the playback range to a cache file
+
+    The cache is keyed in the spring rigs and played with the spring
+    active channel set to 0. The rest keys are restored by
+    remove_spring_cache.
+    """
+    from mgear.rigbits import spring_cache
+
+    filePath = pm.fileDialog2(dialogStyle=2,
+                              fileMode=0,
+                              caption="Spring cache",
+                              fileFilter="Spring cache .npy (*.npy)")
+    if not filePath:
+        return
+    cache = spring_cache.cache_springs(filePath[0])
+    spring_cache.apply_cache(cache)
+    pm.displayInfo("Spring cache: {} springs, {} frames".format(
+        len(cache.names), len(cache)))
+
+
+def remove_spring_cache(*args):
+    """Delete the spring cache keys and restore the rest keys"""
+    from mgear.rigbits import spring_cache
+
+    spring_cache.remove_cache()
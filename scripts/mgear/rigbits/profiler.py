@@ -0,0 +1,511 @@
+"""Rigbits build profiler
+
+Opt-in instrumentation for the rigbits builders. Nothing is recorded unless
+a profiling session is active, so the decorated builders only pay for one
+global lookup when profiling is disabled.
+
+Example:
+    >>> from mgear.rigbits import profiler
+    >>> with profiler.session("face") as report:
+    ...     with profiler.stage("setup"):
+    ...         pass
+    >>> report.stages["setup"].calls
+    1
+
+In Maya::
+
+    from mgear.rigbits import profiler
+    from mgear.rigbits import eye_rigger
+
+    with profiler.session("eyes_build") as report:
+        eye_rigger.eyesFromfile(path)
+
+    print(report.table())
+    report.save("/tmp/eyes_build.json")
+
+"""
+
+import json
+import functools
+import threading
+from collections import Counter, OrderedDict
+from timeit import default_timer
+
+
+# active session, None when profiling is disabled
+_session = None
+
+# modules with the commands that we count while a session is active
+COMMAND_MODULES = ("maya.cmds", "pymel.core")
+
+# string attribute with the name of the builder that created the node
+PROVENANCE_ATTR = "rigbits_builder"
+
+
+######################################################################
+# Report
+######################################################################
+
+class StageRecord(object):
+    """Aggregated timing for one stage path"""
+
+    __slots__ = ("calls", "total", "minimum", "maximum")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+
+    def add(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        if self.minimum is None or elapsed < self.minimum:
+            self.minimum = elapsed
+        if elapsed > self.maximum:
+            self.maximum = elapsed
+
+    @property
+    def mean(self):
+        if not self.calls:
+            return 0.0
+        return self.total / self.calls
+
+    def as_dict(self):
+        return {"calls": self.calls,
+                "total": self.total,
+                "mean": self.mean,
+                "min": self.minimum or 0.0,
+                "max": self.maximum}
+
+
+class BuildReport(object):
+    """Wall time, command counts and created nodes for a build
+
+    Stages are stored by path, the nested stage names joined with "/".
+    i.e: "eyeRig/createRivetTweak"
+
+    Attributes:
+        name (str): Name of the build
+        stages (OrderedDict): stage path -> StageRecord
+        commands (Counter): Maya command name -> number of calls
+        nodes (Counter): node type -> number of created nodes
+        total (float): Wall time of the whole session in seconds
+    """
+
+    def __init__(self, name="build"):
+        self.name = name
+        self.stages = OrderedDict()
+        self.commands = Counter()
+        self.nodes = Counter()
+        self.total = 0.0
+
+    def get_stage(self, path):
+        """Return the record for the stage path, created if doesn't exist"""
+        record = self.stages.get(path)
+        if record is None:
+            record = self.stages[path] = StageRecord()
+        return record
+
+    def add_stage(self, path, elapsed):
+        self.get_stage(path).add(elapsed)
+
+    def as_dict(self):
+        """Return the report as a json serializable dictionary"""
+        return {"name": self.name,
+                "total": self.total,
+                "stages": OrderedDict((k, v.as_dict())
+                                      for k, v in self.stages.items()),
+                "commands": dict(self.commands),
+                "nodes": dict(self.nodes)}
+
+    def to_json(self, indent=4):
+        return json.dumps(self.as_dict(), indent=indent)
+
+    def save(self, filePath):
+        """Write the report as json file
+
+        Args:
+            filePath (str): Destination path
+        """
+        with open(filePath, "w") as f:
+            f.write(self.to_json())
+
+    def table(self, top=20):
+        """Return the report formatted as a console table
+
+        Args:
+            top (int, optional): Max number of commands and node types listed
+
+        Returns:
+            str: The report table
+        """
+        width = max([len(p) for p in self.stages] + [len("Stage")]) + 2
+        lines = ["=" * (width + 40),
+                 "Build profile: %s [ %.3f s ]" % (self.name, self.total),
+                 "=" * (width + 40),
+                 "Stage".ljust(width)
+                 + "Calls".rjust(8)
+                 + "Total s".rjust(12)
+                 + "Mean s".rjust(12)
+                 + "  %"]
+        for path, record in self.stages.items():
+            percent = 0.0
+            if self.total:
+                percent = record.total * 100.0 / self.total
+            lines.append(path.ljust(width)
+                         + str(record.calls).rjust(8)
+                         + ("%.4f" % record.total).rjust(12)
+                         + ("%.4f" % record.mean).rjust(12)
+                         + ("%5.1f" % percent))
+
+        for title, counter in (("Commands", self.commands),
+                               ("Nodes created", self.nodes)):
+            if not counter:
+                continue
+            lines.append("-" * (width + 40))
+            lines.append("%s: %i" % (title, sum(counter.values())))
+            for key, count in counter.most_common(top):
+                lines.append("    " + key.ljust(width - 4)
+                             + str(count).rjust(8))
+
+        return "\n".join(lines)
+
+
+######################################################################
+# Collectors
+######################################################################
+
+class _CommandCounter(object):
+    """Wrap the command modules functions to count the calls
+
+    Only the outermost command is counted. PyMEL commands calling maya.cmds
+    internally are not counted twice.
+    """
+
+    def __init__(self, counter):
+        self.counter = counter
+        self.patched = []
+        self.local = threading.local()
+
+    def _wrap(self, cmdName, func):
+        counter = self.counter
+        local = self.local
+
+        def wrapper(*args, **kwargs):
+            depth = getattr(local, "depth", 0)
+            if not depth:
+                counter[cmdName] += 1
+            local.depth = depth + 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                local.depth = depth
+
+        wrapper.__name__ = getattr(func, "__name__", cmdName)
+        wrapper.__doc__ = getattr(func, "__doc__", None)
+        return wrapper
+
+    def install(self):
+        for modName in COMMAND_MODULES:
+            try:
+                module = __import__(modName, fromlist=["*"])
+            except ImportError:
+                continue
+            for attrName, func in list(vars(module).items()):
+                if attrName.startswith("_") or isinstance(func, type):
+                    continue
+                if not callable(func):
+                    continue
+                self.patched.append((module, attrName, func))
+                setattr(module, attrName, self._wrap(attrName, func))
+
+    def uninstall(self):
+        for module, attrName, func in reversed(self.patched):
+            setattr(module, attrName, func)
+        self.patched = []
+
+
+class _NodeCounter(object):
+    """Count the created nodes by type using a node added callback"""
+
+    def __init__(self, counter):
+        self.counter = counter
+        self.callbackId = None
+
+    def _nodeAdded(self, mObj, *args):
+        self.counter[self.om.MFnDependencyNode(mObj).typeName()] += 1
+
+    def install(self):
+        try:
+            import maya.OpenMaya as om
+        except ImportError:
+            return
+        self.om = om
+        self.callbackId = om.MDGMessage.addNodeAddedCallback(self._nodeAdded,
+                                                             "dependNode")
+
+    def uninstall(self):
+        if self.callbackId is not None:
+            self.om.MMessage.removeCallback(self.callbackId)
+            self.callbackId = None
+
+
+class _ProvenanceTagger(object):
+    """Tag the nodes created inside a stage with the innermost builder name
+
+    The builders are the stages of the profiled functions, so the nodes
+    created by a nested builder are not tagged with its caller name. The
+    nodes created outside the builders are tagged with the innermost stage
+    name.
+
+    The nodes are collected by a node added callback and tagged when the
+    session is closed, since the nodes can't be edited in the callback.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.created = []
+        self.callbackId = None
+
+    def _nodeAdded(self, mObj, *args):
+        stack = self.session.builders or self.session.stack
+        if stack:
+            self.created.append((self.om.MObjectHandle(mObj), stack[-1]))
+
+    def install(self):
+        try:
+            import maya.OpenMaya as om
+        except ImportError:
+            return
+        self.om = om
+        self.callbackId = om.MDGMessage.addNodeAddedCallback(self._nodeAdded,
+                                                             "dependNode")
+
+    def uninstall(self):
+        if self.callbackId is None:
+            return
+        self.om.MMessage.removeCallback(self.callbackId)
+        self.callbackId = None
+        nodes = {}
+        for handle, builder in self.created:
+            if not handle.isValid():
+                continue
+            fnNode = self.om.MFnDependencyNode(handle.object())
+            if fnNode.isFromReferencedFile() or fnNode.isDefaultNode():
+                continue
+            nodes.setdefault(builder, []).append(fnNode.name())
+        self.created = []
+        for builder, names in nodes.items():
+            tag_nodes(names, builder)
+
+
+class count_nodes(object):
+    """Context manager to count the created nodes by type
+
+    Returns:
+        Counter: node type -> number of created nodes
+    """
+
+    def __init__(self):
+        self.counter = Counter()
+        self.collector = _NodeCounter(self.counter)
+
+    def __enter__(self):
+        self.collector.install()
+        return self.counter
+
+    def __exit__(self, *exc):
+        self.collector.uninstall()
+        return False
+
+
+def tag_nodes(nodes, builder):
+    """Tag the nodes with the name of the builder that created them
+
+    Args:
+        nodes (list of str): The nodes names
+        builder (str): The builder name
+    """
+    import maya.cmds as cmds
+    for name in nodes:
+        if not cmds.attributeQuery(PROVENANCE_ATTR, node=name, exists=True):
+            cmds.addAttr(name, longName=PROVENANCE_ATTR, dataType="string")
+        cmds.setAttr("{}.{}".format(name, PROVENANCE_ATTR),
+                     builder,
+                     type="string")
+
+
+######################################################################
+# Session
+######################################################################
+
+class _Stage(object):
+
+    __slots__ = ("session", "name", "builder", "record", "start")
+
+    def __init__(self, session, name, builder=False):
+        self.session = session
+        self.name = name
+        self.builder = builder
+
+    def __enter__(self):
+        stack = self.session.stack
+        stack.append(self.name)
+        if self.builder:
+            self.session.builders.append(self.name)
+        # the record is created on enter to keep the stages in call order
+        self.record = self.session.report.get_stage("/".join(stack))
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, *exc):
+        self.record.add(default_timer() - self.start)
+        self.session.stack.pop()
+        if self.builder:
+            self.session.builders.pop()
+        return False
+
+
+class _NullStage(object):
+    """Stage used when profiling is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Session(object):
+    """Profiling session collecting the data in a BuildReport
+
+    Args:
+        name (str): The name for the report
+        commands (bool, optional): If True will count the Maya commands
+        nodes (bool, optional): If True will count the created nodes
+        tag (bool, optional): If True will tag the created nodes with the
+            innermost builder name
+    """
+
+    def __init__(self, name="build", commands=True, nodes=True, tag=False):
+        self.report = BuildReport(name)
+        self.stack = []
+        # names of the profiled functions in the stack
+        self.builders = []
+        self.collectors = []
+        if commands:
+            self.collectors.append(_CommandCounter(self.report.commands))
+        if nodes:
+            self.collectors.append(_NodeCounter(self.report.nodes))
+        if tag:
+            self.collectors.append(_ProvenanceTagger(self))
+        self.start = None
+
+    def stage(self, name, builder=False):
+        return _Stage(self, name, builder)
+
+    def open(self):
+        global _session
+        if _session is not None:
+            raise RuntimeError("A profiling session is already active: %s"
+                               % _session.report.name)
+        for collector in self.collectors:
+            collector.install()
+        self.start = default_timer()
+        _session = self
+
+    def close(self):
+        global _session
+        self.report.total += default_timer() - self.start
+        for collector in self.collectors:
+            collector.uninstall()
+        _session = None
+
+
+class session(object):
+    """Context manager to profile a build
+
+    If a session is already active the active report is reused, so nested
+    builders aggregate in the same report.
+
+    Args:
+        name (str, optional): The name for the report
+        commands (bool, optional): If True will count the Maya commands
+        nodes (bool, optional): If True will count the created nodes
+        tag (bool, optional): If True will tag the created nodes with the
+            builder name, see eval_profiler
+
+    Returns:
+        BuildReport: The report of the session
+    """
+
+    def __init__(self, name="build", commands=True, nodes=True, tag=False):
+        self.name = name
+        self.commands = commands
+        self.nodes = nodes
+        self.tag = tag
+        self.owner = None
+
+    def __enter__(self):
+        if _session is not None:
+            return _session.report
+        self.owner = Session(self.name, self.commands, self.nodes, self.tag)
+        self.owner.open()
+        return self.owner.report
+
+    def __exit__(self, *exc):
+        if self.owner:
+            self.owner.close()
+            self.owner = None
+        return False
+
+
+def is_enabled():
+    """Return True if there is an active profiling session"""
+    return _session is not None
+
+
+def active_report():
+    """Return the report of the active session or None"""
+    if _session is None:
+        return None
+    return _session.report
+
+
+def stage(name):
+    """Context manager to time a stage in the active session
+
+    Args:
+        name (str): The stage name
+
+    Returns:
+        context manager: Null context if profiling is disabled
+    """
+    if _session is None:
+        return _NULL_STAGE
+    return _session.stage(name)
+
+
+def profiled(name=None):
+    """Decorator to time the decorated function as a stage
+
+    Args:
+        name (str, optional): The stage name, by default the function name
+    """
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _session is None:
+                return func(*args, **kwargs)
+            with _session.stage(label, builder=True):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
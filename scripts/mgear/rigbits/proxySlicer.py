@@ -3,50 +3,152 @@
 import datetime
 
 import pymel.core as pm
+import maya.api.OpenMaya as om2
+import maya.api.OpenMayaAnim as oma2
 
 import mgear
+from mgear.rigbits import profiler, proxySlicerEngine
 
 from mgear.core import applyop, node, transform
 
 
-def slice(parent=False, oSel=False, *args):
-    """Create a proxy geometry from a skinned object"""
-
+######################################################################
+# Maya data
+######################################################################
+
+def _getDagPath(name):
+    sel = om2.MSelectionList()
+    sel.add(name)
+    return sel.getDagPath(0)
+
+
+def getSkinData(mesh, skinCluster):
+    """Read the mesh and skin weights data in one pass
+
+    Args:
+        mesh (dagNode): The skinned mesh
+        skinCluster (PyNode): The mesh skinCluster
+
+    Returns:
+        dict: influences names, flat weights, world points, counts,
+            connects and uvs
+    """
+    dagPath = _getDagPath(mesh.getShape().longName())
+    sel = om2.MSelectionList()
+    sel.add(skinCluster.name())
+    fnSkin = oma2.MFnSkinCluster(sel.getDependNode(0))
+    fnMesh = om2.MFnMesh(dagPath)
+
+    fnComp = om2.MFnSingleIndexedComponent()
+    comp = fnComp.create(om2.MFn.kMeshVertComponent)
+    fnComp.setCompleteData(fnMesh.numVertices)
+    weights, nInfluences = fnSkin.getWeights(dagPath, comp)
+
+    counts, connects = fnMesh.getVertices()
+    points = fnMesh.getPoints(om2.MSpace.kWorld)
+
+    uvs = None
+    if fnMesh.numUVs():
+        uValues, vValues = fnMesh.getUVs()
+        uvCounts, uvIds = fnMesh.getAssignedUVs()
+        uvs = (list(uValues), list(vValues), list(uvCounts), list(uvIds))
+
+    return {"influences": [p.partialPathName()
+                           for p in fnSkin.influenceObjects()],
+            "nInfluences": nInfluences,
+            "weights": list(weights),
+            "points": [(p.x, p.y, p.z) for p in points],
+            "counts": list(counts),
+            "connects": list(connects),
+            "uvs": uvs}
+
+
+def createMesh(data, name, parent):
+    """Create a mesh from the arrays computed with subMesh
+
+    Args:
+        data (dict): points, counts, connects and uvs of the new mesh
+        name (str): Name for the new mesh shape
+        parent (dagNode): The transform for the new shape
+
+    Returns:
+        PyNode: The new mesh shape
+    """
+    fnMesh = om2.MFnMesh()
+    fnMesh.create([om2.MPoint(p) for p in data["points"]],
+                  data["counts"],
+                  data["connects"],
+                  parent=_getDagPath(parent.longName()).node())
+    if data["uvs"]:
+        uValues, vValues, uvCounts, uvIds = data["uvs"]
+        fnMesh.setUVs(uValues, vValues)
+        fnMesh.assignUVs(uvCounts, uvIds)
+    shape = pm.PyNode(fnMesh.fullPathName())
+    pm.rename(shape, name)
+    pm.sets("initialShadingGroup", edit=True, forceElement=shape)
+    return shape
+
+
+######################################################################
+# Slice
+######################################################################
+
+@profiler.profiled("proxySlicer.slice")
+def slice(parent=False, oSel=False, workers=None, cache=None, *args):
+    """Create a proxy geometry from a skinned object
+
+    Each face is assigned to the influence with the biggest weight sum over
+    the face vertices. The proxy pieces are created directly from the faces
+    of each influence.
+
+    Args:
+        parent (bool, optional): If True the proxy pieces are parented
+            under the influences. Else are created in the "ProxyGeo"
+            group and connected to the influences.
+        oSel (bool or dagNode, optional): The skinned mesh. If False will
+            use the current selection.
+        workers (None or int, optional): Number of processes to compute the
+            proxy pieces. If None the pieces are computed in this process.
+        cache (None or str, optional): Cache file path. If the cache was
+            written for the same mesh topology and influences, the pieces
+            with the same faces are read from it. The pieces are written
+            to it.
+
+    Returns:
+        list: The proxy pieces
+    """
     startTime = datetime.datetime.now()
-    print oSel
     if not oSel:
         oSel = pm.selected()[0]
-        print "----"
-        print oSel
-
-    oColl = pm.skinCluster(oSel, query=True, influence=True)
-    oFaces = oSel.faces
-    nFaces = oSel.numFaces()
 
-    faceGroups = []
-    for x in oColl:
-        faceGroups.append([])
     sCluster = pm.listConnections(oSel.getShape(), type="skinCluster")
-    print sCluster
-    sCName = sCluster[0].name()
-    for iFace in range(nFaces):
-        faceVtx = oFaces[iFace].getVertices()
-        oSum = False
-        for iVtx in faceVtx:
-            values = pm.skinPercent(sCName, oSel.vtx[iVtx], q=True, v=True)
-            if oSum:
-                oSum = [L + l for L, l in zip(oSum, values)]
-            else:
-                oSum = values
-
-        print "adding face: " \
-              + str(iFace) \
-              + " to group in: " \
-              + str(oColl[oSum.index(max(oSum))])
-
-        faceGroups[oSum.index(max(oSum))].append(iFace)
-
-    original = oSel
+    if not sCluster:
+        pm.displayWarning("%s doesn't have skinCluster" % oSel.name())
+        return
+
+    with profiler.stage("weights"):
+        data = getSkinData(oSel, sCluster[0])
+
+    cached = None
+    if cache:
+        signature = proxySlicerEngine.meshSignature(data)
+        cached = proxySlicerEngine.importCache(cache, signature)
+
+    with profiler.stage("pieces"):
+        influences = proxySlicerEngine.faceInfluences(data["weights"],
+                                                      data["nInfluences"],
+                                                      data["counts"],
+                                                      data["connects"])
+        groups = proxySlicerEngine.faceGroups(influences,
+                                              data["nInfluences"])
+        pieces = proxySlicerEngine.computePieces(data,
+                                                 groups,
+                                                 workers,
+                                                 cached)
+    if cache:
+        proxySlicerEngine.exportCache(cache, signature, pieces)
+
+    parentGroup = None
     if not parent:
         try:
             parentGroup = pm.PyNode("ProxyGeo")
@@ -57,75 +159,58 @@ def slice(parent=False, oSel=False, *args):
     except TypeError:
         proxySet = pm.sets(name="rig_proxyGeo_grp", em=True)
 
-    for boneList in faceGroups:
-
-        if len(boneList):
-            newObj = pm.duplicate(
-                original,
-                rr=True,
-                name=oColl[faceGroups.index(boneList)] + "_Proxy")
-
-            for trans in ["tx",
-                          "ty",
-                          "tz",
-                          "rx",
-                          "ry",
-                          "rz",
-                          "sx",
-                          "sy",
-                          "sz"]:
-
-                pm.setAttr(newObj[0].name() + "." + trans, lock=0)
-
-            c = list(newObj[0].faces)
-
-            for index in reversed(boneList):
-
-                c.pop(index)
-
-            pm.delete(c)
-            if parent:
-                pm.parent(newObj,
-                          pm.PyNode(oColl[faceGroups.index(boneList)]),
-                          a=True)
-            else:
-                pm.parent(newObj, parentGroup, a=True)
-                dummyCopy = pm.duplicate(newObj[0])[0]
-                pm.delete(newObj[0].listRelatives(c=True))
+    proxies = []
+    with profiler.stage("create"):
+        for infName, meshData in pieces:
+            proxies.append(
+                _createProxy(meshData, pm.PyNode(infName), parent,
+                             parentGroup))
 
-                transform.matchWorldTransform(
-                    pm.PyNode(oColl[faceGroups.index(boneList)]), newObj[0])
-
-                pm.parent(dummyCopy.listRelatives(c=True)[0],
-                          newObj[0],
-                          shape=True)
-
-                pm.delete(dummyCopy)
-
-                pm.rename(newObj[0].listRelatives(c=True)[0],
-                          newObj[0].name() + "_offset")
-
-                o_multiplayer = pm.PyNode(oColl[faceGroups.index(boneList)])
-                mulmat_node = applyop.gear_mulmatrix_op(
-                    o_multiplayer.name() + ".worldMatrix",
-                    newObj[0].name() + ".parentInverseMatrix")
-
-                outPlug = mulmat_node + ".output"
-                dm_node = node.createDecomposeMatrixNode(outPlug)
-
-                pm.connectAttr(dm_node + ".outputTranslate",
-                               newObj[0].name() + ".t")
-                pm.connectAttr(dm_node + ".outputRotate",
-                               newObj[0].name() + ".r")
-                pm.connectAttr(dm_node + ".outputScale",
-                               newObj[0].name() + ".s")
-
-            print "Creating proxy for: {}".format(
-                str(oColl[faceGroups.index(boneList)]))
-
-            pm.sets(proxySet, add=newObj)
+    pm.sets(proxySet, add=proxies)
 
     endTime = datetime.datetime.now()
     finalTime = endTime - startTime
     mgear.log("=============== Slicing for: %s finish ======= [ %s  ] ==="
               "===" % (oSel.name(), str(finalTime)))
+
+    return proxies
+
+
+def _createProxy(meshData, influence, parent, parentGroup):
+    """Create the proxy piece for one influence
+
+    Args:
+        meshData (dict): The proxy mesh arrays computed with subMesh
+        influence (dagNode): The influence driving the proxy
+        parent (bool): If True the proxy is parented under the influence
+        parentGroup (dagNode): The proxy group when parent is False
+
+    Returns:
+        dagNode: The proxy transform
+    """
+    name = influence.name() + "_Proxy"
+    if parent:
+        proxy = pm.createNode("transform", n=name)
+        createMesh(meshData, name + "Shape", proxy)
+        pm.parent(proxy, influence, a=True)
+        return proxy
+
+    # the offset keeps the mesh points in world space while the proxy
+    # transform follows the influence
+    proxy = pm.createNode("transform", n=name, p=parentGroup)
+    transform.matchWorldTransform(influence, proxy)
+    offset = pm.createNode("transform", n=name + "_offset", p=proxy)
+    offset.setMatrix(pm.datatypes.Matrix(), worldSpace=True)
+    createMesh(meshData, name + "Shape", offset)
+
+    mulmat_node = applyop.gear_mulmatrix_op(
+        influence.name() + ".worldMatrix",
+        proxy.name() + ".parentInverseMatrix")
+    outPlug = mulmat_node + ".output"
+    dm_node = node.createDecomposeMatrixNode(outPlug)
+
+    pm.connectAttr(dm_node + ".outputTranslate", proxy.name() + ".t")
+    pm.connectAttr(dm_node + ".outputRotate", proxy.name() + ".r")
+    pm.connectAttr(dm_node + ".outputScale", proxy.name() + ".s")
+
+    return proxy
@@ -0,0 +1,457 @@
+"""Proxy slicer engine
+
+Compute the arrays of the proxy pieces of a skinned mesh. The engine doesn't
+use Maya, so the pool workers can import it without importing Maya.
+
+The source data is the dictionary returned by proxySlicer.getSkinData, with
+the influences names, flat weights, points, counts, connects and uvs of the
+mesh.
+
+Example:
+    >>> from mgear.rigbits import proxySlicerEngine
+    >>> influences = proxySlicerEngine.faceInfluences(
+    ...     [1.0, 0.0, 1.0, 0.0, 0.0, 1.0], 2, [3], [0, 1, 2])
+    >>> influences
+    [0]
+"""
+
+import os
+import sys
+import json
+import struct
+import hashlib
+import multiprocessing
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# proxy cache file format version
+CACHE_VERSION = 2
+
+
+######################################################################
+# Slicing engine
+######################################################################
+
+def faceInfluences(weights, nInfluences, counts, connects):
+    """Return the dominant influence index for each face
+
+    The dominant influence is the influence with the biggest sum of weights
+    over the face vertices.
+
+    Args:
+        weights (list of float): Flat skin weights, nInfluences per vertex
+        nInfluences (int): Number of influences
+        counts (list of int): Number of vertices for each face
+        connects (list of int): Flat list of the faces vertex indices
+
+    Returns:
+        list of int: The influence index for each face
+    """
+    if np is not None:
+        # only the non zero weights are expanded to the face vertices, so
+        # the memory doesn't grow with the number of influences
+        weights = np.asarray(weights, dtype=np.float64).reshape(
+            -1, nInfluences)
+        counts = np.asarray(counts, dtype=np.int64)
+        connects = np.asarray(connects, dtype=np.int64)
+        vtx, inf = np.nonzero(weights)
+        values = weights[vtx, inf]
+        rowCount = np.bincount(vtx, minlength=len(weights))
+        rowStart = np.cumsum(rowCount) - rowCount
+
+        nnz = rowCount[connects]
+        total = nnz.sum()
+        entryStart = np.repeat(np.cumsum(nnz) - nnz, nnz)
+        entries = (np.repeat(rowStart[connects], nnz)
+                   + np.arange(total) - entryStart)
+        faces = np.repeat(np.repeat(np.arange(len(counts)), counts), nnz)
+
+        # sum of the weights for each face and influence pair
+        keys, inverse = np.unique(faces * nInfluences + inf[entries],
+                                  return_inverse=True)
+        sums = np.bincount(inverse.ravel(), weights=values[entries])
+        keyFaces = keys // nInfluences
+        keyInfs = keys % nInfluences
+
+        # biggest sum for each face, the lowest influence index on ties
+        order = np.lexsort((keyInfs, -sums, keyFaces))
+        keyFaces = keyFaces[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = keyFaces[1:] != keyFaces[:-1]
+        result = np.zeros(len(counts), dtype=np.int64)
+        result[keyFaces[first]] = keyInfs[order][first]
+        return result.tolist()
+
+    # sparse weights per vertex, most of the weights are zero
+    vtxWeights = []
+    for i in range(0, len(weights), nInfluences):
+        vtxWeights.append([(j, w) for j, w
+                           in enumerate(weights[i:i + nInfluences]) if w])
+    result = []
+    index = 0
+    for count in counts:
+        faceSum = [0.0] * nInfluences
+        for vtx in connects[index:index + count]:
+            for j, w in vtxWeights[vtx]:
+                faceSum[j] += w
+        index += count
+        result.append(faceSum.index(max(faceSum)))
+    return result
+
+
+def faceGroups(influences, nInfluences):
+    """Group the face indices by influence
+
+    Args:
+        influences (list of int): The influence index for each face
+        nInfluences (int): Number of influences
+
+    Returns:
+        list of list: The face indices for each influence
+    """
+    groups = [[] for i in range(nInfluences)]
+    for face, inf in enumerate(influences):
+        groups[inf].append(face)
+    return groups
+
+
+def faceOffsets(counts):
+    """Return the index of the first face vertex for each face
+
+    Args:
+        counts (list of int): Number of vertices for each face
+
+    Returns:
+        list of int: The offsets in the flat face vertex list
+    """
+    offsets = []
+    index = 0
+    for count in counts:
+        offsets.append(index)
+        index += count
+    return offsets
+
+
+def subMesh(points, counts, connects, faces, uvs=None, offsets=None,
+            uvOffsets=None):
+    """Compute the mesh arrays for a subset of faces
+
+    Args:
+        points (list): Vertex positions, one (x, y, z) item per vertex
+        counts (list of int): Number of vertices for each face
+        connects (list of int): Flat list of the faces vertex indices
+        faces (list of int): The face indices to extract
+        uvs (None or tuple, optional): (uValues, vValues, uvCounts, uvIds)
+            of the source mesh
+        offsets (None or list, optional): Precomputed faceOffsets(counts)
+        uvOffsets (None or list, optional): Precomputed faceOffsets of the
+            uvCounts
+
+    Returns:
+        dict: points, counts, connects and uvs of the new mesh. vertices
+            and uvIndices are the source indices of the new points and uvs
+    """
+    if offsets is None:
+        offsets = faceOffsets(counts)
+
+    vtxMap = {}
+    vertices = []
+    newCounts = []
+    newConnects = []
+    for face in faces:
+        start = offsets[face]
+        newCounts.append(counts[face])
+        for vtx in connects[start:start + counts[face]]:
+            newVtx = vtxMap.get(vtx)
+            if newVtx is None:
+                newVtx = vtxMap[vtx] = len(vertices)
+                vertices.append(vtx)
+            newConnects.append(newVtx)
+
+    data = {"points": [tuple(points[vtx])[:3] for vtx in vertices],
+            "counts": newCounts,
+            "connects": newConnects,
+            "vertices": vertices,
+            "uvs": None,
+            "uvIndices": None}
+
+    if uvs:
+        uValues, vValues, uvCounts, uvIds = uvs
+        if uvOffsets is None:
+            uvOffsets = faceOffsets(uvCounts)
+        uvMap = {}
+        uvIndices = []
+        newUvCounts = []
+        newUvIds = []
+        for face in faces:
+            start = uvOffsets[face]
+            newUvCounts.append(uvCounts[face])
+            for uv in uvIds[start:start + uvCounts[face]]:
+                newUv = uvMap.get(uv)
+                if newUv is None:
+                    newUv = uvMap[uv] = len(uvIndices)
+                    uvIndices.append(uv)
+                newUvIds.append(newUv)
+        data["uvs"] = ([uValues[uv] for uv in uvIndices],
+                       [vValues[uv] for uv in uvIndices],
+                       newUvCounts,
+                       newUvIds)
+        data["uvIndices"] = uvIndices
+
+    return data
+
+
+def updatePiece(mesh, points, uvs=None):
+    """Update the points and uvs of a piece from the source mesh
+
+    The piece topology is kept, only the positions and uv values are read
+    again from the source, using the piece vertices and uvIndices.
+
+    Args:
+        mesh (dict): The piece arrays computed with subMesh
+        points (list): Vertex positions of the source mesh
+        uvs (None or tuple, optional): (uValues, vValues, uvCounts, uvIds)
+            of the source mesh
+
+    Returns:
+        dict: The updated piece arrays
+    """
+    mesh = dict(mesh)
+    mesh["points"] = [tuple(points[vtx])[:3] for vtx in mesh["vertices"]]
+    if uvs and mesh["uvs"]:
+        uValues, vValues = uvs[:2]
+        uvCounts, uvIds = mesh["uvs"][2:]
+        mesh["uvs"] = ([uValues[uv] for uv in mesh["uvIndices"]],
+                       [vValues[uv] for uv in mesh["uvIndices"]],
+                       uvCounts,
+                       uvIds)
+    return mesh
+
+
+# source mesh arrays shared by the pool workers. Set once per worker by the
+# pool initializer, so the tasks only send the face indices.
+_workerData = {}
+
+
+def _initWorker(points, counts, connects, uvs):
+    _workerData["args"] = (points, counts, connects)
+    _workerData["uvs"] = uvs
+    _workerData["offsets"] = faceOffsets(counts)
+    _workerData["uvOffsets"] = faceOffsets(uvs[2]) if uvs else None
+
+
+def _subMeshWorker(faces):
+    return subMesh(*_workerData["args"],
+                   faces=faces,
+                   uvs=_workerData["uvs"],
+                   offsets=_workerData["offsets"],
+                   uvOffsets=_workerData["uvOffsets"])
+
+
+def _pythonExecutable():
+    """Return the python executable for the pool workers
+
+    Inside Maya sys.executable is the Maya application, so the workers are
+    started with mayapy.
+
+    Returns:
+        str: The executable path, None if mayapy is not found
+    """
+    executable = os.path.basename(sys.executable).lower()
+    if executable.startswith(("mayapy", "python")):
+        return sys.executable
+    mayaLocation = os.environ.get("MAYA_LOCATION")
+    if not mayaLocation:
+        return None
+    if sys.platform == "win32":
+        mayapy = os.path.join(mayaLocation, "bin", "mayapy.exe")
+    else:
+        mayapy = os.path.join(mayaLocation, "bin", "mayapy")
+    if not os.path.isfile(mayapy):
+        return None
+    return mayapy
+
+
+def _poolContext():
+    """Return the multiprocessing context to start the pool workers
+
+    The workers are always spawned as new processes with the python
+    executable, never forked from the running Maya process.
+
+    Returns:
+        module or context: The multiprocessing context, None if the workers
+            can't be spawned. Python 2 only spawns on Windows.
+    """
+    executable = _pythonExecutable()
+    if executable is None:
+        return None
+    if hasattr(multiprocessing, "get_context"):
+        context = multiprocessing.get_context("spawn")
+    elif sys.platform == "win32":
+        context = multiprocessing
+    else:
+        return None
+    context.set_executable(executable)
+    return context
+
+
+def _subMeshes(data, jobs, workers=None):
+    """Compute the mesh arrays of each list of faces
+
+    Args:
+        data (dict): The source data from proxySlicer.getSkinData
+        jobs (list of list): The face indices of each piece
+        workers (None or int, optional): Number of pool processes
+
+    Returns:
+        list of dict: The mesh arrays of each piece
+    """
+    initArgs = (data["points"], data["counts"], data["connects"],
+                data["uvs"])
+    context = None
+    if workers and workers > 1 and len(jobs) > 1:
+        context = _poolContext()
+    if context is None:
+        _initWorker(*initArgs)
+        try:
+            return [_subMeshWorker(faces) for faces in jobs]
+        finally:
+            _workerData.clear()
+
+    pool = context.Pool(min(workers, len(jobs)),
+                        initializer=_initWorker,
+                        initargs=initArgs)
+    try:
+        return pool.map(_subMeshWorker, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def computePieces(data, groups, workers=None, cached=None):
+    """Compute the mesh arrays of the proxy piece for each influence
+
+    Args:
+        data (dict): The source data from proxySlicer.getSkinData
+        groups (list of list): The face indices for each influence
+        workers (None or int, optional): Number of processes to compute the
+            pieces. If None or 1, or the processes can't be spawned, the
+            pieces are computed in this process. Each process sends back
+            its pieces, so is only worth for dense meshes with many
+            influences.
+        cached (None or list, optional): (influence name, mesh arrays)
+            pairs from importCache. The cached pieces with the same faces
+            are updated instead of computed again.
+
+    Returns:
+        list of tuple: (influence name, mesh arrays) for each influence
+            with faces
+    """
+    cached = dict(cached or [])
+    pieces = []
+    jobs = []
+    for name, faces in zip(data["influences"], groups):
+        if not faces:
+            continue
+        digest = facesDigest(faces)
+        mesh = cached.get(name)
+        if mesh and mesh.get("faces") == digest:
+            pieces.append((name, updatePiece(mesh,
+                                             data["points"],
+                                             data["uvs"])))
+            continue
+        jobs.append((len(pieces), faces, digest))
+        pieces.append((name, None))
+
+    meshes = _subMeshes(data, [faces for i, faces, digest in jobs], workers)
+    for (i, faces, digest), mesh in zip(jobs, meshes):
+        mesh["faces"] = digest
+        pieces[i] = (pieces[i][0], mesh)
+    return pieces
+
+
+######################################################################
+# Cache
+######################################################################
+
+def _intBuffer(values):
+    """Return the little endian int64 bytes of a list of integers"""
+    if np is not None:
+        return np.ascontiguousarray(values, dtype="<i8").tobytes()
+    return struct.pack("<%iq" % len(values), *values)
+
+
+def facesDigest(faces):
+    """Return a hash of the face indices of a piece
+
+    Args:
+        faces (list of int): The face indices
+
+    Returns:
+        str: The digest
+    """
+    return hashlib.md5(_intBuffer(faces)).hexdigest()
+
+
+def meshSignature(data):
+    """Return a hash of the source mesh topology and influences
+
+    The points and weights are not part of the signature, so the cache is
+    valid after editing the shape or the skin weights. Each cached piece
+    is only reused if its faces didn't change.
+
+    Args:
+        data (dict): The source data from proxySlicer.getSkinData
+
+    Returns:
+        str: The signature
+    """
+    md5 = hashlib.md5()
+    md5.update("\n".join(data["influences"]).encode("utf-8"))
+    md5.update(_intBuffer(data["counts"]))
+    md5.update(_intBuffer(data["connects"]))
+    if data["uvs"]:
+        md5.update(_intBuffer(data["uvs"][2]))
+        md5.update(_intBuffer(data["uvs"][3]))
+    return md5.hexdigest()
+
+
+def exportCache(filePath, signature, pieces):
+    """Write the computed proxy pieces to a cache file
+
+    Args:
+        filePath (str): The cache file path
+        signature (str): The source signature from meshSignature
+        pieces (list of tuple): (influence name, mesh arrays) pairs
+    """
+    data = {"version": CACHE_VERSION,
+            "signature": signature,
+            "pieces": [[name, mesh] for name, mesh in pieces]}
+    with open(filePath, "w") as f:
+        json.dump(data, f)
+
+
+def importCache(filePath, signature=None):
+    """Read the proxy pieces from a cache file
+
+    Args:
+        filePath (str): The cache file path
+        signature (None or str, optional): If set, the cache is only
+            returned if was computed from the same source
+
+    Returns:
+        list of tuple: (influence name, mesh arrays) pairs, None if the
+            cache doesn't exist or is not valid
+    """
+    if not os.path.isfile(filePath):
+        return None
+    with open(filePath, "r") as f:
+        data = json.load(f)
+    if data.get("version") != CACHE_VERSION:
+        return None
+    if signature and data["signature"] != signature:
+        return None
+    return [(name, mesh) for name, mesh in data["pieces"]]
@@ -0,0 +1,315 @@
+"""Rigbits rig control index
+
+Index of the rig controls shared by the rigbits tools. The rig roots are
+found with one tagged attribute query, the controllers sets are walked
+recursively once and the control names are cached. The include and exclude
+patterns are compiled once and matched against the cached names.
+
+A pattern is a glob pattern, or a regular expression with the "re:" prefix.
+
+The tools share the index of the current scene, returned by get_index. The
+index is rebuilt when a scene is created or opened, and when transforms are
+added, removed or renamed.
+
+Example::
+
+    from mgear.rigbits import rig_index
+    index = rig_index.get_index()
+    index.controls(exclude=["*_R*"])
+    index.tagged("is_SDK", exclude=["*controlBuffer*"])
+"""
+
+import fnmatch
+import re
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+# prefix of the regular expression patterns
+REGEX_PREFIX = "re:"
+
+
+######################################################################
+# Patterns
+######################################################################
+
+def compile_patterns(patterns):
+    """Compile the glob or regular expression patterns
+
+    Args:
+        patterns (str or list): The patterns. Regular expressions use the
+            "re:" prefix, i.e: "re:_[LR]\\d+_ctl$"
+
+    Returns:
+        list: The compiled regular expressions
+    """
+    if not patterns:
+        return []
+    if not isinstance(patterns, (list, tuple, set)):
+        patterns = [patterns]
+    compiled = []
+    for pattern in patterns:
+        if pattern.startswith(REGEX_PREFIX):
+            compiled.append(re.compile(pattern[len(REGEX_PREFIX):]))
+        else:
+            compiled.append(re.compile(fnmatch.translate(pattern)))
+    return compiled
+
+
+def substring_pattern(string):
+    """Return the pattern matching the names containing the string
+
+    Args:
+        string (str): The string
+
+    Returns:
+        str: The regular expression pattern
+    """
+    return REGEX_PREFIX + re.escape(string)
+
+
+def filter_names(names, include=None, exclude=None):
+    """Filter the names with include and exclude patterns
+
+    The patterns are matched against the short name, without the DAG path.
+    A name is kept if it matches any include pattern, or if there are no
+    include patterns, and doesn't match any exclude pattern.
+
+    Args:
+        names (list of str): The names to filter
+        include (str or list, optional): Include patterns
+        exclude (str or list, optional): Exclude patterns
+
+    Returns:
+        list of str: The filtered names
+    """
+    include = compile_patterns(include)
+    exclude = compile_patterns(exclude)
+    if not include and not exclude:
+        return list(names)
+
+    result = []
+    for name in names:
+        short_name = name.split("|")[-1]
+        if include and not any(p.search(short_name) for p in include):
+            continue
+        if any(p.search(short_name) for p in exclude):
+            continue
+        result.append(name)
+    return result
+
+
+######################################################################
+# Index
+######################################################################
+
+def find_rig_roots():
+    """Return the rig root nodes, tagged with the is_rig attribute
+
+    Returns:
+        list of str: The rig roots names
+    """
+    roots = cmds.ls("*.is_rig", objectsOnly=True, recursive=True) or []
+    return cmds.ls(roots, type="transform") or []
+
+
+def get_controllers_sets(root):
+    """Return the controllers sets connected to the rig root
+
+    Args:
+        root (str): The rig root
+
+    Returns:
+        list of str: The controllers sets names
+    """
+    if not cmds.attributeQuery("rigGroups", node=root, exists=True):
+        return []
+    groups = cmds.listConnections(root + ".rigGroups",
+                                  source=True,
+                                  destination=False) or []
+    return [g for g in groups if g.endswith("controllers_grp")]
+
+
+def walk_sets(sets):
+    """Walk the sets recursively
+
+    Args:
+        sets (list of str): The sets to walk
+
+    Returns:
+        tuple: The list of member names and the list of visited set names
+    """
+    members = []
+    visited = []
+    seen = set()
+    stack = list(reversed(sets))
+    while stack:
+        object_set = stack.pop()
+        if object_set in seen:
+            continue
+        seen.add(object_set)
+        visited.append(object_set)
+        set_members = cmds.sets(object_set, query=True) or []
+        sub_sets = set(cmds.ls(set_members, type="objectSet") or [])
+        # keep the members order, depth first
+        for member in reversed(set_members):
+            if member in sub_sets:
+                stack.append(member)
+        for member in set_members:
+            if member not in sub_sets and member not in seen:
+                seen.add(member)
+                members.append(member)
+    return members, visited
+
+
+class ControlIndex(object):
+    """Cached index of the rig controls
+
+    The index is built the first time is used. Call refresh if the rig
+    changes.
+
+    Args:
+        roots (str or list, optional): The rig roots to index. By default
+            all the rigs in the scene
+    """
+
+    def __init__(self, roots=None):
+        if roots is not None and not isinstance(roots, (list, tuple)):
+            roots = [roots]
+        self._roots = roots
+        self._controls = None
+        self._control_set = None
+        self._sets = None
+        self._tagged = {}
+
+    def refresh(self):
+        """Clear the cached data"""
+        self._controls = None
+        self._control_set = None
+        self._sets = None
+        self._tagged = {}
+
+    def _build(self):
+        if self._roots is None:
+            self._roots = find_rig_roots()
+        sets = []
+        for root in self._roots:
+            sets.extend(get_controllers_sets(root))
+        self._controls, self._sets = walk_sets(sets)
+        self._control_set = set(self._controls)
+
+    @property
+    def roots(self):
+        if self._roots is None:
+            self._roots = find_rig_roots()
+        return list(self._roots)
+
+    def sets(self):
+        """Return the controllers sets and nested sets names"""
+        if self._controls is None:
+            self._build()
+        return list(self._sets)
+
+    def controls(self, include=None, exclude=None):
+        """Return the rig controls names
+
+        Args:
+            include (str or list, optional): Include patterns
+            exclude (str or list, optional): Exclude patterns
+
+        Returns:
+            list of str: The controls names
+        """
+        if self._controls is None:
+            self._build()
+        return filter_names(self._controls, include, exclude)
+
+    def tagged(self, attr, include=None, exclude=None):
+        """Return the nodes with the tag attribute
+
+        The query is done once per attribute and cached.
+
+        Args:
+            attr (str): The tag attribute name. i.e: "is_SDK"
+            include (str or list, optional): Include patterns
+            exclude (str or list, optional): Exclude patterns
+
+        Returns:
+            list of str: The nodes names
+        """
+        nodes = self._tagged.get(attr)
+        if nodes is None:
+            nodes = cmds.ls("*." + attr, objectsOnly=True) or []
+            self._tagged[attr] = nodes
+        return filter_names(nodes, include, exclude)
+
+    def __contains__(self, name):
+        if self._controls is None:
+            self._build()
+        return str(name) in self._control_set
+
+
+# index of the current scene
+_scene_index = {"scene": None,
+                "index": None,
+                "dirty": False,
+                "callbacks": None}
+
+
+def _clear_index(*args):
+    _scene_index["scene"] = None
+    _scene_index["index"] = None
+
+
+def _set_dirty(*args):
+    _scene_index["dirty"] = True
+
+
+def _add_callbacks():
+    """Clear the index on new/open scene and on transform add/remove/rename"""
+    if _scene_index["callbacks"] is not None:
+        return
+    callbacks = [om2.MSceneMessage.addCallback(message, _clear_index)
+                 for message in (om2.MSceneMessage.kBeforeNew,
+                                 om2.MSceneMessage.kBeforeOpen)]
+    callbacks.append(om2.MDGMessage.addNodeAddedCallback(_set_dirty,
+                                                         "transform"))
+    callbacks.append(om2.MDGMessage.addNodeRemovedCallback(_set_dirty,
+                                                           "transform"))
+    callbacks.append(om2.MNodeMessage.addNameChangedCallback(
+        om2.MObject.kNullObj, _set_dirty))
+    _scene_index["callbacks"] = callbacks
+
+
+def remove_callbacks():
+    """Remove the callbacks of the scene index"""
+    if _scene_index["callbacks"]:
+        om2.MMessage.removeCallbacks(_scene_index["callbacks"])
+    _scene_index["callbacks"] = None
+    _clear_index()
+
+
+def get_index(refresh=False):
+    """Return the control index of the current scene
+
+    The index is shared by the rigbits tools. A new index is created when a
+    scene is created or opened, and when transforms are added, removed or
+    renamed.
+
+    Args:
+        refresh (bool, optional): If True a new index is created. i.e: after
+            adding tag attributes to existing nodes
+
+    Returns:
+        ControlIndex: The scene control index
+    """
+    _add_callbacks()
+    scene = cmds.file(q=True, sceneName=True)
+    if (refresh
+            or _scene_index["dirty"]
+            or _scene_index["index"] is None
+            or _scene_index["scene"] != scene):
+        _scene_index["scene"] = scene
+        _scene_index["index"] = ControlIndex()
+        _scene_index["dirty"] = False
+    return _scene_index["index"]
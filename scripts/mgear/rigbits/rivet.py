@@ -1,6 +1,19 @@
 """Rigbits rivet creator"""
 
 import pymel.core as pm
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+from mgear.rigbits import profiler
+
+# rivet modes
+# loft: curveFromMeshEdge, loft and pointOnSurfaceInfo network per rivet
+# pin: one uvPin node for all the rivets of the same call (Maya 2020+)
+LOFT = "loft"
+PIN = "pin"
+
+# cached availability of the uvPin node
+_pin_support = {}
 
 
 class rivet():
@@ -9,7 +22,15 @@ class rivet():
     Thanks to http://jinglezzz.tumblr.com for the tutorial :)
     """
 
-    def create(self, mesh, edge1, edge2, parent, name=None):
+    @profiler.profiled("rivet.create")
+    def create(self, mesh, edge1, edge2, parent, name=None, mode=LOFT):
+        if mode == PIN:
+            return createRivets(mesh,
+                                [(edge1, edge2)],
+                                parent,
+                                [name] if name else None,
+                                mode=PIN)[0]
+
         self.sources = {
             'oMesh': mesh,
             'edgeIndex1': edge1,
@@ -98,3 +119,280 @@ class rivet():
         self.o_node['ptOnSurfaceIn'].parameterU.set(0.5)
         self.o_node['ptOnSurfaceIn'].parameterV.set(0.5)
         self.o_node['ptOnSurfaceIn'].caching.set(True)
+
+
+def _plug(fnNode, name, index=None):
+    plug = fnNode.findPlug(name, False)
+    if index is not None:
+        plug = plug.elementByLogicalIndex(index)
+    return plug
+
+
+def _createDGNode(dagMod, typeName):
+    # MDagModifier.createNode only accepts DAG node types
+    return om2.MDGModifier.createNode(dagMod, typeName)
+
+
+def _getMeshPath(mesh):
+    sel = om2.MSelectionList()
+    sel.add(pm.PyNode(mesh).longName())
+    meshPath = sel.getDagPath(0)
+    meshPath.extendToShape()
+    return meshPath
+
+
+def _getParentObj(parent):
+    if not parent:
+        return om2.MObject.kNullObj
+    sel = om2.MSelectionList()
+    sel.add(pm.PyNode(parent).longName())
+    return sel.getDependNode(0)
+
+
+def _worldMeshPlug(meshPath):
+    return _plug(om2.MFnDependencyNode(meshPath.node()),
+                 "worldMesh",
+                 meshPath.instanceNumber())
+
+
+def hasPinSupport():
+    """Return True if the uvPin node is available
+
+    Returns:
+        bool: True if uvPin can be created
+    """
+    if "uvPin" not in _pin_support:
+        try:
+            cmds.loadPlugin("matrixNodes", quiet=True)
+        except RuntimeError:
+            pass
+        _pin_support["uvPin"] = "uvPin" in (cmds.allNodeTypes() or [])
+    return _pin_support["uvPin"]
+
+
+def getWorldMatrix(rivetNode):
+    """Return the rivet world matrix
+
+    The PIN rivets are placed by the offsetParentMatrix, so the matrix is
+    read from the worldMatrix plug.
+
+    Args:
+        rivetNode (dagNode): The rivet
+
+    Returns:
+        Matrix: The world matrix
+    """
+    return pm.datatypes.Matrix(rivetNode.attr("worldMatrix")[0].get())
+
+
+def getWorldPosition(rivetNode):
+    """Return the rivet world position
+
+    Args:
+        rivetNode (dagNode): The rivet
+
+    Returns:
+        Vector: The world position
+    """
+    return pm.datatypes.TransformationMatrix(
+        getWorldMatrix(rivetNode)).getTranslation("world")
+
+
+def constrainPosition(rivetNode, target, mode=LOFT):
+    """Drive the target world position with the rivet
+
+    pointConstraint doesn't read the offsetParentMatrix of the rivet, so in
+    PIN mode the position is driven by the rivet world matrix, with
+    multMatrix and decomposeMatrix nodes.
+
+    Args:
+        rivetNode (dagNode): The rivet
+        target (dagNode): The driven object
+        mode (str, optional): The rivet mode, LOFT or PIN
+
+    Returns:
+        PyNode: The pointConstraint or the decomposeMatrix node
+    """
+    if mode != PIN:
+        return pm.pointConstraint(rivetNode, target, mo=False)
+    mulmat_node = pm.createNode("multMatrix")
+    pm.connectAttr(rivetNode.attr("worldMatrix")[0],
+                   mulmat_node.attr("matrixIn")[0])
+    pm.connectAttr(target.attr("parentInverseMatrix")[0],
+                   mulmat_node.attr("matrixIn")[1])
+    dm_node = pm.createNode("decomposeMatrix")
+    pm.connectAttr(mulmat_node.attr("matrixSum"), dm_node.attr("inputMatrix"))
+    pm.connectAttr(dm_node.attr("outputTranslate"), target.attr("translate"))
+    return dm_node
+
+
+def edgePairsUVs(meshPath, edgePairs):
+    """Return the UV at the center of each edge pair
+
+    The center of the 4 edge vertices is the same position of the loft
+    rivet at the parameter 0.5, 0.5 of the lofted surface
+
+    Args:
+        meshPath (MDagPath): The mesh
+        edgePairs (list of list): The edge pairs
+
+    Returns:
+        list: (u, v) coordinates
+    """
+    fnMesh = om2.MFnMesh(meshPath)
+    uvs = []
+    for edgePair in edgePairs:
+        center = om2.MVector()
+        for edge in edgePair:
+            for vtx in fnMesh.getEdgeVertices(edge):
+                center += om2.MVector(fnMesh.getPoint(vtx,
+                                                      om2.MSpace.kWorld))
+        center /= 4.0
+        u, v, face = fnMesh.getUVAtPoint(om2.MPoint(center),
+                                         om2.MSpace.kWorld)
+        uvs.append((u, v))
+    return uvs
+
+
+@profiler.profiled("rivet.createPinRivets")
+def createPinRivets(mesh, edgePairs, parent=None, names=None):
+    """Create the rivets for a list of edge pairs using one uvPin node
+
+    The rivets are attached by UV coordinate, so the mesh needs valid UVs.
+    The uvPin output matrix drives the offsetParentMatrix of each rivet.
+    The normal is the X axis, like the loft rivet.
+
+    Args:
+        mesh (mesh): The mesh to attach the rivets
+        edgePairs (list of list): The edge pair for each rivet
+        parent (None or dagNode, optional): The parent for the rivets
+        names (None or list of str, optional): The name for each rivet
+
+    Returns:
+        list: The rivets transforms
+    """
+    meshPath = _getMeshPath(mesh)
+    parentObj = _getParentObj(parent)
+    uvs = edgePairsUVs(meshPath, edgePairs)
+
+    dagMod = om2.MDagModifier()
+    fn = om2.MFnDependencyNode
+    pin = fn(_createDGNode(dagMod, "uvPin"))
+    dagMod.connect(_worldMeshPlug(meshPath), _plug(pin, "deformedGeometry"))
+    # normal X, tangent Y
+    dagMod.newPlugValueInt(_plug(pin, "normalAxis"), 0)
+    dagMod.newPlugValueInt(_plug(pin, "tangentAxis"), 1)
+    attrU = pin.attribute("coordinateU")
+    attrV = pin.attribute("coordinateV")
+
+    rivets = []
+    for i, (u, v) in enumerate(uvs):
+        coordinate = _plug(pin, "coordinate", i)
+        dagMod.newPlugValueDouble(coordinate.child(attrU), u)
+        dagMod.newPlugValueDouble(coordinate.child(attrV), v)
+
+        locTransform = dagMod.createNode("transform", parentObj)
+        locator = fn(dagMod.createNode("locator", locTransform))
+        locTransform = fn(locTransform)
+        if names:
+            dagMod.renameNode(locTransform.object(), names[i])
+        dagMod.connect(_plug(pin, "outputMatrix", i),
+                       _plug(locTransform, "offsetParentMatrix"))
+        dagMod.newPlugValueBool(_plug(locator, "visibility"), False)
+        rivets.append(locTransform.object())
+
+    dagMod.doIt()
+
+    return [pm.PyNode(om2.MDagPath.getAPathTo(obj).fullPathName())
+            for obj in rivets]
+
+
+@profiler.profiled("rivet.createRivets")
+def createRivets(mesh, edgePairs, parent=None, names=None, mode=LOFT):
+    """Create the rivets for a list of edge pairs
+
+    All the rivet networks are created and connected in a single
+    DAG modifier. The network is the same created by the rivet class.
+
+    Args:
+        mesh (mesh): The mesh to attach the rivets
+        edgePairs (list of list): The edge pair for each rivet
+        parent (None or dagNode, optional): The parent for the rivets
+        names (None or list of str, optional): The name for each rivet
+        mode (str, optional): LOFT or PIN. If the uvPin node is not
+            available the PIN mode falls back to LOFT
+
+    Returns:
+        list: The rivets transforms
+    """
+    if mode == PIN:
+        if hasPinSupport():
+            return createPinRivets(mesh, edgePairs, parent, names)
+        pm.displayWarning("uvPin node not available, using loft rivets")
+
+    meshPath = _getMeshPath(mesh)
+    worldMesh = _worldMeshPlug(meshPath)
+    parentObj = _getParentObj(parent)
+
+    dagMod = om2.MDagModifier()
+    fn = om2.MFnDependencyNode
+    rivets = []
+    for i, (edge1, edge2) in enumerate(edgePairs):
+        meshEdge1 = fn(_createDGNode(dagMod, "curveFromMeshEdge"))
+        meshEdge2 = fn(_createDGNode(dagMod, "curveFromMeshEdge"))
+        loft = fn(_createDGNode(dagMod, "loft"))
+        ptOnSurface = fn(_createDGNode(dagMod, "pointOnSurfaceInfo"))
+        matrixNode = fn(_createDGNode(dagMod, "fourByFourMatrix"))
+        decompose = fn(_createDGNode(dagMod, "decomposeMatrix"))
+        locTransform = dagMod.createNode("transform", parentObj)
+        locator = fn(dagMod.createNode("locator", locTransform))
+        locTransform = fn(locTransform)
+        if names:
+            dagMod.renameNode(locTransform.object(), names[i])
+
+        for meshEdge, edge in ((meshEdge1, edge1), (meshEdge2, edge2)):
+            dagMod.connect(worldMesh, _plug(meshEdge, "inputMesh"))
+            dagMod.newPlugValueBool(
+                _plug(meshEdge, "isHistoricallyInteresting"), True)
+            dagMod.newPlugValueInt(_plug(meshEdge, "edgeIndex", 0), edge)
+
+        dagMod.connect(_plug(meshEdge1, "outputCurve"),
+                       _plug(loft, "inputCurve", 0))
+        dagMod.connect(_plug(meshEdge2, "outputCurve"),
+                       _plug(loft, "inputCurve", 1))
+        dagMod.connect(_plug(loft, "outputSurface"),
+                       _plug(ptOnSurface, "inputSurface"))
+
+        for row, source in enumerate(("normalizedNormal",
+                                      "normalizedTangentU",
+                                      "normalizedTangentV",
+                                      "position")):
+            for column, axis in enumerate("XYZ"):
+                dagMod.connect(_plug(ptOnSurface, source + axis),
+                               _plug(matrixNode,
+                                     "in%i%i" % (row, column)))
+
+        dagMod.connect(_plug(matrixNode, "output"),
+                       _plug(decompose, "inputMatrix"))
+        dagMod.connect(_plug(decompose, "outputTranslate"),
+                       _plug(locTransform, "translate"))
+        dagMod.connect(_plug(decompose, "outputRotate"),
+                       _plug(locTransform, "rotate"))
+        dagMod.newPlugValueBool(_plug(locator, "visibility"), False)
+
+        dagMod.newPlugValueBool(_plug(loft, "reverseSurfaceNormals"), True)
+        dagMod.newPlugValueBool(_plug(loft, "uniform"), True)
+        dagMod.newPlugValueInt(_plug(loft, "sectionSpans"), 3)
+        dagMod.newPlugValueBool(_plug(loft, "caching"), True)
+
+        dagMod.newPlugValueBool(_plug(ptOnSurface, "turnOnPercentage"), True)
+        dagMod.newPlugValueDouble(_plug(ptOnSurface, "parameterU"), 0.5)
+        dagMod.newPlugValueDouble(_plug(ptOnSurface, "parameterV"), 0.5)
+        dagMod.newPlugValueBool(_plug(ptOnSurface, "caching"), True)
+
+        rivets.append(locTransform.object())
+
+    dagMod.doIt()
+
+    return [pm.PyNode(om2.MDagPath.getAPathTo(obj).fullPathName())
+            for obj in rivets]
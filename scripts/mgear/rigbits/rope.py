@@ -4,20 +4,107 @@ import pymel.core as pm
 
 from mgear.core import applyop
 from mgear import rigbits
+from mgear.rigbits import rivet
+
+# rope modes
+# motionPath: two motion paths for each deformer
+# network: one fixed network for all the deformers, loft and uvPin
+MOTION_PATH = "motionPath"
+NETWORK = "network"
+
+
+def _ropeNetwork(oCrv, oCrvUpV, ropeName, keepRatio, lvlTransforms):
+    """Drive the rope transforms with one loft and one uvPin node
+
+    The 2 curves are lofted and the uvPin node computes the matrix of all
+    the deformers, at the side of the main curve, with X along the curve and
+    Y to the up vector curve. The matrix drives the offsetParentMatrix of
+    each transform.
+
+    With keepRatio, an arclen node computes the clamped ratio of the
+    initial length, and 2 subCurve nodes cut the curves at the ratio.
+
+    Args:
+        oCrv (dagNode): The main curve
+        oCrvUpV (dagNode): The up vector curve
+        ropeName (str): Name for the rope rig
+        keepRatio (bool): If True, the deformers keep the length position
+        lvlTransforms (list of dagNode): The transforms to drive
+
+    Returns:
+        pyNode: The uvPin node
+    """
+    curvePlugs = [oCrv.getShape().attr("worldSpace[0]"),
+                  oCrvUpV.getShape().attr("worldSpace[0]")]
+    if keepRatio:
+        arclen_node = pm.arclen(oCrv, ch=True)
+        alAttr = pm.getAttr(arclen_node + ".arcLength")
+        # X: initial length / length, Y: length ratio
+        muldiv_node = pm.createNode("multiplyDivide")
+        pm.setAttr(muldiv_node + ".input1X", alAttr)
+        pm.connectAttr(arclen_node + ".arcLength", muldiv_node + ".input2X")
+        pm.connectAttr(arclen_node + ".arcLength", muldiv_node + ".input1Y")
+        pm.setAttr(muldiv_node + ".input2Y", alAttr)
+        pm.setAttr(muldiv_node + ".operation", 2)
+        pm.addAttr(oCrv, ln="length_ratio", k=True, w=True)
+        pm.connectAttr(muldiv_node + ".outputY", oCrv + ".length_ratio")
+        clamp_node = pm.createNode("clamp")
+        pm.connectAttr(muldiv_node + ".outputX", clamp_node + ".inputR")
+        pm.setAttr(clamp_node + ".maxR", 1)
+
+        subPlugs = []
+        for plug in curvePlugs:
+            sub_node = pm.createNode("subCurve")
+            pm.setAttr(sub_node + ".relative", True)
+            pm.setAttr(sub_node + ".minValue", 0)
+            pm.connectAttr(clamp_node + ".outputR", sub_node + ".maxValue")
+            pm.connectAttr(plug, sub_node + ".inputCurve")
+            subPlugs.append(sub_node.attr("outputCurve"))
+        curvePlugs = subPlugs
+
+    loft_node = pm.createNode("loft", n=ropeName + "_loft")
+    pm.setAttr(loft_node + ".degree", 1)
+    for i, plug in enumerate(curvePlugs):
+        pm.connectAttr(plug, loft_node.attr("inputCurve[%i]" % i))
+
+    pin_node = pm.createNode("uvPin", n=ropeName + "_uvPin")
+    pm.connectAttr(loft_node + ".outputSurface",
+                   pin_node + ".deformedGeometry")
+    # tangent X, normal Z, so Y points to the up vector curve
+    pm.setAttr(pin_node + ".tangentAxis", 0)
+    pm.setAttr(pin_node + ".normalAxis", 2)
+    pm.setAttr(pin_node + ".normalizedIsoParms", True)
+
+    step = 1.000 / (len(lvlTransforms) - 1)
+    for x, oTrans in enumerate(lvlTransforms):
+        pm.setAttr(pin_node + ".coordinate[%i].coordinateU" % x, x * step)
+        pm.setAttr(pin_node + ".coordinate[%i].coordinateV" % x, 0)
+        pm.connectAttr(pin_node.attr("outputMatrix[%i]" % x),
+                       oTrans.attr("offsetParentMatrix"))
+
+    return pin_node
 
 
 def rope(DEF_nb=10,
          ropeName="rope",
          keepRatio=False,
          lvlType="transform",
-         oSel=None):
+         oSel=None,
+         mode=MOTION_PATH):
     """Create rope rig based in 2 parallel curves.
 
+    The network mode creates the same number of nodes for any number of
+    deformers. The deformers are placed by the curve parameter, where the
+    motionPath mode uses the length fraction, so the curves should have a
+    uniform parametrization. It needs the uvPin node, Maya 2020 and later,
+    else falls back to the motionPath mode.
+
     Args:
         DEF_nb (int): Number of deformer joints.
         ropeName (str): Name for the rope rig.
         keepRatio (bool): If True, the deformers will keep the length
             position when the curve is stretched.
+        mode (str, optional): The rope mode, MOTION_PATH or NETWORK
     """
     if oSel and len(oSel) == 2 and isinstance(oSel, list):
         oCrv = oSel[0]
@@ -38,6 +125,18 @@ def rope(DEF_nb=10,
         print oCrv.getShape().type()
         print oCrvUpV.getShape().type()
         return
+    if mode == NETWORK and not rivet.hasPinSupport():
+        pm.displayWarning("uvPin node not available, using motion paths")
+        mode = MOTION_PATH
+
+    if mode == NETWORK:
+        root = pm.PyNode(pm.createNode(lvlType, n=ropeName + "_root", ss=True))
+        lvlTransforms = [pm.PyNode(pm.createNode(
+            lvlType, n=ropeName + str(x).zfill(3) + "_lvl", p=root, ss=True))
+            for x in range(DEF_nb)]
+        _ropeNetwork(oCrv, oCrvUpV, ropeName, keepRatio, lvlTransforms)
+        return [rigbits.addJnt(oTrans) for oTrans in lvlTransforms]
+
     if keepRatio:
         arclen_node = pm.arclen(oCrv, ch=True)
         alAttr = pm.getAttr(arclen_node + ".arcLength")
@@ -123,6 +222,8 @@ def rope_UI(*args):
 
     pm.text(label="Keep position ")
     pm.checkBox("keepRatio", label=" (base on ratio) ")
+    pm.text(label="Single network ")
+    pm.checkBox("ropeNetwork", label=" (uvPin, Maya 2020+) ")
     pm.text(label="Name: ")
     pm.textField("RopeName", text="Rope")
 
@@ -140,4 +241,8 @@ def build_rope(*args):
     DEF_nb = pm.intField("nbDeformers", q=True, v=True)
     ropeName = pm.textField("RopeName", q=True, text=True)
     keepRatio = pm.checkBox("keepRatio", q=True, v=True)
-    rope(DEF_nb, ropeName, keepRatio)
+    if pm.checkBox("ropeNetwork", q=True, v=True):
+        mode = NETWORK
+    else:
+        mode = MOTION_PATH
+    rope(DEF_nb, ropeName, keepRatio, mode=mode)
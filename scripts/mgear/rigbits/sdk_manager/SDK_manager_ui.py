@@ -8,6 +8,7 @@ from shiboken2 import wrapInstance
 
 # Maya ---------------
 import pymel.core as pm
+import maya.cmds as cmds
 import maya.OpenMaya as om
 import maya.OpenMayaUI as omui
 from maya.app.general.mayaMixin import MayaQWidgetDockableMixin
@@ -23,6 +24,7 @@ import mgear.core.attribute as attribute
 
 # mGear rigbits ------
 import mgear.rigbits.sdk_io as sdk_io
+import mgear.rigbits.rig_index as rig_index
 import mgear.rigbits.sdk_manager.core as sdk_m
 
 __author__ = "Justin Pedersen"
@@ -32,6 +34,10 @@ __version__ = [0, 0, 1]
 reload(sdk_m)
 reload(sdk_io)
 
+# Min time between driver updates while scrubbing, in milliseconds.
+# One viewport refresh at 60 fps
+SCRUB_INTERVAL = 16
+
 
 def maya_main_window():
     """
@@ -41,6 +47,80 @@ def maya_main_window():
     return wrapInstance(long(main_window_ptr), QtWidgets.QWidget)
 
 
+class DriverScrubber(QtCore.QObject):
+    """
+    Coalesces the driver value updates while scrubbing the slider.
+
+    The last slider value is stored and applied once per interval, so
+    dragging the slider sets the driver at the viewport refresh rate
+    instead of on every slider tick. The attribute change callbacks
+    triggered by the scrubber own updates are reported by is_echo.
+
+    Arguments:
+        interval (int): Min time between driver updates, in milliseconds
+        parent (QObject): The Qt parent
+    """
+
+    def __init__(self, interval=SCRUB_INTERVAL, parent=None):
+        super(DriverScrubber, self).__init__(parent)
+        self.plug = None
+        self._pending = None
+        self._applied = None
+        self._applying = False
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+
+    def set_plug(self, plug):
+        """
+        Sets the driver plug to scrub, discarding any pending value.
+
+        Arguments:
+            plug (str): The driver plug name. i.e: "jaw_C0_ctl.jaw_open"
+        """
+        self._timer.stop()
+        self._pending = None
+        self._applied = None
+        self.plug = plug
+
+    def scrub(self, value):
+        """
+        Stores the value, applied to the driver on the next update.
+        """
+        self._pending = value
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """
+        Applies the pending value to the driver.
+        """
+        self._timer.stop()
+        if self._pending is None or not self.plug:
+            return
+        value = self._pending
+        self._pending = None
+        self._applying = True
+        try:
+            cmds.setAttr(self.plug, value)
+        finally:
+            self._applying = False
+        self._applied = value
+
+    def is_echo(self, value):
+        """
+        Returns True if the driver change was done by the scrubber.
+        """
+        if self._applying:
+            return True
+        if self._applied is not None and abs(value - self._applied) < 1e-6:
+            # only the first callback of the update is an echo
+            self._applied = None
+            return True
+        return False
+
+
 class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
     """
     Useage:
@@ -63,6 +143,9 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
         self.driver_range = None
         self.driver_att = None
         self.script_jobs = []
+        # driven ctls and driver keys of each driver attr
+        self.driver_summary = None
+        self.scrubber = DriverScrubber(parent=self)
 
         # --------------------------
         self.init_ui(ui_path)
@@ -427,6 +510,7 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
             partial(self.update_spin_box))
         self.ui.driverVal_Slider.valueChanged.connect(
             partial(self.update_driver_val))
+        self.ui.driverVal_Slider.sliderReleased.connect(self.scrubber.flush)
         self.ui.driverVal_SpinBox.valueChanged.connect(
             partial(self.update_slider))
 
@@ -528,7 +612,9 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
         - delete any remaining script jobs created by the ui.
         - find workspace root and delete the ui.
         """
+        self.scrubber.flush()
         self.delete_script_jobs()
+        self.set_driver_summary(None)
 
     def hideEvent(self, *args):
         """
@@ -596,6 +682,8 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
         self.ui.DriverAttribute_comboBox.clear()
         self.ui.Driven_listWidget.clear()
         self.delete_script_jobs()
+        self.set_driver_summary(None)
+        self.scrubber.set_plug(None)
 
     def create_script_jobs(self):
         """
@@ -607,7 +695,7 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
                 watched_attr = "{0}.{1}".format(self.driver, self.driver_att)
                 new_script = pm.scriptJob(
                     attributeChange=(watched_attr,
-                                     partial(self.update_slider)))
+                                     partial(self.driver_attr_changed)))
                 self.script_jobs.append(new_script)
 
     def delete_script_jobs(self):
@@ -618,6 +706,46 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
             pm.scriptJob(kill=job_number)
         self.script_jobs = []
 
+    def set_driver_summary(self, driver):
+        """
+        Replaces the driver summary, watching the driver connections.
+
+        Arguments:
+            driver (PyNode): The driver. If None will only remove the
+                current summary
+        """
+        if self.driver_summary:
+            self.driver_summary.unwatch()
+            self.driver_summary = None
+        if driver:
+            self.driver_summary = sdk_m.DriverSummary(driver)
+            self.driver_summary.watch()
+
+    def clear_driver_cache(self):
+        """
+        Clears the cached driven ctls and driver keys.
+        Needs to be called when the keys of the driver SDKs are edited,
+        the connection changes are tracked by the summary.
+        """
+        if self.driver_summary:
+            self.driver_summary.refresh()
+
+    def get_driver_attr_data(self, driverAtt):
+        """
+        Returns the driven ctls and the driver keys of the driver attr,
+        from the cached driver summary.
+
+        Arguments:
+            driverAtt (str): The driver attribute name
+
+        Returns:
+            tuple (list of driven ctls names, list of driver key values)
+        """
+        if not self.driver_summary:
+            self.set_driver_summary(self.driver)
+        return (self.driver_summary.driven(driverAtt),
+                self.driver_summary.keys(driverAtt))
+
     def driver_attr_drop_down(self):
         """
         Adds all the keyable channels to the DriverAttribute_comboBox.
@@ -632,12 +760,10 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
 
             # If only only connected is checked, will filter the dropdown.
             if self.ui.ShowOnlyDriverAtt.isChecked():
-                connectedAttrs = []
-                for attr in driverAttrs:
-                    if sdk_m.get_driven_from_attr(self.driver.attr(attr),
-                                                  is_SDK=False):
-                        connectedAttrs.append(attr)
-                driverAttrs = connectedAttrs
+                if not self.driver_summary:
+                    self.set_driver_summary(self.driver)
+                connectedAttrs = set(self.driver_summary.attrs())
+                driverAttrs = [a for a in driverAttrs if a in connectedAttrs]
 
             self.ui.DriverAttribute_comboBox.insertItems(0, driverAttrs)
 
@@ -650,14 +776,13 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
         self.ui.Driven_listWidget.clear()
         driverAtt = self.ui.DriverAttribute_comboBox.currentText()
         if driverAtt:
-            connectedSDK_ctls = sdk_m.get_driven_from_attr(
-                self.driver.attr(driverAtt), is_SDK=False)
+            connectedSDK_ctls, self.driver_range = self.get_driver_attr_data(
+                driverAtt)
             self.ui.Driven_listWidget.addItems(connectedSDK_ctls)
 
-            # updating the Range
-            self.driver_range = sdk_m.get_driver_keys(
-                self.driver.attr(driverAtt))
             self.driver_att = self.ui.DriverAttribute_comboBox.currentText()
+            self.scrubber.set_plug("{0}.{1}".format(self.driver,
+                                                    self.driver_att))
 
             # Updating Driver Range Slider
             self.update_slider_range()
@@ -670,9 +795,28 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
     def update_driver_val(self, val):
         """
         updates the driver value when the spider is moved.
+        The updates are coalesced by the scrubber.
         """
         if self.driver:
-            self.driver.attr(self.driver_att).set(float(val) / 100)
+            self.scrubber.scrub(float(val) / 100)
+
+    def driver_attr_changed(self):
+        """
+        Script job callback, updates the slider and spin box when the
+        driver attr is changed outside of the ui.
+        The changes done by the scrubber are ignored.
+        """
+        val = self.driver.attr(self.driver_att).get()
+        if self.scrubber.is_echo(val):
+            return
+        # the driver is already at the value, no need to set it back
+        for widget, widget_val in ((self.ui.driverVal_Slider, val * 100),
+                                   (self.ui.driverVal_SpinBox, val)):
+            widget.blockSignals(True)
+            try:
+                widget.setValue(widget_val)
+            finally:
+                widget.blockSignals(False)
 
     def update_slider(self, val=None):
         """
@@ -751,6 +895,7 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
         for selectedItem in selectedItems:
             sdk_io.removeSDKs(node=pm.PyNode(selectedItem),
                               sourceDriverFilter=[self.driver])
+        self.clear_driver_cache()
 
         om.MGlobal.displayInfo("Key Deletion Complete")
 
@@ -766,6 +911,7 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
             sdk_m.delete_current_value_keys(dvr,
                                             node=pm.PyNode(selectedItem),
                                             sourceDriverFilter=[self.driver])
+        self.clear_driver_cache()
 
     def select_SDKS(self, drivenAttrFilter=[]):
         """
@@ -933,10 +1079,8 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
                       "sx", "sy", "sz",
                       "v"]
 
-        if mode == 0:
-            AllCtls = [x.node() for x in pm.ls("*.is_tweak")]
-        if mode == 1:
-            AllCtls = [x.node() for x in pm.ls("*.is_SDK")]
+        tag = "is_SDK" if mode == 1 else "is_tweak"
+        AllCtls = [pm.PyNode(x) for x in rig_index.get_index().tagged(tag)]
 
         if AllCtls:
             for ctl in AllCtls:
@@ -977,9 +1121,7 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
         Gets all the SDK nodes that have the is_SDK attr
         and exports them to the path
         """
-        ctls = []
-        for attr in pm.ls("*.is_SDK"):
-            ctls.append(attr.node())
+        ctls = [pm.PyNode(x) for x in rig_index.get_index().tagged("is_SDK")]
 
         # Getting a Path if one wasnt given
         if path is None:
@@ -1006,6 +1148,7 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
 
         if path:
             sdk_io.importSDKs(path)
+            self.clear_driver_cache()
 
             om.MGlobal.displayInfo("SDK's Have been Imported Successfully")
         else:
@@ -1052,6 +1195,7 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
                 if not selInfo[0] and not selInfo[1]:
                     self.ui.Driver_pushButton.setText(sel[0].name())
                     self.driver = sel[0]
+                    self.set_driver_summary(self.driver)
                     # Adding keyable channels to Driver Attribute dropdown
                     self.driver_attr_drop_down()
 
@@ -1214,8 +1358,8 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
                 # ------------------------------------------------------------
                 # updating the Range and UI
                 # ------------------------------------------------------------
-                self.driver_range = sdk_m.get_driver_keys(
-                    self.driver.attr(driverAtt))
+                self.clear_driver_cache()
+                self.driver_range = self.get_driver_attr_data(driverAtt)[1]
                 self.update_slider_range()
                 self.update_spin_box_range()
 
@@ -1239,18 +1383,19 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
             Attr = None
             driverAtt = self.ui.DriverAttribute_comboBox.currentText()
 
-            if firstKey:
-                Attr = sdk_m.get_driver_keys(self.driver.attr(driverAtt),
-                                             firstKey=True)
-            if prevKey:
-                Attr = sdk_m.get_driver_keys(self.driver.attr(driverAtt),
-                                             prevKey=True)
-            if nextKey:
-                Attr = sdk_m.get_driver_keys(self.driver.attr(driverAtt),
-                                             nextKey=True)
-            if lastKey:
-                Attr = sdk_m.get_driver_keys(self.driver.attr(driverAtt),
-                                             lastKey=True)
+            keys = None
+            if driverAtt:
+                keys = self.get_driver_attr_data(driverAtt)[1]
+            if keys:
+                current = self.driver.attr(driverAtt).get()
+                if firstKey:
+                    Attr = keys[0]
+                if prevKey:
+                    Attr = sdk_m.next_smallest(current, keys)
+                if nextKey:
+                    Attr = sdk_m.next_biggest(current, keys)
+                if lastKey:
+                    Attr = keys[-1]
             if reset:
                 Attr = 0.0
 
@@ -1371,6 +1516,7 @@ class SDKManagerDialog(MayaQWidgetDockableMixin, QtWidgets.QDialog):
             # Mirroring All the SDK's on each item in selection
             for ctl in userSel:
                 sdk_m.mirror_SDK(ctl)
+            self.clear_driver_cache()
 
             om.MGlobal.displayInfo("Mirroring Complete")
 
@@ -1,5 +1,4 @@
 import os
-from pprint import pprint
 
 from PySide2 import QtCore
 from PySide2 import QtUiTools
@@ -76,6 +75,9 @@ class SDK_transfer(QtWidgets.QDialog):
                                                         self)
         self.import_settings_action = QtWidgets.QAction("Import settings",
                                                         self)
+        # Transfer
+        self.transfer_action = QtWidgets.QAction("Transfer SDKs", self)
+        self.dry_run_action = QtWidgets.QAction("Dry Run", self)
 
     def create_menu_bar(self, parent_layout):
         """
@@ -91,11 +93,17 @@ class SDK_transfer(QtWidgets.QDialog):
         # File -------------------
         file_menu = self.menu_bar.addMenu("File")
         file_menu.setTearOffEnabled(1)
+        # Transfer -------------------
+        transfer_menu = self.menu_bar.addMenu("Transfer")
+        transfer_menu.setTearOffEnabled(1)
 
         # Menu bar actions ===============
         # File
         file_menu.addAction(self.export_settings_action)
         file_menu.addAction(self.import_settings_action)
+        # Transfer
+        transfer_menu.addAction(self.transfer_action)
+        transfer_menu.addAction(self.dry_run_action)
 
         # Adding to the Layout ===============
         parent_layout.setMenuBar(self.menu_bar)
@@ -115,6 +123,11 @@ class SDK_transfer(QtWidgets.QDialog):
         self.ui.addDestinationDriver_pushButton.clicked.connect(
             partial(self.add_driver, self.ui.destination_treeWidget, False))
 
+        self.transfer_action.triggered.connect(
+            partial(self.transfer, False))
+        self.dry_run_action.triggered.connect(
+            partial(self.transfer, True))
+
         return
 
     def create_item(self, name):
@@ -150,16 +163,16 @@ class SDK_transfer(QtWidgets.QDialog):
     def add_children(self, item):
         """
         """
-        driverCtl = pm.PyNode(item.text(0))
-        connectedSDK_ctls = sdk_m.getDrivenFromAttr(
-            driverCtl.attr("translateY"), is_SDK=False)
-
-        if connectedSDK_ctls:
-            for SDK_ctl in connectedSDK_ctls:
-                SDK_item = self.create_item(SDK_ctl)
-                item.addChild(SDK_item)
+        summary = sdk_m.DriverSummary(item.text(0))
+        connectedSDK_ctls = []
+        for attr in summary.attrs():
+            for SDK_ctl in summary.driven(attr):
+                if SDK_ctl not in connectedSDK_ctls:
+                    connectedSDK_ctls.append(SDK_ctl)
 
-        # children =
+        for SDK_ctl in connectedSDK_ctls:
+            SDK_item = self.create_item(SDK_ctl)
+            item.addChild(SDK_item)
 
     def add_driver(self, treewidget, children=False):
         """
@@ -189,12 +202,57 @@ class SDK_transfer(QtWidgets.QDialog):
                     treeItem.setBackground(0, brush)
                     treeItem.setSizeHint(0, QtCore.QSize(0, 30))
 
-                    pprint(dir(treeItem))
-
                     treewidget.addTopLevelItem(treeItem)
                     if children:
                         self.add_children(treeItem)
 
+    # ============================================================== #
+    # ======================= T R A N S F E R ====================== #
+    # ============================================================== #
+
+    def transfer(self, dryRun=False, *args):
+        """
+        Transfers the SDKs of the source drivers to the destination
+        drivers and shows the plan report.
+
+        The source and destination drivers are paired in the trees order.
+        The driven ctls are mapped by name.
+
+        Arguments:
+                dryRun (bool): If True will only compute the plan
+
+        Returns:
+                TransferPlan or None
+        """
+        source_drivers = self.get_tree_item_names(self.ui.source_treeWidget)
+        target_drivers = self.get_tree_item_names(
+            self.ui.destination_treeWidget)
+        if not source_drivers or not target_drivers:
+            pm.displayWarning("Please add the source and destination drivers")
+            return
+        if len(source_drivers) != len(target_drivers):
+            pm.displayWarning("The source and destination drivers count "
+                              "doesn't match")
+            return
+
+        driven = []
+        root = self.ui.source_treeWidget.invisibleRootItem()
+        for i in range(root.childCount()):
+            item = root.child(i)
+            driven.extend(item.child(c).text(0)
+                          for c in range(item.childCount()))
+        sdk_data = dict((sdk, info) for sdk, info
+                        in sdk_m.collect_SDK_data(driven).items()
+                        if info["driverNode"] in source_drivers)
+
+        plan = sdk_m.transfer_SDKs(sdk_data,
+                                   remap=dict(zip(source_drivers,
+                                                  target_drivers)),
+                                   dryRun=dryRun)
+        title = "SDK Transfer - Dry Run" if dryRun else "SDK Transfer"
+        QtWidgets.QMessageBox.information(self, title, plan.report())
+        return plan
+
 
 if __name__ == "__main__":
 
@@ -1,12 +1,23 @@
 __author__ = "Justin Pedersen"
 __email__ = "Justin@tcgcape.co.za"
 
+from collections import OrderedDict
+
 import pymel.core as pm
+import maya.cmds as cmds
+import maya.OpenMaya as om
+import maya.api.OpenMaya as om2
 import mgear.rigbits.sdk_io as sdk_io
 import mgear.core.pickWalk as pickWalk
+import mgear.rigbits.symmetry as symmetry
+import mgear.rigbits.rig_index as rig_index
+import mgear.rigbits.sdk_manager.transfer_plan as transfer_plan
 
 SDK_ANIMCURVES_TYPE = ("animCurveUA", "animCurveUL", "animCurveUU")
 
+# control buffers are not listed as ctls
+CONTROL_BUFFER = rig_index.substring_pattern("controlBuffer")
+
 # reload(sdk_io)
 
 # ================================================= #
@@ -53,7 +64,7 @@ def next_smallest(target, in_list):
 # ================================================= #
 
 
-def select_all(mode):
+def select_all(mode, index=None):
     """
     Select all the Driver Ctls, Anim Ctls
     Joints or SDK Nodes in the scene.
@@ -63,11 +74,14 @@ def select_all(mode):
                    - anim : Anim Ctls
                    - jnts : Joints
                    - nodes : SDK Nodes
+        index (ControlIndex) - Optional rig control index to query the
+                               tagged ctls. The scene index is used if None
 
     Returns:
         None
 
     """
+    index = index or rig_index.get_index()
     pm.select(clear=True)
 
     # Driver Ctl and Anim Ctl mode
@@ -75,33 +89,31 @@ def select_all(mode):
         # Setting the Attr to look for on nodes.
         attr = "is_SDK" if mode == "drv" else "is_tweak"
 
-        for item in pm.ls('*.' + attr):
-            if "controlBuffer" not in item.name():
-                pm.select(item.split(".")[0], add=True)
+        ctls = index.tagged(attr, exclude=CONTROL_BUFFER)
+        if ctls:
+            pm.select(ctls, add=True)
 
     # Joints Mode
     elif mode == "jnts":
         all_joints = []
-        for item in pm.ls('*.is_tweak'):
-            if "controlBuffer" not in item.name():
-                jnt = joint_from_driver_ctl(item.node())
-                if jnt not in all_joints:
-                    all_joints.append(jnt)
+        for item in index.tagged("is_tweak", exclude=CONTROL_BUFFER):
+            jnt = joint_from_driver_ctl(pm.PyNode(item))
+            if jnt not in all_joints:
+                all_joints.append(jnt)
         pm.select(all_joints, replace=True)
 
     # Node Mode
     elif mode == "nodes":
         str_sdk_nodes = []
-        for item in pm.ls('*.is_SDK'):
-            if "controlBuffer" not in item.name():
-                sdk_info = sdk_io.getAllSDKInfoFromNode(item.node())
-                str_sdk_nodes.extend(sdk_info.keys())
+        for item in index.tagged("is_SDK", exclude=CONTROL_BUFFER):
+            sdk_info = sdk_io.getAllSDKInfoFromNode(pm.PyNode(item))
+            str_sdk_nodes.extend(sdk_info.keys())
 
         sdk_nodes = sdk_io.getPynodes(str_sdk_nodes)
         pm.select(sdk_nodes, replace=True)
 
 
-def reset_to_default(mode, clear_sel=False):
+def reset_to_default(mode, clear_sel=False, index=None):
     """
     Reset All the Rig Driver Ctls or Anim Ctls to Default
 
@@ -109,10 +121,13 @@ def reset_to_default(mode, clear_sel=False):
         mode (str) - all : All Ctl Curves
                    - drv : Driver Ctls
                    - anim : Anim Ctls
+        index (ControlIndex) - Optional rig control index to query the
+                               tagged ctls. The scene index is used if None
 
     Returns:
         None
     """
+    index = index or rig_index.get_index()
     attrs_dict = {"tx": 0,
                   "ty": 0,
                   "tz": 0,
@@ -125,17 +140,16 @@ def reset_to_default(mode, clear_sel=False):
 
     # All Ctls Mode
     if mode == "all":
-        for attrib in pm.ls("*.invTx"):
-            node = attrib.node()
-            if "controlBuffer" not in node.name():
-                for attr, value in attrs_dict.items():
-                    # If the Attr is settable, set it
-                    if pm.getAttr(node.attr(attr), settable=True):
-                        pm.setAttr(node.attr(attr), value)
+        for item in index.tagged("invTx", exclude=CONTROL_BUFFER):
+            node = pm.PyNode(item)
+            for attr, value in attrs_dict.items():
+                # If the Attr is settable, set it
+                if pm.getAttr(node.attr(attr), settable=True):
+                    pm.setAttr(node.attr(attr), value)
 
     # Driver Ctls and Anim Ctls
     elif mode == "drv" or "anim":
-        select_all(mode)
+        select_all(mode, index=index)
         for item in pm.ls(sl=True):
             for attr, value in attrs_dict.items():
                 pm.setAttr(item.attr(attr), value)
@@ -433,6 +447,193 @@ def get_driver_keys(driverAttr,
             return keys_list
 
 
+def get_SDK_destinations(curves):
+    """
+    Returns the driven node of each SDK curve.
+    Skips the blendWeighted and conversion nodes like
+    sdk_io.getSDKDestination, but with one connection query for all the
+    curves.
+
+    Arguments:
+        curves (list of str): The SDK anim curves names
+
+    Returns:
+        dict {curve name: driven node name}
+    """
+    destinations = {}
+    if not curves:
+        return destinations
+    cnx = cmds.listConnections(curves,
+                               source=False,
+                               destination=True,
+                               connections=True,
+                               skipConversionNodes=True) or []
+    valid = set(cmds.ls(cnx[1::2], type=["blendWeighted", "transform"]) or [])
+    blends = set(cmds.ls(cnx[1::2], type="blendWeighted") or [])
+
+    blend_destinations = {}
+    if blends:
+        blend_cnx = cmds.listConnections(["{}.output".format(b)
+                                          for b in blends],
+                                         source=False,
+                                         destination=True,
+                                         connections=True,
+                                         skipConversionNodes=True) or []
+        for plug, dest in zip(blend_cnx[::2], blend_cnx[1::2]):
+            blend_destinations.setdefault(plug.split(".")[0], dest)
+
+    for plug, dest in zip(cnx[::2], cnx[1::2]):
+        curve = plug.split(".")[0]
+        if curve in destinations or dest not in valid:
+            continue
+        if dest in blends:
+            dest = blend_destinations.get(dest)
+        if dest:
+            destinations[curve] = dest
+    return destinations
+
+
+class DriverSummary(object):
+    """
+    Which attributes of a driver drive which SDK curves and ctls.
+
+    The driver connections are collected with one sweep the first time the
+    summary is used and cached until the driver connections change. The
+    driver keys are cached per attribute. Use watch to clear the cache
+    when a connection is made or broken, and refresh after editing keys on
+    existing SDK curves.
+
+    Arguments:
+        driver (str or PyNode): The driver node
+    """
+
+    def __init__(self, driver):
+        self.driver = str(driver)
+        self._curves = None
+        self._driven = None
+        self._keys = {}
+        self._callback = None
+
+    def refresh(self):
+        """
+        Clears the cached data.
+        """
+        self._curves = None
+        self._driven = None
+        self._keys = {}
+
+    def _build(self):
+        cnx = cmds.listConnections(self.driver,
+                                   source=False,
+                                   destination=True,
+                                   connections=True,
+                                   skipConversionNodes=True,
+                                   type="animCurve") or []
+        SDK_curves = set(cmds.ls(cnx[1::2],
+                                 type=list(SDK_ANIMCURVES_TYPE)) or [])
+        self._curves = OrderedDict()
+        for plug, curve in zip(cnx[::2], cnx[1::2]):
+            if curve not in SDK_curves:
+                continue
+            attr_curves = self._curves.setdefault(plug.split(".", 1)[-1], [])
+            if curve not in attr_curves:
+                attr_curves.append(curve)
+
+        destinations = get_SDK_destinations(list(SDK_curves))
+        self._driven = OrderedDict()
+        for attr, curves in self._curves.items():
+            driven = []
+            for curve in curves:
+                dest = destinations.get(curve)
+                if dest and dest not in driven:
+                    driven.append(dest)
+            if driven:
+                self._driven[attr] = driven
+
+    def attrs(self):
+        """
+        Returns the driver attrs with driven ctls.
+        """
+        if self._curves is None:
+            self._build()
+        return list(self._driven)
+
+    def curves(self, attr):
+        """
+        Returns the SDK curves driven by the attr.
+        """
+        if self._curves is None:
+            self._build()
+        return list(self._curves.get(attr, []))
+
+    def driven(self, attr):
+        """
+        Returns the ctls driven by the attr, same as get_driven_from_attr.
+        """
+        if self._curves is None:
+            self._build()
+        return list(self._driven.get(attr, []))
+
+    def keys(self, attr):
+        """
+        Returns the driver key values of the attr, same as get_driver_keys.
+        """
+        keys = self._keys.get(attr)
+        if keys is None:
+            keys = []
+            for curve in self.curves(attr):
+                for value in cmds.keyframe(curve,
+                                           query=True,
+                                           floatChange=True) or []:
+                    if value not in keys:
+                        keys.append(value)
+            self._keys[attr] = keys
+        return list(keys)
+
+    def _attr_changed(self, msg, plug, other_plug, client_data):
+        if msg & (om.MNodeMessage.kConnectionMade
+                  | om.MNodeMessage.kConnectionBroken):
+            self.refresh()
+
+    def watch(self):
+        """
+        Clears the cached data when the driver connections change.
+        """
+        if self._callback is not None:
+            return
+        sel = om.MSelectionList()
+        sel.add(self.driver)
+        mobj = om.MObject()
+        sel.getDependNode(0, mobj)
+        self._callback = om.MNodeMessage.addAttributeChangedCallback(
+            mobj, self._attr_changed)
+
+    def unwatch(self):
+        """
+        Removes the connection changes callback.
+        """
+        if self._callback is not None:
+            om.MMessage.removeCallback(self._callback)
+            self._callback = None
+
+
+def get_mirror(node):
+    """
+    Returns the mirror node using the scene symmetry map.
+    If the map doesn't have it, falls back to pickWalk.getMirror
+
+    Arguments:
+        node (PyNode): node to mirror
+
+    Returns:
+        PyNode : The mirror node
+    """
+    mirror_name = symmetry.getSymmetryMap().mirrorNode(node.name())
+    if mirror_name:
+        return pm.PyNode(mirror_name)
+    return pickWalk.getMirror(node)[0]
+
+
 def mirror_SDK(driverCtl):
     """
     Takes in a driver control and extrapolates out all the other
@@ -446,7 +647,7 @@ def mirror_SDK(driverCtl):
     """
 
     # Getting The Opposite Driver
-    t_driver = pickWalk.getMirror(driverCtl)[0]
+    t_driver = get_mirror(driverCtl)
 
     # Getting all the SDK Ctls + RHS Counterparts from Driver Ctl Name.
     driven_ctls_dict = {}
@@ -454,8 +655,9 @@ def mirror_SDK(driverCtl):
         for sdk_attr in sdk_attrs:
             if pm.nodeType(sdk_attr.node()) in SDK_ANIMCURVES_TYPE:
                 destination_ctl = sdk_io.getSDKDestination(sdk_attr.node())[0]
-                driven_ctls_dict[destination_ctl] = pickWalk.getMirror(
-                    pm.PyNode(destination_ctl))[0]
+                if destination_ctl not in driven_ctls_dict:
+                    driven_ctls_dict[destination_ctl] = get_mirror(
+                        pm.PyNode(destination_ctl))
 
     # Removing any Already Existing SDK's from the target driver.
     for s_driven, t_driven in driven_ctls_dict.items():
@@ -492,10 +694,8 @@ def get_current_SDKs():
             pm.warning("Please select a SDK ctl")
     else:
         # Get all ctls with is_SDK attr
-        for item in pm.ls("*.is_SDK"):
-            SDK_ctl = item.node()
-            if SDK_ctl not in all_ctls:
-                all_ctls.append(pm.PyNode(SDK_ctl))
+        for item in rig_index.get_index().tagged("is_SDK"):
+            all_ctls.append(pm.PyNode(item))
 
     if all_ctls:
         # getting all SDKs attatched to Ctls
@@ -506,6 +706,199 @@ def get_current_SDKs():
     return SDKs_to_set
 
 
+class SceneKeyBackend(object):
+    """
+    Maya scene access used by the batch keying functions.
+
+    The batch keying logic only talks to the scene through this object, so
+    it can be tested with a stand-in backend with the same methods.
+    """
+
+    def get_values(self, plugs):
+        """
+        Returns the values of the plugs in UI units, with one selection
+        list for all the plugs.
+        """
+        sel = om2.MSelectionList()
+        for plug in plugs:
+            sel.add(plug)
+        values = []
+        for i in range(sel.length()):
+            plug = sel.getPlug(i)
+            api_type = plug.attribute().apiType()
+            if api_type == om2.MFn.kDoubleAngleAttribute:
+                values.append(plug.asMAngle().asUnits(om2.MAngle.uiUnit()))
+            elif api_type == om2.MFn.kDoubleLinearAttribute:
+                values.append(
+                    plug.asMDistance().asUnits(om2.MDistance.uiUnit()))
+            else:
+                values.append(plug.asDouble())
+        return values
+
+    def set_values(self, plugs, values):
+        for plug, value in zip(plugs, values):
+            cmds.setAttr(plug, value)
+
+    def set_driven_keys(self,
+                        driverPlug,
+                        plugs,
+                        driverVal=None,
+                        drivenVal=None,
+                        inTanType="linear",
+                        outTanType="linear"):
+        """
+        Keys all the plugs with one setDrivenKeyframe call. The current
+        driver and driven values are used if the values are None.
+        """
+        kwargs = {"currentDriver": driverPlug,
+                  "inTangentType": inTanType,
+                  "outTangentType": outTanType}
+        if driverVal is not None:
+            kwargs["driverValue"] = driverVal
+        if drivenVal is not None:
+            kwargs["value"] = drivenVal
+        cmds.setDrivenKeyframe(plugs, **kwargs)
+
+    def driver_curves(self, driverPlug):
+        """
+        Returns the SDK curves connected to the driver plug.
+        """
+        cnx = cmds.listConnections(driverPlug,
+                                   source=False,
+                                   destination=True,
+                                   skipConversionNodes=True,
+                                   type="animCurve") or []
+        return set(cmds.ls(cnx, type=list(SDK_ANIMCURVES_TYPE)) or [])
+
+    def curve_destinations(self, curves):
+        """
+        Returns the driven plug of each curve. The blendWeighted nodes,
+        created when the plug has more than one driver, are followed to
+        the driven plug like get_SDK_destinations.
+        """
+        if not curves:
+            return {}
+        cnx = cmds.listConnections(list(curves),
+                                   source=False,
+                                   destination=True,
+                                   plugs=True,
+                                   connections=True,
+                                   skipConversionNodes=True) or []
+        blends = set(cmds.ls([dest.split(".")[0] for dest in cnx[1::2]],
+                             type="blendWeighted") or [])
+        blend_destinations = {}
+        if blends:
+            blend_cnx = cmds.listConnections(["{}.output".format(b)
+                                              for b in blends],
+                                             source=False,
+                                             destination=True,
+                                             plugs=True,
+                                             connections=True,
+                                             skipConversionNodes=True) or []
+            for plug, dest in zip(blend_cnx[::2], blend_cnx[1::2]):
+                blend_destinations.setdefault(plug.split(".")[0], dest)
+
+        destinations = {}
+        for plug, dest in zip(cnx[::2], cnx[1::2]):
+            node = dest.split(".")[0]
+            if node in blends:
+                dest = blend_destinations.get(node)
+            if dest:
+                destinations.setdefault(plug.split(".")[0], dest)
+        return destinations
+
+    def rename(self, node, name):
+        return cmds.rename(node, name)
+
+
+def key_driven_batch(drivenCtls,
+                     keyChannels,
+                     driver,
+                     driverAtt,
+                     zeroKey=False,
+                     currentKey=True,
+                     zeroDefaults=True,
+                     inTanType="linear",
+                     outTanType="linear",
+                     backend=None):
+    """
+    Sets the driven keys of all the driven ctls channels in one pass.
+
+    The driven values are read with one query. The zero keys are set with
+    one setDrivenKeyframe call per zero value, the driven values are
+    restored in one pass and the current values are keyed with one call.
+    The new SDK curves are renamed like set_driven_key does.
+
+    Arguments:
+        drivenCtls (list): List of String names of the Driven Ctls.
+        keyChannels (list): List of Channels to Key. i.e: ["translate"]
+        driver (PyNode or str): Driver Node
+        driverAtt (str): Driver Attr given as a string
+        zeroKey (bool / optional): if True, will set a key at the driver
+                                   zero value.
+        currentKey (bool / optional): if True, will set a key at the
+                                      current driver and driven values.
+        zeroDefaults (bool / optional): if True the zero key of the scale
+                                        channels is 1.0, else all the zero
+                                        keys are 0.0
+        inTanType (str / optional): Tangent type, by default is linear.
+        outTanType (str / optional): Tangent type, by default is linear.
+        backend (SceneKeyBackend / optional): The scene access.
+
+    Returns:
+        list (The new SDK curves names)
+    """
+    if backend is None:
+        backend = SceneKeyBackend()
+    driver = str(driver)
+    driverPlug = "{}.{}".format(driver, driverAtt)
+
+    plugs = []
+    zero_plugs = OrderedDict()
+    for dvn_ctl in drivenCtls:
+        for channel in keyChannels:
+            default_val = 1.0 if zeroDefaults and channel == "scale" else 0.0
+            for Ax in ["X", "Y", "Z"]:
+                plug = "{}.{}{}".format(dvn_ctl, channel, Ax)
+                plugs.append(plug)
+                zero_plugs.setdefault(default_val, []).append(plug)
+    if not plugs:
+        return []
+
+    curves_before = backend.driver_curves(driverPlug)
+
+    if zeroKey:
+        dvn_vals = backend.get_values(plugs)
+        for default_val, value_plugs in zero_plugs.items():
+            backend.set_driven_keys(driverPlug,
+                                    value_plugs,
+                                    driverVal=0,
+                                    drivenVal=default_val,
+                                    inTanType=inTanType,
+                                    outTanType=outTanType)
+        # Setting the Driven Ctls back to its previous values
+        backend.set_values(plugs, dvn_vals)
+
+    if currentKey:
+        backend.set_driven_keys(driverPlug,
+                                plugs,
+                                inTanType=inTanType,
+                                outTanType=outTanType)
+
+    # renaming, with the driven attr like set_driven_key
+    new_curves = backend.driver_curves(driverPlug) - curves_before
+    renamed = []
+    driven_attrs = set(plug.split(".")[-1] for plug in plugs)
+    destinations = backend.curve_destinations(new_curves)
+    for curve in sorted(new_curves):
+        dest = destinations.get(curve)
+        if dest and dest.split(".")[-1] in driven_attrs:
+            curve = backend.rename(curve, "{}_{}".format(
+                driver, dest.split(".")[-1]))
+        renamed.append(curve)
+    return renamed
+
+
 def set_zero_key(drivenCtls,
                  keyChannels,
                  driver,
@@ -528,24 +921,15 @@ def set_zero_key(drivenCtls,
         n/a
 
     """
-    for dvn_ctl in drivenCtls:
-        dvn_ctl = pm.PyNode(dvn_ctl)
-        for channel in keyChannels:
-            for Ax in ["X", "Y", "Z"]:
-                # Getting the Channel value, if it is default, set a Zero Key.
-                dvn_val = dvn_ctl.attr(channel + Ax).get()
-                default_val = 1.0 if channel == "scale" else 0.0
-                # Setting ZERO KEY
-                set_driven_key(driverAttr=driver.attr(driverAtt),
-                               drivenAttr=dvn_ctl.attr(channel + Ax),
-                               driverVal=0,
-                               drivenVal=default_val,
-                               preInfinity=0,
-                               postInfinity=0,
-                               inTanType=inTanType,
-                               outTanType=outTanType)
-                # Setting the Driven Ctl back to its previous value
-                dvn_ctl.attr(channel + Ax).set(dvn_val)
+    key_driven_batch(drivenCtls,
+                     keyChannels,
+                     driver,
+                     driverAtt,
+                     zeroKey=True,
+                     currentKey=False,
+                     zeroDefaults=True,
+                     inTanType=inTanType,
+                     outTanType=outTanType)
 
 
 def key_at_current_values(drivenCtls,
@@ -570,36 +954,16 @@ def key_at_current_values(drivenCtls,
     Returns:
         n/a
     """
-    # Setting SDK At Current Values
-    for dvn_ctl in drivenCtls:
-        dvn_ctl = pm.PyNode(dvn_ctl)
-        for channel in keyChannels:
-            for Ax in ["X", "Y", "Z"]:
-                if zeroKey:
-                    # Getting the Channel values default, and setting a
-                    # Zero Key.
-                    dvn_val = dvn_ctl.attr(channel + Ax).get()
-                    # default_val = 1.0 if channel == "scale" else 0.0
-                    # Setting ZERO KEY
-                    set_driven_key(driverAttr=driver.attr(driverAtt),
-                                   drivenAttr=dvn_ctl.attr(channel + Ax),
-                                   driverVal=0,
-                                   drivenVal=0,
-                                   preInfinity=0,
-                                   postInfinity=0,
-                                   inTanType=inTanType,
-                                   outTanType=outTanType)
-                    # Setting the Driven Ctl back to its previous value
-                    dvn_ctl.attr(channel + Ax).set(dvn_val)
-
-                set_driven_key(driverAttr=driver.attr(driverAtt),
-                               drivenAttr=dvn_ctl.attr(channel + Ax),
-                               driverVal=driver.attr(driverAtt).get(),
-                               drivenVal=dvn_ctl.attr(channel + Ax).get(),
-                               preInfinity=0,
-                               postInfinity=0,
-                               inTanType=inTanType,
-                               outTanType=outTanType)
+    # the zero key value is 0.0 for all the channels
+    key_driven_batch(drivenCtls,
+                     keyChannels,
+                     driver,
+                     driverAtt,
+                     zeroKey=zeroKey,
+                     currentKey=True,
+                     zeroDefaults=False,
+                     inTanType=inTanType,
+                     outTanType=outTanType)
 
 
 def delete_current_value_keys(current_driver_val, node, sourceDriverFilter):
@@ -628,42 +992,120 @@ def delete_current_value_keys(current_driver_val, node, sourceDriverFilter):
                           clear=1)
 
 
-def prune_DK_nodes(white_list=[]):
+def _connection_table(nodes, attr, source=True):
+    """
+    Returns the nodes connected to the node attr, for all the nodes with
+    one query.
+
+    Arguments:
+        nodes (list of str): The nodes names
+        attr (str): The attribute name. i.e: "input"
+        source (bool): If True will list the input connections, else the
+                       output connections
+
+    Returns:
+        dict {node name: set of connected nodes names}
+    """
+    table = dict((node, set()) for node in nodes)
+    if not nodes:
+        return table
+    cnx = cmds.listConnections(["{}.{}".format(n, attr) for n in nodes],
+                               source=source,
+                               destination=not source,
+                               connections=True) or []
+    for plug, connected in zip(cnx[::2], cnx[1::2]):
+        node = plug.split(".")[0]
+        if node in table:
+            table[node].add(connected)
+    return table
+
+
+def scan_DK_nodes(white_list=None):
+    """
+    Finds the driven key nodes left unused by the SDK edits.
+
+    The connections of all the candidate nodes are read with one query per
+    node type and attribute.
+
+    - curves: SDK curves without input or output connections. Nodes with
+      the word profile in are excluded so that no guide components are
+      broken.
+    - blendWeighted: nodes without output, or with only orphan curves as
+      inputs.
+    - unitConversion: nodes without input or output, or with only orphan
+      curves as outputs.
+
+    Arguments:
+        white_list (list / optional): List of nodes to ignore
+
+    Returns:
+        dict {"curves": [], "blendWeighted": [], "unitConversion": []}
+    """
+    white_list = set(str(n) for n in white_list or [])
+
+    def candidates(node_type):
+        return [n for n in cmds.ls(type=node_type) or []
+                if n not in white_list and "profile" not in n]
+
+    curves = candidates(list(SDK_ANIMCURVES_TYPE))
+    curve_inputs = _connection_table(curves, "input")
+    curve_outputs = _connection_table(curves, "output", source=False)
+    orphan_curves = set(c for c in curves
+                        if not curve_inputs[c] or not curve_outputs[c])
+
+    blends = candidates("blendWeighted")
+    blend_inputs = _connection_table(blends, "input")
+    blend_outputs = _connection_table(blends, "output", source=False)
+    orphan_blends = set(b for b in blends
+                        if not blend_outputs[b]
+                        or blend_inputs[b] <= orphan_curves)
+
+    conversions = candidates("unitConversion")
+    conversion_inputs = _connection_table(conversions, "input")
+    conversion_outputs = _connection_table(conversions,
+                                           "output",
+                                           source=False)
+    unused_conversions = set(
+        u for u in conversions
+        if not conversion_inputs[u]
+        or conversion_outputs[u] <= orphan_curves | orphan_blends)
+
+    return {"curves": [c for c in curves if c in orphan_curves],
+            "blendWeighted": [b for b in blends if b in orphan_blends],
+            "unitConversion": [u for u in conversions
+                               if u in unused_conversions]}
+
+
+def prune_DK_nodes(white_list=[], utility_nodes=False):
     """
     Finds all the driven key nodes that have no
     input or output connected and removes them.
     Nodes with the word profile in are excluded
     so that no guide components are broken.
 
+    The nodes are found with scan_DK_nodes and deleted in one call.
+
     Arguments:
         white_list (list / optional): List of nodes to ignore
+        utility_nodes (bool / optional): If True will also delete the
+            orphan blendWeighted and unused unitConversion nodes
 
     Returns:
         list (All the names of the deleted nodes)
     """
-    # Getting all the anim nodes in scene
-    all_anim_nodes = pm.ls(type=SDK_ANIMCURVES_TYPE)
+    report = scan_DK_nodes(white_list)
+    categories = ["curves"]
+    if utility_nodes:
+        categories.extend(["blendWeighted", "unitConversion"])
 
-    # If a node has no connections, store it.
     problem_nodes = []
-    for anim_node in all_anim_nodes:
-        if not pm.listConnections(anim_node.input):
-            if anim_node not in problem_nodes:
-                if anim_node not in white_list:
-                    if "profile" not in anim_node.nodeName():
-                        problem_nodes.append(anim_node)
-        if not pm.listConnections(anim_node.output):
-            if anim_node not in problem_nodes:
-                if anim_node not in white_list:
-                    if "profile" not in anim_node.nodeName():
-                        problem_nodes.append(anim_node)
+    for category in categories:
+        problem_nodes.extend(report[category])
 
     # Deleting the problem nodes
-    for node in problem_nodes:
-        pm.delete(node)
-
-    # node names
-    deleted_nodes = [x.nodeName() for x in problem_nodes]
+    deleted_nodes = cmds.ls(problem_nodes)
+    if deleted_nodes:
+        cmds.delete(deleted_nodes)
 
     if deleted_nodes:
         print("Deleted Nodes:")
@@ -672,22 +1114,409 @@ def prune_DK_nodes(white_list=[]):
     else:
         print("No Nodes found to delete")
 
+    for category in ("blendWeighted", "unitConversion"):
+        if category not in categories and report[category]:
+            print("Unused {} nodes found: {}".format(category,
+                                                     len(report[category])))
+
     return deleted_nodes
 
 
+# ================================================= #
+# Transfer
+# ================================================= #
+
+_TANGENT_TYPES = {"auto": om2.MFnAnimCurve.kTangentAuto,
+                  "clamped": om2.MFnAnimCurve.kTangentClamped,
+                  "fast": om2.MFnAnimCurve.kTangentFast,
+                  "fixed": om2.MFnAnimCurve.kTangentFixed,
+                  "flat": om2.MFnAnimCurve.kTangentFlat,
+                  "linear": om2.MFnAnimCurve.kTangentLinear,
+                  "plateau": om2.MFnAnimCurve.kTangentPlateau,
+                  "slow": om2.MFnAnimCurve.kTangentSlow,
+                  "spline": om2.MFnAnimCurve.kTangentSmooth,
+                  "step": om2.MFnAnimCurve.kTangentStep,
+                  "stepnext": om2.MFnAnimCurve.kTangentStepNext}
+
+
+def _to_internal_value(curve_type, value):
+    # the exported key values are in UI units
+    if curve_type == "animCurveUA":
+        return om2.MAngle(value, om2.MAngle.uiUnit()).asRadians()
+    if curve_type == "animCurveUL":
+        return om2.MDistance(value, om2.MDistance.uiUnit()).asCentimeters()
+    return value
+
+
+def rig_nodes(roots):
+    """
+    Returns the names of the transforms of the rigs.
+
+    Arguments:
+        roots (str or list): The rig roots. If None, all the scene
+                             transforms
+
+    Returns:
+        list (the transforms names)
+    """
+    if roots is None:
+        return cmds.ls(type="transform") or []
+    if not isinstance(roots, (list, tuple)):
+        roots = [roots]
+    roots = [str(r) for r in roots]
+    nodes = list(roots)
+    nodes.extend(cmds.listRelatives(roots,
+                                    allDescendents=True,
+                                    type="transform") or [])
+    return nodes
+
+
+def collect_SDK_data(nodes=None):
+    """
+    Returns the SDK data of the driven nodes, with the same format of the
+    sdk_io.exportSDKs files.
+
+    Arguments:
+        nodes (list / optional): The driven nodes names. If None, all the
+                                 SDKs in the scene
+
+    Returns:
+        dict {SDK name: SDK info}
+    """
+    curves = cmds.ls(type=list(SDK_ANIMCURVES_TYPE)) or []
+    if nodes is not None:
+        nodes = set(str(n) for n in nodes)
+    data = {}
+    for curve, driven in get_SDK_destinations(curves).items():
+        if nodes is not None and driven not in nodes:
+            continue
+        try:
+            data[curve] = sdk_io.getSDKInfo(pm.PyNode(curve))
+        except IndexError:
+            # curve without driver
+            continue
+    return data
+
+
+def _source_plug(plug):
+    """
+    Returns the source plug, skipping the unit conversion nodes, or None.
+    """
+    source = plug.source()
+    while (not source.isNull
+           and source.node().hasFn(om2.MFn.kUnitConversion)):
+        source = om2.MFnDependencyNode(source.node()).findPlug(
+            "input", False).source()
+    if source.isNull:
+        return None
+    return source
+
+
+def get_SDK_curves(driverPlug, drivenPlug):
+    """
+    Returns the SDK curves of the driver plug keying the driven plug,
+    directly or through a blendWeighted node.
+
+    Arguments:
+        driverPlug (MPlug): The driver plug
+        drivenPlug (MPlug): The driven plug
+
+    Returns:
+        list (The curves MObjects)
+    """
+    source = _source_plug(drivenPlug)
+    if source is None:
+        return []
+    fn_node = om2.MFnDependencyNode(source.node())
+    if fn_node.typeName == "blendWeighted":
+        inputs = fn_node.findPlug("input", False)
+        sources = [_source_plug(inputs.elementByPhysicalIndex(i))
+                   for i in range(inputs.numElements())]
+    else:
+        sources = [source]
+
+    curves = []
+    for plug in sources:
+        if plug is None or not plug.node().hasFn(om2.MFn.kAnimCurve):
+            continue
+        curve_input = _source_plug(
+            om2.MFnDependencyNode(plug.node()).findPlug("input", False))
+        if curve_input is not None and curve_input == driverPlug:
+            curves.append(plug.node())
+    return curves
+
+
+def _set_curve_keys(fn_curve, step):
+    # replaces the keys and the settings of the curve by the step ones
+    for i in reversed(range(fn_curve.numKeys)):
+        fn_curve.remove(i)
+    default_tangent = om2.MFnAnimCurve.kTangentGlobal
+    for key in step["keys"]:
+        fn_curve.addKey(key[0],
+                        _to_internal_value(step["type"], key[1]),
+                        _TANGENT_TYPES.get(key[2], default_tangent),
+                        _TANGENT_TYPES.get(key[3], default_tangent))
+    fn_curve.setPreInfinityType(step["preInfinity"])
+    fn_curve.setPostInfinityType(step["postInfinity"])
+    fn_curve.setIsWeighted(bool(step["weightedTangents"]))
+
+
+def apply_transfer_plan(plan, existing="replace"):
+    """
+    Creates the SDK curves of a transfer plan.
+
+    The curves of the driven plugs without connections are created and
+    connected with one modifier and the keys are added with the API. The
+    driven plugs already connected, or with several curves in the plan,
+    need a blendWeighted node and are created with
+    sdk_io.createSDKFromDict.
+
+    The driven plugs already keyed by the step driver, i.e: when the
+    transfer is run again, are not keyed a second time. By default the keys
+    of the existing curve are replaced.
+
+    Arguments:
+        plan (TransferPlan): The plan, see transfer_plan.planTransfer
+        existing (str / optional): What to do with the existing curves:
+                                   "replace" the keys, "skip" the step, or
+                                   "add" a new curve through a
+                                   blendWeighted node
+
+    Returns:
+        list (The created and replaced curves names)
+    """
+    if existing not in ("replace", "skip", "add"):
+        raise ValueError("Invalid existing option: {}".format(existing))
+    if not plan.steps:
+        return []
+
+    sel = om2.MSelectionList()
+    for step in plan.steps:
+        sel.add("{}.{}".format(step["driverNode"], step["driverAttr"]))
+        sel.add("{}.{}".format(step["drivenNode"], step["drivenAttr"]))
+
+    created = []
+    steps = []
+    plugs = []
+    for i, step in enumerate(plan.steps):
+        driver_plug = sel.getPlug(i * 2)
+        driven_plug = sel.getPlug(i * 2 + 1)
+        curves = []
+        if existing != "add":
+            curves = get_SDK_curves(driver_plug, driven_plug)
+        if not curves:
+            steps.append(step)
+            plugs.append((driver_plug, driven_plug))
+        elif existing == "replace":
+            fn_curve = om2.MFnAnimCurve(curves[0])
+            _set_curve_keys(fn_curve, step)
+            created.append(fn_curve.name())
+
+    driven_plugs = OrderedDict()
+    for i, step in enumerate(steps):
+        plug = "{}.{}".format(step["drivenNode"], step["drivenAttr"])
+        driven_plugs.setdefault(plug, []).append(i)
+    if not driven_plugs:
+        return created
+    cnx = cmds.listConnections(list(driven_plugs),
+                               source=True,
+                               destination=False,
+                               plugs=True,
+                               connections=True) or []
+    connected = set(cnx[::2])
+
+    bulk_steps = []
+    blend_steps = []
+    for plug, indices in driven_plugs.items():
+        if len(indices) == 1 and plug not in connected:
+            bulk_steps.append(indices[0])
+        else:
+            blend_steps.extend(indices)
+
+    if bulk_steps:
+        mod = om2.MDGModifier()
+        curves = []
+        for i in bulk_steps:
+            curve = mod.createNode(steps[i]["type"])
+            mod.renameNode(curve, steps[i]["name"])
+            fn_curve = om2.MFnDependencyNode(curve)
+            mod.connect(plugs[i][0], fn_curve.findPlug("input", False))
+            mod.connect(fn_curve.findPlug("output", False), plugs[i][1])
+            curves.append(curve)
+        mod.doIt()
+
+        for curve, i in zip(curves, bulk_steps):
+            fn_curve = om2.MFnAnimCurve(curve)
+            _set_curve_keys(fn_curve, steps[i])
+            created.append(fn_curve.name())
+
+    for i in blend_steps:
+        curve = sdk_io.createSDKFromDict(steps[i])
+        created.append(pm.rename(curve, steps[i]["name"]).name())
+
+    return created
+
+
+def transfer_SDKs(source,
+                  target=None,
+                  remap=None,
+                  replace=None,
+                  dryRun=False,
+                  existing="replace"):
+    """
+    Transfers the SDKs from a source rig or SDK file to a target rig.
+
+    The drivers and driven nodes are mapped by name, using the remap table
+    and the replace rules. The unmatched nodes are reported and skipped.
+
+    Arguments:
+        source (str, dict or list): The SDK json file path, the SDK data or
+                                    the source rig roots
+        target (str or list / optional): The target rig roots. If None,
+                                         all the scene transforms
+        remap (dict / optional): source name -> target name
+        replace (list / optional): (search, replace) pairs applied to the
+                                   source names. i.e: [("charA:", "charB:")]
+        dryRun (bool / optional): If True will only compute the plan
+        existing (str / optional): What to do with the driven plugs
+                                   already keyed by the driver, see
+                                   apply_transfer_plan
+
+    Returns:
+        TransferPlan
+    """
+    if isinstance(source, dict):
+        sdk_data = source
+    elif (not isinstance(source, (list, tuple))
+          and str(source).endswith(".json")):
+        sdk_data = sdk_io._importData(source) or {}
+    else:
+        sdk_data = collect_SDK_data(rig_nodes(source))
+
+    plan = transfer_plan.planTransfer(sdk_data,
+                                      rig_nodes(target),
+                                      remap=remap,
+                                      replace=replace)
+    if not dryRun:
+        apply_transfer_plan(plan, existing=existing)
+    print(plan.report())
+    return plan
+
+
 # ================================================= #
 # Attributes
 # ================================================= #
 # Note: This could be moved to another mGear
 # module but will leave here for now.
 
+LIMIT_AXES = "xyz"
+
+
+def _limit_plugs(axis):
+    Ax = axis.upper()
+    return ("minTrans{}Limit".format(Ax),
+            "maxTrans{}Limit".format(Ax),
+            "minTrans{}LimitEnable".format(Ax),
+            "maxTrans{}LimitEnable".format(Ax))
+
+
+def _to_ui_distance(plug):
+    return plug.asMDistance().asUnits(om2.MDistance.uiUnit())
+
+
+def read_limits(controls, axes=LIMIT_AXES):
+    """
+    Reads the translate values and limits of all the controls in one pass.
+
+    Arguments:
+        controls (list): List of controls, PyNodes or names
+        axes (str / optional): The axes to read. i.e: "xz"
+
+    Returns:
+        dict {control name: {"value": {axis: float},
+                             "limits": {axis: [min, max]},
+                             "enabled": {axis: [bool, bool]}}}
+    """
+    controls = [str(c) for c in controls]
+    sel = om2.MSelectionList()
+    for control in controls:
+        sel.add(control)
+
+    data = OrderedDict()
+    for i, control in enumerate(controls):
+        fn_node = om2.MFnDependencyNode(sel.getDependNode(i))
+        ctl_data = {"value": {}, "limits": {}, "enabled": {}}
+        for axis in axes:
+            min_attr, max_attr, min_enable, max_enable = _limit_plugs(axis)
+            ctl_data["value"][axis] = _to_ui_distance(
+                fn_node.findPlug("translate" + axis.upper(), False))
+            ctl_data["limits"][axis] = [
+                _to_ui_distance(fn_node.findPlug(min_attr, False)),
+                _to_ui_distance(fn_node.findPlug(max_attr, False))]
+            ctl_data["enabled"][axis] = [
+                fn_node.findPlug(min_enable, False).asBool(),
+                fn_node.findPlug(max_enable, False).asBool()]
+        data[control] = ctl_data
+    return data
+
+
+def apply_limits(data):
+    """
+    Applies the limits and limits states, with one transformLimits call
+    per control, in one undo chunk.
+
+    Arguments:
+        data (dict): The limits data, as returned by read_limits. Only the
+            "limits" and "enabled" values are applied.
+    """
+    cmds.undoInfo(openChunk=True, chunkName="apply_limits")
+    try:
+        for control, ctl_data in data.items():
+            kwargs = {}
+            for axis, limits in ctl_data.get("limits", {}).items():
+                kwargs["translation" + axis.upper()] = list(limits)
+            for axis, states in ctl_data.get("enabled", {}).items():
+                kwargs["enableTranslation" + axis.upper()] = [bool(i)
+                                                              for i in states]
+            if kwargs:
+                cmds.transformLimits(control, **kwargs)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+
+def toggled_limits(data, axes=LIMIT_AXES):
+    """
+    Returns the limits data with the limits states of the axes inverted.
+    """
+    for ctl_data in data.values():
+        for axis in axes:
+            ctl_data["enabled"][axis] = [not i
+                                         for i in ctl_data["enabled"][axis]]
+    return data
+
+
+def limits_from_current(data, axes=LIMIT_AXES, upper=False, lower=False):
+    """
+    Returns the limits data with the upper and/or lower limits of the
+    axes set to the current translate values and enabled.
+    """
+    for ctl_data in data.values():
+        for axis in axes:
+            value = ctl_data["value"][axis]
+            for index, update in ((0, lower), (1, upper)):
+                if update:
+                    ctl_data["limits"][axis][index] = value
+                    ctl_data["enabled"][axis][index] = True
+    return data
+
+
 def toggle_limits(axis, controls=None):
     """
     Toggles the controller translate Limits On or Off
     from their current values, both upper and lower.
 
     Aruments:
-        axis (str): x,y,z axis to use.
+        axis (str): x,y,z axis to use. Can be multiple axes, i.e: "xyz"
         controls (list / optional): List of PyNodes to iterate over
                                     If None, use Selection
 
@@ -696,23 +1525,10 @@ def toggle_limits(axis, controls=None):
     # If no controls are provided, use selection
     if not controls:
         controls = pm.ls(sl=True, type="transform")
+    if not controls:
+        return
 
-    # Loop over controls and toggle the limits
-    for control in controls:
-        if axis == "x":
-            current_status = pm.transformLimits(control, q=True, etx=True)
-            current_status_inv = [not i for i in current_status]
-            pm.transformLimits(control, etx=current_status_inv)
-
-        elif axis == "y":
-            current_status = pm.transformLimits(control, q=True, ety=True)
-            current_status_inv = [not i for i in current_status]
-            pm.transformLimits(control, ety=current_status_inv)
-
-        elif axis == "z":
-            current_status = pm.transformLimits(control, q=True, etz=True)
-            current_status_inv = [not i for i in current_status]
-            pm.transformLimits(control, etz=current_status_inv)
+    apply_limits(toggled_limits(read_limits(controls, axis), axis))
 
 
 def set_limits_from_current(axis,
@@ -727,12 +1543,8 @@ def set_limits_from_current(axis,
     > update either the lower or the upper
     > set limits to Enabled.
 
-    There is a lot of duplicate code but its a bit unavoidable
-    with how transformLimits flags are set up.
-
-
     Aruments:
-        axis (str): x,y,z axis to use.
+        axis (str): x,y,z axis to use. Can be multiple axes, i.e: "xyz"
         controls (list): List of PyNodes to iterate over
         upperLimit (bool): If True will set the upper Limit
         lowwerLimit (bool): If True will set the lowwer Limit
@@ -741,71 +1553,58 @@ def set_limits_from_current(axis,
     # If no controls are provided, use selection
     if not controls:
         controls = pm.ls(sl=True, type="transform")
+    if not controls:
+        return
 
-    # Loop over controls and toggle the limits
-    for control in controls:
+    apply_limits(limits_from_current(read_limits(controls, axis),
+                                     axis,
+                                     upper=upperLimit,
+                                     lower=lowwerLimit))
+
+
+def export_limits_preset(controls=None, filePath=None, axes=LIMIT_AXES):
+    """
+    Exports the translate limits of the controls as a preset.
+
+    Arguments:
+        controls (list / optional): List of controls. If None, use Selection
+        filePath (str / optional): If set, the preset is saved as json
+        axes (str / optional): The axes to export
+
+    Returns:
+        dict (The preset data)
+    """
+    if not controls:
+        controls = pm.ls(sl=True, type="transform")
+    data = read_limits(controls, axes)
+    preset = OrderedDict()
+    for control, ctl_data in data.items():
+        preset[control] = {"limits": ctl_data["limits"],
+                           "enabled": ctl_data["enabled"]}
+    if filePath:
+        sdk_io._exportData(preset, filePath)
+    return preset
+
+
+def import_limits_preset(preset):
+    """
+    Applies a limits preset. The controls not found in the scene are
+    skipped, so a preset can be applied to a new rig version.
 
-        current_val = pm.getAttr(control.attr("translate" + axis.capitalize()))
-
-        # ----------------------------------------------
-        # X
-        # ----------------------------------------------
-        if axis == "x":
-            current_limit_vals = pm.transformLimits(control, q=True, tx=True)
-            current_limits = pm.transformLimits(control, q=True, etx=True)
-
-            if upperLimit:
-                current_limit_vals[1] = current_val
-                current_limits[1] = True
-                pm.transformLimits(control,
-                                   tx=current_limit_vals,
-                                   etx=current_limits)
-
-            if lowwerLimit:
-                current_limit_vals[0] = current_val
-                current_limits[0] = True
-                pm.transformLimits(control,
-                                   tx=current_limit_vals,
-                                   etx=current_limits)
-
-        # ----------------------------------------------
-        # Y
-        # ----------------------------------------------
-        if axis == "y":
-            current_limit_vals = pm.transformLimits(control, q=True, ty=True)
-            current_limits = pm.transformLimits(control, q=True, ety=True)
-
-            if upperLimit:
-                current_limit_vals[1] = current_val
-                current_limits[1] = True
-                pm.transformLimits(control,
-                                   ty=current_limit_vals,
-                                   ety=current_limits)
-
-            if lowwerLimit:
-                current_limit_vals[0] = current_val
-                current_limits[0] = True
-                pm.transformLimits(control,
-                                   ty=current_limit_vals,
-                                   ety=current_limits)
-
-        # ----------------------------------------------
-        # Z
-        # ----------------------------------------------
-        if axis == "z":
-            current_limit_vals = pm.transformLimits(control, q=True, tz=True)
-            current_limits = pm.transformLimits(control, q=True, etz=True)
-
-            if upperLimit:
-                current_limit_vals[1] = current_val
-                current_limits[1] = True
-                pm.transformLimits(control,
-                                   tz=current_limit_vals,
-                                   etz=current_limits)
-
-            if lowwerLimit:
-                current_limit_vals[0] = current_val
-                current_limits[0] = True
-                pm.transformLimits(control,
-                                   tz=current_limit_vals,
-                                   etz=current_limits)
+    Arguments:
+        preset (dict or str): The preset data or the json file path
+
+    Returns:
+        list (The names of the controls updated)
+    """
+    if not isinstance(preset, dict):
+        preset = sdk_io._importData(preset) or {}
+    data = OrderedDict()
+    for control, ctl_data in preset.items():
+        if cmds.objExists(control):
+            data[control] = ctl_data
+        else:
+            pm.warning("Limits preset: {} not found".format(control))
+    if data:
+        apply_limits(data)
+    return list(data)
@@ -0,0 +1,168 @@
+"""SDK transfer planner
+
+Map the SDKs of a source rig, or of an exported SDK json, to a target rig
+and compute the plan of the curves to create. The planner doesn't use Maya,
+so the transfers can be checked outside Maya.
+
+The SDK data is the dictionary written by sdk_io.exportSDKs, SDK name ->
+SDK info, with the "driverNode", "driverAttr", "drivenNode", "drivenAttr"
+and "keys" keys.
+
+The source nodes are mapped by name. A remap table maps source names to
+target names, and replace rules, (search, replace) pairs, are applied to
+the names not in the table. i.e: to change the namespace.
+
+Example::
+
+    from mgear.rigbits.sdk_manager import transfer_plan
+    plan = transfer_plan.planTransfer(sdkData,
+                                      targetNodes,
+                                      replace=[("charA:", "charB:")])
+    print(plan.report())
+"""
+
+import json
+from collections import OrderedDict
+
+
+class NameMapper(object):
+    """Map the source node names to the target node names
+
+    Args:
+        targetNodes (iterable): The node names in the target
+        remap (dict, optional): source name -> target name
+        replace (list, optional): (search, replace) pairs applied in order
+            to the names not in the remap table
+    """
+
+    def __init__(self, targetNodes, remap=None, replace=None):
+        self.targetNodes = set(targetNodes)
+        self.remap = dict(remap or {})
+        self.replace = list(replace or [])
+        self._cache = {}
+
+    def targetName(self, name):
+        """Return the target name, without checking the target nodes"""
+        if name in self.remap:
+            return self.remap[name]
+        for search, replace in self.replace:
+            name = name.replace(search, replace)
+        return name
+
+    def map(self, name):
+        """Return the target node name, or None if not in the target"""
+        if name not in self._cache:
+            target = self.targetName(name)
+            self._cache[name] = target if target in self.targetNodes else None
+        return self._cache[name]
+
+
+class TransferPlan(object):
+    """The curves to create to transfer the SDKs
+
+    Attributes:
+        steps (list of dict): The SDK info of each curve to create, with the
+            target names. "source" is the source SDK name and "name" the
+            new curve name
+        drivers (dict): source driver -> target driver
+        driven (dict): source driven -> target driven
+        unmatchedDrivers (list): Source drivers not found in the target
+        unmatchedDriven (list): Source driven nodes not found in the target
+        skipped (list): Source SDK names not transferred
+        blended (list): Target driven plugs with several curves, need a
+            blendWeighted node
+    """
+
+    def __init__(self):
+        self.steps = []
+        self.drivers = {}
+        self.driven = {}
+        self.unmatchedDrivers = []
+        self.unmatchedDriven = []
+        self.skipped = []
+        self.blended = []
+
+    @property
+    def valid(self):
+        return not self.unmatchedDrivers and not self.unmatchedDriven
+
+    def drivenPlugs(self):
+        """Return the target driven plug -> steps indices"""
+        plugs = OrderedDict()
+        for i, step in enumerate(self.steps):
+            plug = "{}.{}".format(step["drivenNode"], step["drivenAttr"])
+            plugs.setdefault(plug, []).append(i)
+        return plugs
+
+    def asDict(self):
+        return {"steps": self.steps,
+                "drivers": self.drivers,
+                "driven": self.driven,
+                "unmatchedDrivers": self.unmatchedDrivers,
+                "unmatchedDriven": self.unmatchedDriven,
+                "skipped": self.skipped,
+                "blended": self.blended}
+
+    def toJson(self, indent=4):
+        return json.dumps(self.asDict(), indent=indent, sort_keys=True)
+
+    def report(self):
+        """Return a short text report of the plan"""
+        lines = ["SDK transfer: {} curves, {} drivers, {} driven".format(
+            len(self.steps), len(self.drivers), len(self.driven))]
+        for label, names in (("Unmatched drivers", self.unmatchedDrivers),
+                             ("Unmatched driven", self.unmatchedDriven)):
+            if names:
+                lines.append("{} ({}):".format(label, len(names)))
+                lines.extend("    " + n for n in names)
+        if self.skipped:
+            lines.append("Skipped SDKs: {}".format(len(self.skipped)))
+        return "\n".join(lines)
+
+
+def planTransfer(sdkData, targetNodes, remap=None, replace=None):
+    """Compute the plan to transfer the SDKs to the target nodes
+
+    Args:
+        sdkData (dict): SDK name -> SDK info, as exported by sdk_io
+        targetNodes (iterable): The node names in the target
+        remap (dict, optional): source name -> target name
+        replace (list, optional): (search, replace) pairs
+
+    Returns:
+        TransferPlan: The plan
+    """
+    mapper = NameMapper(targetNodes, remap, replace)
+    plan = TransferPlan()
+    unmatchedDrivers = set()
+    unmatchedDriven = set()
+
+    for sdkName in sorted(sdkData):
+        info = sdkData[sdkName]
+        driver = mapper.map(info["driverNode"])
+        driven = mapper.map(info["drivenNode"])
+        if driver is None:
+            unmatchedDrivers.add(info["driverNode"])
+        else:
+            plan.drivers[info["driverNode"]] = driver
+        if driven is None:
+            unmatchedDriven.add(info["drivenNode"])
+        else:
+            plan.driven[info["drivenNode"]] = driven
+        if driver is None or driven is None:
+            plan.skipped.append(sdkName)
+            continue
+
+        step = dict(info)
+        step["source"] = sdkName
+        step["driverNode"] = driver
+        step["drivenNode"] = driven
+        # named like the curves of set_driven_key
+        step["name"] = "{}_{}".format(driver, info["drivenAttr"])
+        plan.steps.append(step)
+
+    plan.unmatchedDrivers = sorted(unmatchedDrivers)
+    plan.unmatchedDriven = sorted(unmatchedDriven)
+    plan.blended = [plug for plug, indices in plan.drivenPlugs().items()
+                    if len(indices) > 1]
+    return plan
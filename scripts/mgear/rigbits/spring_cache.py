@@ -0,0 +1,543 @@
+"""Rigbits spring cache
+
+Simulate the postSpring rigs offline and cache the result, without stepping
+the timeline. The animation of the spring objects is sampled with a DG
+context for each frame, then the springs of all the chains are solved with
+NumPy, one hierarchy level at a time, and the rotation of each "_spr_cns"
+node is written to a memory-mapped cache file.
+
+The solver uses the same damping, stiffness and intensity values of the
+gear_spring_op nodes, read at the first frame. For each link and frame::
+
+    velocity = (position - previous) * (1 - damping)
+    new = position + velocity
+    new += (goal - new) * stiffness
+    output = goal + (new - goal) * intensity
+
+The "_spr_cns" node is aimed to the output, like the aim constraint of the
+spring rig, and the solved rotation is propagated down the chain.
+
+The cache is a .npy array of float32, frames x links x 3 rotation in
+degrees, and a .json header with the link names and the first frame.
+apply_cache keys the cached rotations in cache curves connected to the
+pairBlend keyed input, so the cache is played with the spring active channel
+set to 0. remove_cache deletes the cache curves and restores the rest keys.
+
+Example::
+
+    from mgear.rigbits import spring_cache
+    cache = spring_cache.cache_springs("/tmp/shot010_springs")
+    spring_cache.apply_cache(cache)
+    spring_cache.remove_cache()
+"""
+
+import json
+import os
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+from mgear.rigbits import profiler
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# spring cache file format version
+CACHE_VERSION = 1
+
+CNS_SUFFIX = "_spr_cns"
+
+# suffix of the cache curves keying the spring pairBlend
+CACHE_CURVE_SUFFIX = "_springCache"
+
+# message attribute of the cache curves, connected to the rest curve
+REST_ATTR = "springRestCurve"
+
+
+######################################################################
+# Solver
+######################################################################
+
+class SpringSample(object):
+    """The sampled spring links
+
+    The links are sorted parents first. N is the number of links and F the
+    number of frames. The matrices are Maya row matrices, world = local x
+    parent.
+
+    Attributes:
+        names (list of str): The spring objects
+        prev (ndarray): (N,) index of the previous link, -1 for the roots
+        npo (ndarray): (N, 4, 4) local matrix of the "_npo" nodes
+        offset (ndarray): (N, 4, 4) matrix of the npo parent relative to
+            the previous link. Not used by the roots
+        lvl (ndarray): (N, 4, 4) local matrix of the "_spr_lvl" nodes
+        cns_translation (ndarray): (N, 3) translation of the "_spr_cns"
+            nodes
+        aim_sign (ndarray): (N,) 1 or -1 for the inverted X springs
+        damping (ndarray): (N,) spring damping
+        stiffness (ndarray): (N,) spring stiffness
+        intensity (ndarray): (N,) spring intensity
+        roots (ndarray): (R,) index of the root links
+        root_parent (ndarray): (F, R, 4, 4) world matrix of the parent of
+            the roots npo for each frame
+        local (ndarray): (F, N, 4, 4) local matrix of the spring objects
+            for each frame
+        start (float): The first frame
+    """
+
+    def __init__(self, names, prev, start=1.0):
+        n = len(names)
+        self.names = list(names)
+        self.prev = np.asarray(prev, dtype=np.int64)
+        self.npo = np.tile(np.identity(4), (n, 1, 1))
+        self.offset = np.tile(np.identity(4), (n, 1, 1))
+        self.lvl = np.tile(np.identity(4), (n, 1, 1))
+        self.cns_translation = np.zeros((n, 3))
+        self.aim_sign = np.ones(n)
+        self.damping = np.full(n, .5)
+        self.stiffness = np.full(n, .5)
+        self.intensity = np.ones(n)
+        self.roots = np.flatnonzero(self.prev < 0)
+        self.root_parent = np.zeros((0, len(self.roots), 4, 4))
+        self.local = np.zeros((0, n, 4, 4))
+        self.start = start
+
+    @property
+    def frames(self):
+        return self.local.shape[0]
+
+    def levels(self):
+        """Return the links index for each hierarchy level
+
+        Returns:
+            list of ndarray: The index arrays, roots first
+        """
+        depth = np.zeros(len(self.names), dtype=np.int64)
+        for i, p in enumerate(self.prev):
+            if p >= 0:
+                depth[i] = depth[p] + 1
+        if not len(depth):
+            return []
+        return [np.flatnonzero(depth == d) for d in range(depth.max() + 1)]
+
+
+def _normalize(vectors):
+    length = np.sqrt((vectors * vectors).sum(axis=-1))
+    return vectors / np.maximum(length, 1e-12)[..., None]
+
+
+def euler_xyz(matrices):
+    """Return the xyz rotation of the rotation matrices
+
+    Args:
+        matrices (ndarray): (N, 3, 3) orthonormal row matrices
+
+    Returns:
+        ndarray: (N, 3) rotation in degrees
+    """
+    x = np.arctan2(matrices[:, 1, 2], matrices[:, 2, 2])
+    y = np.arcsin(np.clip(-matrices[:, 0, 2], -1.0, 1.0))
+    z = np.arctan2(matrices[:, 0, 1], matrices[:, 0, 0])
+    return np.degrees(np.stack((x, y, z), axis=-1))
+
+
+def simulate(sample):
+    """Solve the springs of all the links
+
+    Args:
+        sample (SpringSample): The sampled links
+
+    Returns:
+        ndarray: (F, N, 3) float32 rotation of the "_spr_cns" nodes in
+            degrees
+    """
+    n = len(sample.names)
+    levels = sample.levels()
+    rotations = np.zeros((sample.frames, n, 3), dtype=np.float32)
+    world = np.zeros((n, 4, 4))
+    position = np.zeros((n, 3))
+    previous = np.zeros((n, 3))
+    cns_point = np.concatenate((sample.cns_translation, np.ones((n, 1))),
+                               axis=1)
+    damping = (1.0 - sample.damping)[:, None]
+    stiffness = sample.stiffness[:, None]
+    intensity = sample.intensity[:, None]
+    roots = np.zeros(n, dtype=np.int64)
+    roots[sample.roots] = np.arange(len(sample.roots))
+
+    for f in range(sample.frames):
+        for level, idx in enumerate(levels):
+            if level:
+                parent = np.matmul(sample.offset[idx],
+                                   world[sample.prev[idx]])
+            else:
+                parent = sample.root_parent[f, roots[idx]]
+            npo = np.matmul(sample.npo[idx], parent)
+            goal = np.matmul(sample.lvl[idx], npo)[:, 3, :3]
+
+            # spring
+            if f == 0:
+                position[idx] = goal
+                previous[idx] = goal
+            velocity = (position[idx] - previous[idx]) * damping[idx]
+            new = position[idx] + velocity
+            new += (goal - new) * stiffness[idx]
+            previous[idx] = position[idx]
+            position[idx] = new
+            target = goal + (new - goal) * intensity[idx]
+
+            # aim X to the target, Y up from the npo
+            origin = np.einsum("ni,nij->nj", cns_point[idx], npo)[:, :3]
+            x = _normalize((target - origin) * sample.aim_sign[idx, None])
+            z = _normalize(np.cross(x, npo[:, 1, :3]))
+            y = np.cross(z, x)
+            aim = np.stack((x, y, z), axis=1)
+            local = _normalize(np.matmul(aim,
+                                         np.linalg.inv(npo[:, :3, :3])))
+            rotations[f, idx] = euler_xyz(local)
+
+            cns = np.tile(np.identity(4), (len(idx), 1, 1))
+            cns[:, :3, :3] = local
+            cns[:, 3, :3] = sample.cns_translation[idx]
+            world[idx] = np.matmul(sample.local[f, idx],
+                                   np.matmul(cns, npo))
+
+    return rotations
+
+
+######################################################################
+# Cache file
+######################################################################
+
+def write_cache(filePath, rotations, names, start):
+    """Write the rotations to a cache file
+
+    Args:
+        filePath (str): The cache path, without extension
+        rotations (ndarray): (F, N, 3) rotations in degrees
+        names (list of str): The N spring objects
+        start (float): The first frame
+
+    Returns:
+        SpringCache: The cache
+    """
+    filePath = os.path.splitext(filePath)[0]
+    np.save(filePath + ".npy", np.asarray(rotations, dtype=np.float32))
+    header = {"version": CACHE_VERSION,
+              "names": list(names),
+              "start": start,
+              "frames": len(rotations)}
+    with open(filePath + ".json", "w") as f:
+        json.dump(header, f, indent=4)
+    return SpringCache(filePath)
+
+
+class SpringCache(object):
+    """Read a spring cache file
+
+    The rotations are memory-mapped, only the read frames are loaded.
+
+    Args:
+        filePath (str): The cache path, with or without extension
+
+    Attributes:
+        names (list of str): The spring objects
+        start (float): The first frame
+        rotations (ndarray): (F, N, 3) rotations in degrees
+    """
+
+    def __init__(self, filePath):
+        self.path = os.path.splitext(filePath)[0]
+        with open(self.path + ".json", "r") as f:
+            header = json.load(f)
+        if header.get("version") != CACHE_VERSION:
+            raise ValueError("Invalid spring cache version: {}".format(
+                header.get("version")))
+        self.names = header["names"]
+        self.start = header["start"]
+        self.rotations = np.load(self.path + ".npy", mmap_mode="r")
+        self._index = dict((n, i) for i, n in enumerate(self.names))
+
+    def __len__(self):
+        return len(self.rotations)
+
+    @property
+    def end(self):
+        return self.start + len(self.rotations) - 1
+
+    def frame(self, frame):
+        """Return the rotations at the frame, clamped to the cache range
+
+        Args:
+            frame (float): The frame
+
+        Returns:
+            ndarray: (N, 3) rotations in degrees
+        """
+        i = int(round(frame - self.start))
+        return self.rotations[min(max(i, 0), len(self.rotations) - 1)]
+
+    def rotation(self, name, frame):
+        """Return the rotation of one spring object at the frame"""
+        return self.frame(frame)[self._index[name]]
+
+
+######################################################################
+# Maya
+######################################################################
+
+def _short(node):
+    return node.split("|")[-1]
+
+
+def _parent(node):
+    return cmds.listRelatives(node, parent=True, fullPath=True)[0]
+
+
+def _matrix(value):
+    return np.asarray(value, dtype=np.float64).reshape(4, 4)
+
+
+def _plug(name):
+    sel = om2.MSelectionList()
+    sel.add(name)
+    return sel.getPlug(0)
+
+
+def _read_matrices(plugs, frame):
+    """Evaluate the matrix plugs at the frame, without changing the time"""
+    context = om2.MDGContext(om2.MTime(frame, om2.MTime.uiUnit()))
+    if hasattr(om2, "MDGContextGuard"):
+        with om2.MDGContextGuard(context):
+            data = [p.asMObject() for p in plugs]
+    else:
+        data = [p.asMObject(context) for p in plugs]
+    return [om2.MFnMatrixData(d).matrix() for d in data]
+
+
+def spring_objects():
+    """Return the spring objects of the scene, parents first
+
+    Returns:
+        list of str: The objects long names
+    """
+    objects = []
+    for cns in cmds.ls("*" + CNS_SUFFIX, type="transform", long=True) or []:
+        name = _short(cns)[:-len(CNS_SUFFIX)]
+        objects.extend(c for c in cmds.listRelatives(cns,
+                                                     children=True,
+                                                     type="transform",
+                                                     fullPath=True) or []
+                       if _short(c) == name)
+    return sorted(objects, key=lambda o: o.count("|"))
+
+
+def sample_springs(objects, start, end):
+    """Sample the spring links from the scene
+
+    Args:
+        objects (list of str): The spring objects long names, parents first
+        start (int): The first frame
+        end (int): The last frame
+
+    Returns:
+        SpringSample: The sample
+    """
+    prev = []
+    for obj in objects:
+        ancestors = [o for o in objects if obj.startswith(o + "|")]
+        prev.append(objects.index(max(ancestors, key=len))
+                    if ancestors else -1)
+    sample = SpringSample(objects, prev, start)
+
+    rootPlugs = []
+    localPlugs = []
+    for i, obj in enumerate(objects):
+        cns = _parent(obj)
+        npo = _parent(cns)
+        lvl = "{}|{}_spr_lvl".format(npo, _short(obj))
+        driver = "{}|{}_spr".format(lvl, _short(obj))
+        sample.npo[i] = _matrix(cmds.getAttr(npo + ".matrix", time=start))
+        sample.lvl[i] = _matrix(cmds.getAttr(lvl + ".matrix", time=start))
+        sample.cns_translation[i] = cmds.getAttr(cns + ".translate",
+                                                 time=start)[0]
+        # the inverted X springs are in the -X side of the lvl
+        direction = sample.lvl[i, 3, :3] - sample.cns_translation[i]
+        if np.dot(direction, sample.lvl[i, 0, :3]) < 0:
+            sample.aim_sign[i] = -1
+
+        springOp = cmds.listConnections(driver + ".translateX",
+                                        source=True,
+                                        destination=False)
+        if springOp:
+            for attr in ("damping", "stiffness", "intensity"):
+                getattr(sample, attr)[i] = cmds.getAttr(
+                    "{}.{}".format(springOp[0], attr), time=start)
+
+        if prev[i] < 0:
+            rootPlugs.append(_plug(npo + ".parentMatrix[0]"))
+        else:
+            parent = _matrix(cmds.getAttr(npo + ".parentMatrix[0]",
+                                          time=start))
+            previous = _matrix(cmds.getAttr(
+                objects[prev[i]] + ".worldMatrix[0]", time=start))
+            sample.offset[i] = np.matmul(parent, np.linalg.inv(previous))
+        localPlugs.append(_plug(obj + ".matrix"))
+
+    frames = list(range(int(start), int(end) + 1))
+    sample.root_parent = np.zeros((len(frames), len(rootPlugs), 4, 4))
+    sample.local = np.zeros((len(frames), len(objects), 4, 4))
+    for f, frame in enumerate(frames):
+        values = _read_matrices(rootPlugs + localPlugs, frame)
+        sample.root_parent[f] = np.reshape(values[:len(rootPlugs)],
+                                           (-1, 4, 4))
+        sample.local[f] = np.reshape(values[len(rootPlugs):], (-1, 4, 4))
+    return sample
+
+
+@profiler.profiled("spring_cache.cache_springs")
+def cache_springs(filePath, objects=None, start=None, end=None):
+    """Simulate the springs and write the cache file
+
+    Args:
+        filePath (str): The cache path, without extension
+        objects (list of str, optional): The spring objects. By default all
+            the spring objects of the scene
+        start (int, optional): The first frame, by default the playback
+            start
+        end (int, optional): The last frame, by default the playback end
+
+    Returns:
+        SpringCache: The cache
+    """
+    if np is None:
+        raise RuntimeError("The spring cache needs numpy")
+    if start is None:
+        start = cmds.playbackOptions(q=True, minTime=True)
+    if end is None:
+        end = cmds.playbackOptions(q=True, maxTime=True)
+    if objects is None:
+        objects = spring_objects()
+    else:
+        objects = sorted(cmds.ls(objects, long=True),
+                         key=lambda o: o.count("|"))
+
+    sample = sample_springs(objects, start, end)
+    rotations = simulate(sample)
+    return write_cache(filePath, rotations, objects, int(start))
+
+
+def _spring_pairBlends(objects):
+    """Return the spring objects with the pairBlend of their rig"""
+    pairBlends = []
+    for obj in objects:
+        pairBlend = cmds.listConnections(_parent(obj) + ".rotateX",
+                                         source=True,
+                                         destination=False,
+                                         type="pairBlend")
+        if not pairBlend:
+            cmds.warning("{} has no spring pairBlend".format(obj))
+            continue
+        pairBlends.append((obj, pairBlend[0]))
+    return pairBlends
+
+
+def _cache_curve(obj, pairBlend, axis):
+    """Return the cache curve keying the pairBlend first input axis
+
+    The cache curve is created if doesn't exist. The rest curve keyed by
+    postSpring is disconnected from the pairBlend and kept, connected to the
+    rest attribute of the cache curve.
+    """
+    plug = "{}.inRotate{}1".format(pairBlend, axis)
+    curves = cmds.listConnections(plug,
+                                  source=True,
+                                  destination=False,
+                                  type="animCurve") or []
+    if curves and cmds.attributeQuery(REST_ATTR, node=curves[0], exists=True):
+        return curves[0]
+    curve = cmds.createNode("animCurveTA",
+                            name="{}{}_rotate{}".format(_short(obj),
+                                                        CACHE_CURVE_SUFFIX,
+                                                        axis))
+    cmds.addAttr(curve, longName=REST_ATTR, attributeType="message")
+    if curves:
+        cmds.connectAttr(curves[0] + ".message",
+                         "{}.{}".format(curve, REST_ATTR))
+    cmds.connectAttr(curve + ".output", plug, force=True)
+    return curve
+
+
+def apply_cache(cache, objects=None):
+    """Key the cached rotations in the pairBlend of the spring rigs
+
+    The rotations are keyed in dedicated cache curves connected to the
+    pairBlend first input, so the cache plays with the spring active channel
+    set to 0. The rest keys of the rig are kept and reconnected by
+    remove_cache. The keys are set with one undoable setAttr per curve and
+    the cache is applied in one undo chunk.
+
+    Args:
+        cache (SpringCache or str): The cache or the cache path
+        objects (list of str, optional): The spring objects to key. By
+            default all the objects in the cache
+    """
+    if not isinstance(cache, SpringCache):
+        cache = SpringCache(cache)
+    names = [obj for obj in cache.names if not objects or obj in objects]
+    # the keys values are set in the ui angle unit
+    scale = om2.MAngle(1.0, om2.MAngle.kDegrees).asUnits(
+        om2.MAngle.uiUnit())
+    keys = np.empty((len(cache), 2))
+    keys[:, 0] = np.arange(cache.start, cache.start + len(cache))
+
+    cmds.undoInfo(openChunk=True, chunkName="springCache")
+    try:
+        for obj, pairBlend in _spring_pairBlends(names):
+            rotations = cache.rotations[:, cache._index[obj]]
+            for axis, column in zip("XYZ", range(3)):
+                curve = _cache_curve(obj, pairBlend, axis)
+                cmds.cutKey(curve, clear=True)
+                keys[:, 1] = rotations[:, column] * scale
+                cmds.setAttr("{}.ktv[0:{}]".format(curve, len(cache) - 1),
+                             *keys.ravel().tolist())
+                cmds.keyTangent(curve,
+                                inTangentType="linear",
+                                outTangentType="linear")
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+
+def remove_cache(objects=None):
+    """Delete the cache curves and restore the rest keys of the spring rigs
+
+    Args:
+        objects (list of str, optional): The spring objects. By default all
+            the spring objects of the scene
+    """
+    if objects is None:
+        objects = spring_objects()
+    cmds.undoInfo(openChunk=True, chunkName="springCache")
+    try:
+        for obj, pairBlend in _spring_pairBlends(objects):
+            for axis in "XYZ":
+                plug = "{}.inRotate{}1".format(pairBlend, axis)
+                curves = cmds.listConnections(plug,
+                                              source=True,
+                                              destination=False,
+                                              type="animCurve") or []
+                if not curves or not cmds.attributeQuery(
+                        REST_ATTR, node=curves[0], exists=True):
+                    continue
+                rest = cmds.listConnections(
+                    "{}.{}".format(curves[0], REST_ATTR),
+                    source=True,
+                    destination=False)
+                if rest:
+                    cmds.connectAttr(rest[0] + ".output", plug, force=True)
+                cmds.delete(curves[0])
+    finally:
+        cmds.undoInfo(closeChunk=True)
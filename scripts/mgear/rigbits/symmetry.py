@@ -0,0 +1,374 @@
+"""Rigbits symmetry map
+
+Mesh vertex and edge symmetry computed in one pass by spatial hashing of
+the vertex positions, and L/R node name map. The SymmetryMap caches both,
+so the mirroring tools can look up the counterparts in constant time.
+
+Example::
+
+    from mgear.rigbits import symmetry
+    sym_map = symmetry.getSymmetryMap()
+    sym_map.mirrorNode("arm_R0_ctl")
+"""
+
+import json
+import os
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+from mgear.core import string
+
+# default tolerance for the symmetry positions
+TOLERANCE = 0.001
+
+# symmetry map file format version
+FILE_VERSION = 1
+
+
+######################################################################
+# Symmetry from data
+######################################################################
+
+def _cell(point, tolerance):
+    return (int(round(point[0] / tolerance)),
+            int(round(point[1] / tolerance)),
+            int(round(point[2] / tolerance)))
+
+
+def vertexSymmetry(points, axis=0, tolerance=TOLERANCE):
+    """Return the mirror vertex index for each vertex
+
+    Args:
+        points (list): Vertex positions, one (x, y, z) item per vertex
+        axis (int, optional): The mirror axis index. 0 is the X axis
+        tolerance (float, optional): Max distance between the mirrored
+            position and the mirror vertex
+
+    Returns:
+        list of int: The mirror vertex index for each vertex, -1 if the
+            vertex doesn't have mirror
+    """
+    grid = {}
+    for i, p in enumerate(points):
+        grid.setdefault(_cell(p, tolerance), []).append(i)
+
+    neighbours = [(x, y, z)
+                  for x in (-1, 0, 1)
+                  for y in (-1, 0, 1)
+                  for z in (-1, 0, 1)]
+    tolerance2 = tolerance * tolerance
+    result = []
+    for p in points:
+        mirror = list(p[:3])
+        mirror[axis] = -mirror[axis]
+        cx, cy, cz = _cell(mirror, tolerance)
+        best = -1
+        bestDist = tolerance2
+        for nx, ny, nz in neighbours:
+            for j in grid.get((cx + nx, cy + ny, cz + nz), ()):
+                q = points[j]
+                dist = ((q[0] - mirror[0]) ** 2
+                        + (q[1] - mirror[1]) ** 2
+                        + (q[2] - mirror[2]) ** 2)
+                if dist <= bestDist:
+                    best = j
+                    bestDist = dist
+        result.append(best)
+    return result
+
+
+def edgeSymmetry(edgeVertices, vtxMirror):
+    """Return the mirror edge index for each edge
+
+    Args:
+        edgeVertices (list): The (vertex, vertex) pair of each edge
+        vtxMirror (list of int): The mirror vertex index for each vertex
+
+    Returns:
+        list of int: The mirror edge index for each edge, -1 if the edge
+            doesn't have mirror
+    """
+    edgeIndex = {}
+    for i, (a, b) in enumerate(edgeVertices):
+        edgeIndex[(min(a, b), max(a, b))] = i
+
+    result = []
+    for a, b in edgeVertices:
+        ma = vtxMirror[a]
+        mb = vtxMirror[b]
+        if ma < 0 or mb < 0:
+            result.append(-1)
+        else:
+            result.append(edgeIndex.get((min(ma, mb), max(ma, mb)), -1))
+    return result
+
+
+######################################################################
+# Symmetry from mesh
+######################################################################
+
+def getMeshFn(mesh):
+    """Return the MFnMesh of a mesh
+
+    Args:
+        mesh (str or PyNode): The mesh transform or shape
+
+    Returns:
+        MFnMesh: The mesh function set
+    """
+    sel = om2.MSelectionList()
+    sel.add(str(mesh))
+    dagPath = sel.getDagPath(0)
+    dagPath.extendToShape()
+    return om2.MFnMesh(dagPath)
+
+
+def getMeshPoints(mesh, space=om2.MSpace.kWorld):
+    fnMesh = getMeshFn(mesh)
+    return [(p.x, p.y, p.z) for p in fnMesh.getPoints(space)]
+
+
+def getEdgeVertices(mesh):
+    fnMesh = getMeshFn(mesh)
+    return [fnMesh.getEdgeVertices(i) for i in range(fnMesh.numEdges)]
+
+
+def mirrorEdges(mesh, edges, axis=0, tolerance=TOLERANCE):
+    """Return the mirror edge indices for a list of edges
+
+    The symmetry is read from the scene symmetry map, and only computed
+    the first time the mesh is used.
+
+    Args:
+        mesh (str or PyNode): The mesh
+        edges (list of int): The edge indices to mirror
+        axis (int, optional): The mirror axis index. 0 is the X axis
+        tolerance (float, optional): Max distance between the mirrored
+            position and the mirror vertex
+
+    Returns:
+        list of int: The mirror edge indices, -1 if the edge doesn't have
+            mirror
+    """
+    return getSymmetryMap().mirrorEdges(mesh, edges, axis, tolerance)
+
+
+######################################################################
+# Symmetry map
+######################################################################
+
+class SymmetryMap(object):
+    """Cached mesh symmetry and L/R node map
+
+    The mesh symmetry is stored by mesh name with the vertex and edge
+    count of the mesh. If the topology changes the symmetry is computed
+    again.
+
+    The node map is built once from the scene transforms names. Names not
+    found in the map, or with a mirror node deleted or renamed after the map
+    was built, are resolved with convertRLName and added to the map.
+    """
+
+    def __init__(self):
+        self.meshes = {}
+        self.nodes = None
+
+    # mesh symmetry -----------------------------------------------------
+
+    def meshSymmetry(self, mesh, axis=0, tolerance=TOLERANCE):
+        """Return the vertex and edge symmetry of a mesh
+
+        Args:
+            mesh (str or PyNode): The mesh
+            axis (int, optional): The mirror axis index. 0 is the X axis
+            tolerance (float, optional): Max distance between the mirrored
+                position and the mirror vertex
+
+        Returns:
+            dict: "vertices" and "edges" mirror index lists
+        """
+        fnMesh = getMeshFn(mesh)
+        key = fnMesh.partialPathName()
+        signature = [fnMesh.numVertices, fnMesh.numEdges, axis]
+        data = self.meshes.get(key)
+        if data is None or data["signature"] != signature:
+            points = [(p.x, p.y, p.z)
+                      for p in fnMesh.getPoints(om2.MSpace.kWorld)]
+            edgeVertices = [fnMesh.getEdgeVertices(i)
+                            for i in range(fnMesh.numEdges)]
+            vtxMirror = vertexSymmetry(points, axis, tolerance)
+            data = {"signature": signature,
+                    "vertices": vtxMirror,
+                    "edges": edgeSymmetry(edgeVertices, vtxMirror)}
+            self.meshes[key] = data
+        return data
+
+    def mirrorVertices(self, mesh, vertices, axis=0, tolerance=TOLERANCE):
+        vtxMirror = self.meshSymmetry(mesh, axis, tolerance)["vertices"]
+        return [vtxMirror[v] for v in vertices]
+
+    def mirrorEdges(self, mesh, edges, axis=0, tolerance=TOLERANCE):
+        edgeMirror = self.meshSymmetry(mesh, axis, tolerance)["edges"]
+        return [edgeMirror[e] for e in edges]
+
+    # node map ----------------------------------------------------------
+
+    def setNodeMap(self, nodeMap):
+        """Set the node map, both directions are added
+
+        Args:
+            nodeMap (dict): name -> mirror name
+        """
+        self.nodes = {}
+        for a, b in nodeMap.items():
+            self.nodes[a] = b
+            self.nodes[b] = a
+
+    def buildNodeMap(self):
+        """Build the L/R node map from the scene transforms"""
+        names = set(cmds.ls(type="transform"))
+        nodeMap = {}
+        for name in names:
+            mirror = string.convertRLName(name)
+            if mirror != name and mirror in names:
+                nodeMap[name] = mirror
+        self.setNodeMap(nodeMap)
+
+    def mirrorNode(self, name):
+        """Return the mirror node name
+
+        Args:
+            name (str or PyNode): The node
+
+        Returns:
+            str: The mirror node name. None if the mirror node doesn't
+                exist
+        """
+        if self.nodes is None:
+            self.buildNodeMap()
+        name = str(name)
+        mirror = self.nodes.get(name)
+        if mirror is not None and not cmds.objExists(mirror):
+            # deleted or renamed after the map was built
+            self.nodes.pop(name, None)
+            self.nodes.pop(mirror, None)
+            mirror = None
+        if mirror is None:
+            # not in the map, maybe created after the map was built
+            mirror = string.convertRLName(name)
+            if mirror == name or not cmds.objExists(mirror):
+                return None
+            self.nodes[name] = mirror
+            self.nodes[mirror] = name
+        return mirror
+
+    # serialization -----------------------------------------------------
+
+    def asDict(self):
+        return {"version": FILE_VERSION,
+                "meshes": self.meshes,
+                "nodes": self.nodes}
+
+    def save(self, filePath):
+        """Save the symmetry map to a json file
+
+        Args:
+            filePath (str): The file path
+        """
+        with open(filePath, "w") as f:
+            json.dump(self.asDict(), f)
+
+    @classmethod
+    def load(cls, filePath):
+        """Load a symmetry map saved with save
+
+        Args:
+            filePath (str): The file path
+
+        Returns:
+            SymmetryMap: The loaded map
+        """
+        with open(filePath, "r") as f:
+            data = json.load(f)
+        if data.get("version") != FILE_VERSION:
+            raise ValueError("Not supported symmetry map version: %s"
+                             % data.get("version"))
+        symMap = cls()
+        symMap.meshes = data["meshes"]
+        symMap.nodes = data["nodes"]
+        return symMap
+
+
+# symmetry map of the current scene
+_scene_map = {"scene": None, "map": None, "callbacks": None}
+
+
+def _clearSceneMap(*args):
+    _scene_map["scene"] = None
+    _scene_map["map"] = None
+
+
+def _addSceneCallbacks():
+    """Clear the scene map on new scene and open scene"""
+    if _scene_map["callbacks"] is not None:
+        return
+    _scene_map["callbacks"] = [
+        om2.MSceneMessage.addCallback(message, _clearSceneMap)
+        for message in (om2.MSceneMessage.kBeforeNew,
+                        om2.MSceneMessage.kBeforeOpen)]
+
+
+def removeSceneCallbacks():
+    """Remove the scene callbacks of the symmetry map"""
+    if _scene_map["callbacks"]:
+        om2.MMessage.removeCallbacks(_scene_map["callbacks"])
+    _scene_map["callbacks"] = None
+    _clearSceneMap()
+
+
+def getSymmetryMap():
+    """Return the symmetry map of the current scene
+
+    A new map is created when a scene is created or opened.
+
+    Returns:
+        SymmetryMap: The scene symmetry map
+    """
+    _addSceneCallbacks()
+    scene = cmds.file(q=True, sceneName=True)
+    if _scene_map["map"] is None or _scene_map["scene"] != scene:
+        _scene_map["scene"] = scene
+        _scene_map["map"] = SymmetryMap()
+    return _scene_map["map"]
+
+
+def setSymmetryMap(symMap):
+    """Set the symmetry map of the current scene
+
+    Args:
+        symMap (SymmetryMap): The map, i.e: loaded from the asset file
+    """
+    _addSceneCallbacks()
+    _scene_map["scene"] = cmds.file(q=True, sceneName=True)
+    _scene_map["map"] = symMap
+
+
+def loadSymmetryMap(filePath):
+    """Load a symmetry map file as current scene map if exists
+
+    Args:
+        filePath (str): The file path
+
+    Returns:
+        SymmetryMap: The scene symmetry map
+    """
+    if os.path.isfile(filePath):
+        setSymmetryMap(SymmetryMap.load(filePath))
+    return getSymmetryMap()
+
+
+def clearSymmetryMap():
+    """Clear the cached symmetry map"""
+    _scene_map["scene"] = None
+    _scene_map["map"] = None
@@ -5,8 +5,7 @@ from pymel.core import datatypes
 
 from mgear.core import skin, primitive, icon, transform, attribute
 from mgear.core import applyop
-from mgear.core import meshNavigation as mesh_navi
-from mgear.rigbits import rivet, blendShapes
+from mgear.rigbits import rivet, blendShapes, profiler, symmetry
 from mgear.core import node
 
 
@@ -50,6 +49,40 @@ def pre_bind_matrix_connect(mesh, joint, jointBase):
             pm.displayInfo("The Joint: %s  is already in the %s." % (
                 joint.name(), skinCluster.name()))
             pass
+    _connect_bind_pre_matrix(skinCluster, joint, jointBase)
+
+
+def pre_bind_matrix_connect_batch(mesh, joints, jointBases):
+    """Connect the pre bind matrix for a list of tweak joints.
+
+    All the joints are added to the skin cluster in one edit.
+
+    Args:
+        mesh (PyNode): Mesh object with the tweak skin cluster
+        joints (list of PyNode): Tweak joints
+        jointBases (list of PyNode): Tweak joints parents
+    """
+    if not joints:
+        return
+    skinCluster = skin.getSkinCluster(mesh)
+    if not skinCluster:
+        # apply initial skincluster
+        skinCluster = pm.skinCluster(
+            joints[0],
+            mesh,
+            tsb=True,
+            nw=2,
+            n='%s_skinCluster' % mesh.name())
+    influences = set(pm.skinCluster(skinCluster, q=True, inf=True))
+    newJoints = [j for j in joints if j not in influences]
+    if newJoints:
+        pm.skinCluster(skinCluster, e=True, ai=newJoints, lw=True, wt=0)
+
+    for joint, jointBase in zip(joints, jointBases):
+        _connect_bind_pre_matrix(skinCluster, joint, jointBase)
+
+
+def _connect_bind_pre_matrix(skinCluster, joint, jointBase):
     cn = joint.listConnections(p=True, type="skinCluster")
     for x in cn:
         if x.type() == "matrix":
@@ -62,6 +95,22 @@ def pre_bind_matrix_connect(mesh, joint, jointBase):
                     f=True)
 
 
+def _get_set(name):
+    """Get the object set, created if doesn't exist
+
+    Args:
+        name (str): The set name
+
+    Returns:
+        PyNode: The object set
+    """
+    try:
+        return pm.PyNode(name)
+    except TypeError:
+        pm.sets(n=name, empty=True)
+        return pm.PyNode(name)
+
+
 def createJntTweak(mesh, jntParent, ctlParent):
     """Create a joint tweak
 
@@ -119,6 +168,7 @@ def createJntTweak(mesh, jntParent, ctlParent):
         pre_bind_matrix_connect(m, joint, jointBase)
 
 
+@profiler.profiled()
 def createRivetTweak(mesh,
                      edgePair,
                      name,
@@ -130,7 +180,8 @@ def createRivetTweak(mesh,
                      defSet=None,
                      ctlSet=None,
                      side=None,
-                     gearMulMatrix=True):
+                     gearMulMatrix=True,
+                     rivetMode=rivet.LOFT):
     """Create a tweak joint attached to the mesh using a rivet
 
     Args:
@@ -149,6 +200,7 @@ def createRivetTweak(mesh,
             set automatically based on the world position
         gearMulMatrix (bool, optional): If False will use Maya default multiply
             matrix node
+        rivetMode (str, optional): The rivet mode, rivet.LOFT or rivet.PIN
 
     Returns:
         PyNode: The tweak control
@@ -158,12 +210,68 @@ def createRivetTweak(mesh,
     inputMesh = blendShape.listConnections(sh=True, t="shape", d=False)[0]
 
     oRivet = rivet.rivet()
-    base = oRivet.create(inputMesh, edgePair[0], edgePair[1], parent)
+    base = oRivet.create(inputMesh, edgePair[0], edgePair[1], parent,
+                         mode=rivetMode)
+
+    if not defSet:
+        defSet = _get_set("rig_deformers_grp")
+    if not ctlSet:
+        ctlSet = _get_set("rig_controllers_grp")
+
+    o_icon, joint, jointBase = _rivetTweakFromBase(base,
+                                                   name,
+                                                   ctlParent,
+                                                   jntParent,
+                                                   color,
+                                                   size,
+                                                   defSet,
+                                                   ctlSet,
+                                                   side,
+                                                   gearMulMatrix,
+                                                   rivetMode)
+
+    # magic of doritos connection
+    pre_bind_matrix_connect(mesh, joint, jointBase)
+
+    return o_icon
+
+
+def _rivetTweakFromBase(base,
+                        name,
+                        ctlParent,
+                        jntParent,
+                        color,
+                        size,
+                        defSet,
+                        ctlSet,
+                        side,
+                        gearMulMatrix,
+                        rivetMode=rivet.LOFT):
+    """Create the tweak joints and control on top of a rivet
+
+    Args:
+        base (dagNode): The rivet
+        name (str): The name for the tweak
+        ctlParent (None or dagNode): The parent for the tweak control
+        jntParent (None or dagNode): The parent for the joints
+        color (list): The color for the control
+        size (float): Size of the control
+        defSet (set): Deformer set to add the joints
+        ctlSet (set): the set to add the controls
+        side (None, str): String to set the side. Valid values are L, R or C.
+        gearMulMatrix (bool): If False will use Maya default multiply
+            matrix node
+        rivetMode (str, optional): The rivet mode, rivet.LOFT or rivet.PIN
+
+    Returns:
+        tuple: The tweak control, the joint and the joint base
+    """
     # get side
     if not side or side not in ["L", "R", "C"]:
-        if base.getTranslation(space='world')[0] < -0.01:
+        basePosition = rivet.getWorldPosition(base)
+        if basePosition[0] < -0.01:
             side = "R"
-        elif base.getTranslation(space='world')[0] > 0.01:
+        elif basePosition[0] > 0.01:
             side = "L"
         else:
             side = "C"
@@ -182,7 +290,7 @@ def createRivetTweak(mesh,
                                   n=nameSide + "_npo",
                                   p=ctlParent,
                                   ss=True))
-    pm.pointConstraint(base, npo, mo=False)
+    rivet.constrainPosition(base, npo, rivetMode)
 
     # create joints
     if not jntParent:
@@ -224,7 +332,6 @@ def createRivetTweak(mesh,
 
         # invert negative scaling in Joints. We only inver Z axis, so is
         # the only axis that we are checking
-        print dm_node.attr("outputScaleZ").get()
         if dm_node.attr("outputScaleZ").get() < 0:
             mul_nod_invert = node.createMulNode(
                 dm_node.attr("outputScaleZ"),
@@ -270,12 +377,6 @@ def createRivetTweak(mesh,
 
     # hidding joint base by changing the draw mode
     pm.setAttr(jointBase + ".drawStyle", 2)
-    if not defSet:
-        try:
-            defSet = pm.PyNode("rig_deformers_grp")
-        except TypeError:
-            pm.sets(n="rig_deformers_grp", empty=True)
-            defSet = pm.PyNode("rig_deformers_grp")
     pm.sets(defSet, add=joint)
 
     controlType = "sphere"
@@ -317,21 +418,12 @@ def createRivetTweak(mesh,
     attribute.addAttribute(
         o_icon, "invSz", "bool", 0, keyable=False, niceName="Invert Mirror SZ")
 
-    # magic of doritos connection
-    pre_bind_matrix_connect(mesh, joint, jointBase)
-
     # add control tag
     node.add_controller_tag(o_icon, ctl_parent_tag)
 
-    if not ctlSet:
-        try:
-            ctlSet = pm.PyNode("rig_controllers_grp")
-        except TypeError:
-            pm.sets(n="rig_controllers_grp", empty=True)
-            ctlSet = pm.PyNode("rig_controllers_grp")
     pm.sets(ctlSet, add=o_icon)
 
-    return o_icon
+    return o_icon, joint, jointBase
 
 
 def createMirrorRivetTweak(mesh,
@@ -345,7 +437,8 @@ def createMirrorRivetTweak(mesh,
                            defSet=None,
                            ctlSet=None,
                            side=None,
-                           gearMulMatrix=True):
+                           gearMulMatrix=True,
+                           rivetMode=rivet.LOFT):
     """Create a tweak joint attached to the mesh using a rivet.
     The edge pair will be used to find the mirror position on the mesh
 
@@ -365,12 +458,15 @@ def createMirrorRivetTweak(mesh,
             set automatically based on the world position
         gearMulMatrix (bool, optional): If False will use Maya default multiply
             matrix node
+        rivetMode (str, optional): The rivet mode, rivet.LOFT or rivet.PIN
 
     Returns:
         PyNode: The tweak control
     """
-    mirror_edge_pair = [mesh_navi.find_mirror_edge(mesh, edgePair[0]).index(),
-                        mesh_navi.find_mirror_edge(mesh, edgePair[1]).index()]
+    mirror_edge_pair = symmetry.mirrorEdges(mesh, edgePair[:2])
+    if -1 in mirror_edge_pair:
+        pm.displayWarning("Mirror edges not found for: %s" % edgePair)
+        return
     return createRivetTweak(mesh,
                             mirror_edge_pair,
                             name,
@@ -382,9 +478,11 @@ def createMirrorRivetTweak(mesh,
                             defSet,
                             ctlSet,
                             side,
-                            gearMulMatrix)
+                            gearMulMatrix,
+                            rivetMode)
 
 
+@profiler.profiled()
 def createRivetTweakFromList(mesh,
                              edgePairList,
                              name,
@@ -401,7 +499,8 @@ def createRivetTweakFromList(mesh,
                              mCtlParent=None,
                              mjntParent=None,
                              mColor=None,
-                             gearMulMatrix=True):
+                             gearMulMatrix=True,
+                             rivetMode=rivet.LOFT):
     """Create multiple rivet tweaks from a list of edge pairs
 
     Args:
@@ -428,6 +527,7 @@ def createRivetTweakFromList(mesh,
         mColor (None, optional): Mirror controls color, if None will color arg
         gearMulMatrix (bool, optional): If False will use Maya default multiply
             matrix node
+        rivetMode (str, optional): The rivet mode, rivet.LOFT or rivet.PIN
 
     Returns:
         TYPE: Description
@@ -441,39 +541,135 @@ def createRivetTweakFromList(mesh,
     if not mjntParent:
         mjntParent = jntParent
 
-    ctlList = []
+    tweaks = []
     for i, pair in enumerate(edgePairList):
-        ctl = createRivetTweak(mesh,
-                               [pair[0], pair[1]],
-                               name + str(i).zfill(3),
-                               parent=parent,
-                               ctlParent=ctlParent,
-                               jntParent=jntParent,
-                               color=color,
-                               size=size,
-                               defSet=defSet,
-                               ctlSet=ctlSet,
-                               side=side,
-                               gearMulMatrix=gearMulMatrix)
-        ctlList.append(ctl)
+        tweakName = name + str(i).zfill(3)
+        tweaks.append({"edgePair": [pair[0], pair[1]],
+                       "name": tweakName,
+                       "parent": parent,
+                       "ctlParent": ctlParent,
+                       "jntParent": jntParent,
+                       "color": color})
         if mirror:
-            m_ctl = createMirrorRivetTweak(mesh,
-                                           [pair[0], pair[1]],
-                                           name + str(i).zfill(3),
-                                           parent=mParent,
-                                           ctlParent=mCtlParent,
-                                           jntParent=mjntParent,
-                                           color=mColor,
-                                           size=size,
-                                           defSet=defSet,
-                                           ctlSet=ctlSet,
-                                           side=side,
-                                           gearMulMatrix=gearMulMatrix)
-            ctlList.append(m_ctl)
+            tweaks.append({"edgePair": [pair[0], pair[1]],
+                           "name": tweakName,
+                           "parent": mParent,
+                           "ctlParent": mCtlParent,
+                           "jntParent": mjntParent,
+                           "color": mColor,
+                           "mirror": True})
+
+    return createRivetTweakBatch(mesh,
+                                 tweaks,
+                                 size=size,
+                                 defSet=defSet,
+                                 ctlSet=ctlSet,
+                                 side=side,
+                                 gearMulMatrix=gearMulMatrix,
+                                 rivetMode=rivetMode)
+
+
+@profiler.profiled()
+def createRivetTweakBatch(mesh,
+                          tweaks,
+                          size=.04,
+                          defSet=None,
+                          ctlSet=None,
+                          side=None,
+                          gearMulMatrix=True,
+                          rivetMode=rivet.LOFT):
+    """Create multiple rivet tweaks in one pass
+
+    The mirror edges are resolved with one symmetry lookup for all the
+    tweaks, the rivets of the same parent are created in one DAG modifier
+    and all the joints are added to the skin cluster in one edit.
+
+    Args:
+        mesh (mesh): The object to add the tweaks
+        tweaks (list of dict): The tweak definitions. Keys: "edgePair",
+            "name" and optional "parent", "ctlParent", "jntParent", "color",
+            "mirror" (bool, use the mirror edge pair)
+        size (float, optional): Size of the controls
+        defSet (None or set, optional): Deformer set to add the joints
+        ctlSet (None or set, optional): the set to add the controls
+        side (None, str): String to set the side. Valid values are L, R or C.
+            If the side is not set or the value is not valid, the side will be
+            set automatically based on the world position
+        gearMulMatrix (bool, optional): If False will use Maya default multiply
+            matrix node
+        rivetMode (str, optional): The rivet mode, rivet.LOFT or rivet.PIN
+
+    Returns:
+        list: The tweak controls in the same order of the definitions
+    """
+    if not tweaks:
+        return []
+
+    blendShape = blendShapes.getBlendShape(mesh)
+    inputMesh = blendShape.listConnections(sh=True, t="shape", d=False)[0]
+
+    if not defSet:
+        defSet = _get_set("rig_deformers_grp")
+    if not ctlSet:
+        ctlSet = _get_set("rig_controllers_grp")
+
+    # resolve all the mirror edges at once
+    edgePairs = [t["edgePair"] for t in tweaks]
+    mirrorIndex = [i for i, t in enumerate(tweaks) if t.get("mirror")]
+    if mirrorIndex:
+        edges = [e for i in mirrorIndex for e in edgePairs[i]]
+        mEdges = symmetry.mirrorEdges(mesh, edges)
+        for n, i in enumerate(mirrorIndex):
+            edgePairs[i] = [mEdges[n * 2], mEdges[n * 2 + 1]]
+        missing = [i for i in mirrorIndex if -1 in edgePairs[i]]
+        for i in missing:
+            pm.displayWarning("Mirror edges not found for the tweak: %s %s"
+                              % (tweaks[i]["name"], tweaks[i]["edgePair"]))
+        if missing:
+            tweaks = [t for i, t in enumerate(tweaks) if i not in missing]
+            edgePairs = [e for i, e in enumerate(edgePairs)
+                         if i not in missing]
+
+    # create the rivets in one modifier for each parent
+    bases = [None] * len(tweaks)
+    byParent = {}
+    for i, t in enumerate(tweaks):
+        byParent.setdefault(t.get("parent"), []).append(i)
+    for rivetParent, indexList in byParent.items():
+        rivets = rivet.createRivets(inputMesh,
+                                    [edgePairs[i] for i in indexList],
+                                    rivetParent,
+                                    mode=rivetMode)
+        for i, base in zip(indexList, rivets):
+            bases[i] = base
+
+    ctlList = []
+    joints = []
+    jointBases = []
+    for t, base in zip(tweaks, bases):
+        o_icon, joint, jointBase = _rivetTweakFromBase(
+            base,
+            t["name"],
+            t.get("ctlParent"),
+            t.get("jntParent"),
+            t.get("color", [0, 0, 0]),
+            size,
+            defSet,
+            ctlSet,
+            side,
+            gearMulMatrix,
+            rivetMode)
+        ctlList.append(o_icon)
+        joints.append(joint)
+        jointBases.append(jointBase)
+
+    # magic of doritos connection
+    pre_bind_matrix_connect_batch(mesh, joints, jointBases)
 
     return ctlList
 
 
+@profiler.profiled()
 def createRivetTweakLayer(layerMesh,
                           bst,
                           edgePairList,
@@ -492,7 +688,8 @@ def createRivetTweakLayer(layerMesh,
                           mjntParent=None,
                           mColor=None,
                           gearMulMatrix=True,
-                          static_jnt=None):
+                          static_jnt=None,
+                          rivetMode=rivet.LOFT):
     """Create a rivet tweak layer setup
 
     Args:
@@ -521,6 +718,7 @@ def createRivetTweakLayer(layerMesh,
         gearMulMatrix (bool, optional): If False will use Maya default multiply
             matrix node
         static_jnt (dagNode, optional): Static joint for the setup
+        rivetMode (str, optional): The rivet mode, rivet.LOFT or rivet.PIN
     """
 
     # Apply blendshape from blendshapes layer mesh
@@ -570,7 +768,8 @@ def createRivetTweakLayer(layerMesh,
                              mCtlParent=mCtlParent,
                              mjntParent=mjntParent,
                              mColor=mColor,
-                             gearMulMatrix=gearMulMatrix)
+                             gearMulMatrix=gearMulMatrix,
+                             rivetMode=rivetMode)
 
 # Helpers
 
@@ -0,0 +1,78 @@
+"""Compare the PyMEL and the cmds_utils paths of the rigbits utilities
+
+Usage:
+    $ mayapy tests/benchmark_rigbits_cmds_utils.py [count]
+
+"""
+
+import os
+import sys
+from timeit import default_timer
+
+from maya import standalone
+
+
+def build(count):
+    from maya import cmds
+    cmds.file(new=True, force=True)
+    return [cmds.createNode("transform", name="bench_%i_ctl" % i)
+            for i in range(count)]
+
+
+def timed(label, func, *args):
+    start = default_timer()
+    func(*args)
+    elapsed = default_timer() - start
+    print("{:<40}{:>10.4f}".format(label, elapsed))
+    return elapsed
+
+
+def main(count=1000):
+    import pymel.core as pm
+    from mgear import rigbits
+    from mgear.rigbits import cmds_utils
+
+    print("Nodes: %i" % count)
+    print("{:<40}{:>10}".format("Function", "Seconds"))
+
+    names = build(count)
+    timed("rigbits.addNPO", rigbits.addNPO, [pm.PyNode(n) for n in names])
+    names = build(count)
+    timed("cmds_utils.addNPO", cmds_utils.addNPO, names)
+    names = build(count)
+    timed("cmds_utils.addNPOBatch", cmds_utils.addNPOBatch, names)
+
+    names = build(count)
+    timed("rigbits.connectInvertSRT",
+          lambda: [rigbits.connectInvertSRT(pm.PyNode(names[0]),
+                                            pm.PyNode(n))
+                   for n in names[1:]])
+    names = build(count)
+    timed("cmds_utils.connectInvertSRTBatch",
+          cmds_utils.connectInvertSRTBatch,
+          [(names[0], n) for n in names[1:]])
+
+    names = build(count)
+    timed("rigbits.connectLocalTransform",
+          rigbits.connectLocalTransform, [pm.PyNode(n) for n in names])
+    names = build(count)
+    timed("cmds_utils.connectLocalTransform",
+          cmds_utils.connectLocalTransform, names)
+
+    names = build(count)
+    timed("rigbits.addJnt",
+          lambda: [rigbits.addJnt(pm.PyNode(n)) for n in names])
+    names = build(count)
+    timed("cmds_utils.addJnt",
+          lambda: [cmds_utils.addJnt(n) for n in names])
+    names = build(count)
+    timed("cmds_utils.addJntBatch", cmds_utils.addJntBatch, names)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__),
+                                    os.pardir,
+                                    "scripts"))
+    standalone.initialize()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
+    standalone.uninitialize()
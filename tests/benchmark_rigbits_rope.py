@@ -0,0 +1,89 @@
+"""Compare the motionPath and the network modes of the rope rig
+
+For each mode, with and without keepRatio, the rope is built on 2 stretched
+curves and the DG nodes created and the evaluation time of the joints over
+the animation are reported.
+
+Usage:
+    $ mayapy tests/benchmark_rigbits_rope.py [deformers] [frames]
+
+"""
+
+import os
+import sys
+from timeit import default_timer
+
+from maya import standalone
+
+
+def build_curves(frames):
+    from maya import cmds
+    cmds.file(new=True, force=True)
+    points = [(x, 0, 0) for x in range(11)]
+    crv = cmds.curve(name="rope_crv", degree=3, point=points)
+    upv = cmds.curve(name="rope_upv_crv",
+                     degree=3,
+                     point=[(x, 1, 0) for x, _, _ in points])
+    # stretch and bend the curves
+    for node in (crv, upv):
+        cmds.setKeyframe(node, attribute="scaleX", time=1, value=1)
+        cmds.setKeyframe(node, attribute="scaleX", time=frames, value=2)
+        cmds.setKeyframe(node, attribute="rotateZ", time=1, value=0)
+        cmds.setKeyframe(node, attribute="rotateZ", time=frames, value=30)
+    return crv, upv
+
+
+def dg_nodes():
+    from maya import cmds
+    return set(cmds.ls()) - set(cmds.ls(dag=True))
+
+
+def evaluate(joints, frames):
+    from maya import cmds
+    plugs = [j + ".worldMatrix[0]" for j in joints]
+    start = default_timer()
+    for frame in range(1, frames + 1):
+        cmds.currentTime(frame, update=True)
+        for plug in plugs:
+            cmds.getAttr(plug)
+    return default_timer() - start
+
+
+def main(deformers=100, frames=100):
+    import pymel.core as pm
+    from maya import cmds
+    from mgear.rigbits import rope
+
+    print("Deformers: %i  Frames: %i" % (deformers, frames))
+    print("{:<30}{:>10}{:>12}{:>12}".format("Mode",
+                                             "DG nodes",
+                                             "Build s",
+                                             "Eval s"))
+    for mode in (rope.MOTION_PATH, rope.NETWORK):
+        for keepRatio in (False, True):
+            crv, upv = build_curves(frames)
+            before = dg_nodes()
+            start = default_timer()
+            rope.rope(deformers,
+                      "rope",
+                      keepRatio,
+                      oSel=[pm.PyNode(crv), pm.PyNode(upv)],
+                      mode=mode)
+            build = default_timer() - start
+            nodes = len(dg_nodes() - before)
+            elapsed = evaluate(cmds.ls(type="joint", long=True), frames)
+            label = mode + (" keepRatio" if keepRatio else "")
+            print("{:<30}{:>10}{:>12.4f}{:>12.4f}".format(label,
+                                                          nodes,
+                                                          build,
+                                                          elapsed))
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__),
+                                    os.pardir,
+                                    "scripts"))
+    standalone.initialize()
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
+    standalone.uninitialize()
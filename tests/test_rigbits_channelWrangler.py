@@ -1,6 +1,7 @@
 import pymel.core as pm
 from maya import cmds
 from nose.tools import (
+    assert_equal,
     assert_is_none,
     with_setup,
 )
@@ -50,3 +51,36 @@ def source_nodes():
 @with_setup(source_nodes)
 def test_applyChannelConfig():
     assert_is_none(channelWrangler._applyChannelConfig(self.config))
+
+
+@with_setup(source_nodes)
+def test_applyChannelConfig_index_policy():
+    pm.polyCube(name="armUI_L0_ctl")
+    config = dict(self.config, movePolicy="index")
+    channelWrangler._applyChannelConfig(config)
+    assert_equal(cmds.listAttr("armUI_L0_ctl", userDefined=True),
+                 ["shoulder_ik", "shoulder_rotRef", "shoulder_rotRef0"])
+    assert_equal(cmds.listConnections("armUI_R1_ctl.ty", plugs=True),
+                 ["armUI_L0_ctl.shoulder_rotRef0"])
+
+
+@with_setup(source_nodes)
+def test_applyChannelConfig_missing_node():
+    # the rules with the missing target are skipped
+    channelWrangler._applyChannelConfig(self.config)
+    assert_equal(cmds.listAttr("armUI_R0_ctl", userDefined=True),
+                 ["shoulder_ik", "shoulder_rotRef"])
+
+
+@with_setup(source_nodes)
+def test_applyChannelConfig_default_value():
+    pm.polyCube(name="armUI_L0_ctl")
+    cmds.addAttr("armUI_R1_ctl", longName="fingers_curl",
+                 attributeType="double", defaultValue=0.5, keyable=True)
+    cmds.setAttr("armUI_R1_ctl.fingers_curl", 0.8)
+    config = dict(self.config,
+                  map=[["fingers_curl", "armUI_R1_ctl", "armUI_L0_ctl", 0]])
+    channelWrangler._applyChannelConfig(config)
+    assert_equal(cmds.attributeQuery("fingers_curl", node="armUI_L0_ctl",
+                                     listDefault=True), [0.5])
+    assert_equal(cmds.getAttr("armUI_L0_ctl.fingers_curl"), 0.8)
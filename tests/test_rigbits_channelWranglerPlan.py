@@ -0,0 +1,79 @@
+from nose.tools import assert_equal, assert_false, assert_true
+
+from mgear.rigbits import channelWranglerPlan
+
+
+def config(rules, movePolicy="merge"):
+    return {"movePolicy": movePolicy, "proxyPolicy": "index", "map": rules}
+
+
+def test_plan_steps():
+    plan = channelWranglerPlan.planChannelConfig(config([
+        ["shoulder_ik", "armUI_R0_ctl", "armUI_L0_ctl", 0],
+        ["shoulder_ik", "armUI_R0_ctl", "armUI_L0_ctl", 0],
+        ["shoulder_rotRef", "armUI_R0_ctl", "armUI_L0_ctl", 1]]))
+    assert_true(plan.valid)
+    assert_equal([(s["op"], s["attr"], s["rule"]) for s in plan.steps],
+                 [("move", "shoulder_ik", 0),
+                  ("proxy", "shoulder_rotRef", 2)])
+    assert_equal(len(plan.warnings), 1)
+    assert_equal(plan.nodes["armUI_R0_ctl"], [0, 1])
+
+
+def test_plan_redirect_moved_channel():
+    plan = channelWranglerPlan.planChannelConfig(config([
+        ["blend", "a_ctl", "b_ctl", 0],
+        ["blend", "a_ctl", "c_ctl", 1],
+        ["blend", "b_ctl", "a_ctl", 0],
+        ["blend", "a_ctl", "c_ctl", 0]]))
+    assert_equal([(s["source"], s["target"]) for s in plan.steps],
+                 [("a_ctl", "b_ctl"),
+                  ("b_ctl", "c_ctl"),
+                  ("b_ctl", "a_ctl"),
+                  ("a_ctl", "c_ctl")])
+
+
+def test_plan_errors():
+    plan = channelWranglerPlan.planChannelConfig(config([
+        ["blend", "a_ctl", "a_ctl", 0],
+        ["blend", "a_ctl", 2],
+        ["", "a_ctl", "b_ctl", 0],
+        ["blend", "a_ctl", "b_ctl", 3]], movePolicy="bad"))
+    assert_false(plan.valid)
+    assert_equal(len(plan.errors), 5)
+    assert_equal(plan.steps, [])
+
+
+def test_resolve_plan_index_policy():
+    plan = channelWranglerPlan.planChannelConfig(config([
+        ["blend", "a_ctl", "c_ctl", 0],
+        ["blend", "b_ctl", "c_ctl", 0],
+        ["blend0", "c_ctl", "a_ctl", 1],
+        ["missing", "a_ctl", "c_ctl", 0],
+        ["blend", "d_ctl", "c_ctl", 0]], movePolicy="index"))
+    channels = {"a_ctl": set(["blend"]),
+                "b_ctl": set(["blend"]),
+                "c_ctl": set(["blend"])}
+    batches, warnings = channelWranglerPlan.resolvePlan(plan, channels)
+    # the proxy uses the channel renamed by the previous move
+    assert_equal([[(s["op"], s["source"], s["name"]) for s in b]
+                  for b in batches],
+                 [[("move", "a_ctl", "blend0"), ("move", "b_ctl", "blend1")],
+                  [("proxy", "c_ctl", "blend0")]])
+    assert_equal(len(warnings), 2)
+    assert_equal(channels, {"a_ctl": set(["blend0"]),
+                            "b_ctl": set(),
+                            "c_ctl": set(["blend", "blend0", "blend1"])})
+
+
+def test_resolve_plan_merge_policy():
+    plan = channelWranglerPlan.planChannelConfig(config([
+        ["blend", "a_ctl", "c_ctl", 0],
+        ["blend", "b_ctl", "c_ctl", 0]]))
+    channels = {"a_ctl": set(["blend"]),
+                "b_ctl": set(["blend"]),
+                "c_ctl": set()}
+    batches, warnings = channelWranglerPlan.resolvePlan(plan, channels)
+    assert_equal([[s["op"] for s in b] for b in batches],
+                 [["move"], ["merge"]])
+    assert_equal(warnings, [])
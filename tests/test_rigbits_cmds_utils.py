@@ -0,0 +1,150 @@
+from maya import cmds
+from nose.tools import (
+    assert_almost_equal,
+    assert_equal,
+    assert_raises,
+    assert_true,
+)
+
+from mgear.rigbits import cmds_utils
+
+
+def test_addNPO():
+    cmds.file(new=True, force=True)
+    parent = cmds.createNode("transform", name="parent")
+    obj = cmds.createNode("transform", name="arm_L0_ctl", parent=parent)
+    cmds.setAttr(obj + ".translate", 1, 2, 3)
+
+    npo = cmds_utils.addNPO(obj)[0]
+    assert_equal(npo, "|parent|arm_L0_ctl_npo")
+    assert_equal(cmds.listRelatives(npo, children=True), ["arm_L0_ctl"])
+    assert_equal(cmds.getAttr(npo + ".translate")[0], (1.0, 2.0, 3.0))
+    assert_equal(cmds.getAttr(npo + "|arm_L0_ctl.translate")[0],
+                 (0.0, 0.0, 0.0))
+
+
+def test_addNPO_chain():
+    cmds.file(new=True, force=True)
+    cmds.select(clear=True)
+    joints = [cmds.joint(name="spine_C0_%i_jnt" % i, position=(0, i, 0))
+              for i in range(3)]
+    # the selection order puts the children first
+    cmds.select(joints[::-1])
+
+    npos = cmds_utils.addNPO()
+    assert_equal(npos,
+                 ["|spine_C0_0_jnt_npo|spine_C0_0_jnt|spine_C0_1_jnt_npo"
+                  "|spine_C0_1_jnt|spine_C0_2_jnt_npo",
+                  "|spine_C0_0_jnt_npo|spine_C0_0_jnt|spine_C0_1_jnt_npo",
+                  "|spine_C0_0_jnt_npo"])
+    for i, joint in enumerate(joints):
+        assert_equal(cmds.listRelatives(joint, parent=True),
+                     ["spine_C0_%i_jnt_npo" % i])
+        for a, b in zip(cmds.xform(joint, q=True, translation=True, ws=True),
+                        (0.0, i, 0.0)):
+            assert_almost_equal(a, b)
+
+
+def test_connectInvertSRTBatch():
+    cmds.file(new=True, force=True)
+    source = cmds.createNode("transform", name="source")
+    targets = [cmds.createNode("transform") for i in range(3)]
+    cmds_utils.connectInvertSRTBatch([(source, t) for t in targets],
+                                     srt="t")
+    cmds.setAttr(source + ".translate", 1, 2, 3)
+    for target in targets:
+        for value, expected in zip(cmds.getAttr(target + ".translate")[0],
+                                   (-1.0, -2.0, -3.0)):
+            assert_almost_equal(value, expected)
+
+
+def test_addJnt():
+    cmds.file(new=True, force=True)
+    obj = cmds.createNode("transform", name="arm_L0_ctl")
+    jnt = cmds_utils.addJnt(obj)
+    assert_equal(jnt, "|arm_L0_ctl|arm_L0_jnt")
+    assert_true(cmds.sets(jnt, isMember="rig_deformers_grp"))
+
+
+def test_addNPOBatch():
+    cmds.file(new=True, force=True)
+    objs = []
+    for i in range(3):
+        obj = cmds.createNode("transform", name="obj%i_ctl" % i)
+        cmds.setAttr(obj + ".translate", i, 1, 0)
+        cmds.setAttr(obj + ".rotate", 0, 45, 0)
+        objs.append(obj)
+    world = [cmds.xform(o, q=True, matrix=True, ws=True) for o in objs]
+
+    npos = cmds_utils.addNPOBatch(objs)
+    assert_equal(npos, ["|obj0_ctl_npo", "|obj1_ctl_npo", "|obj2_ctl_npo"])
+    for npo, matrix in zip(npos, world):
+        obj = cmds.listRelatives(npo, children=True, fullPath=True)[0]
+        assert_equal(cmds.getAttr(obj + ".translate")[0], (0.0, 0.0, 0.0))
+        for a, b in zip(cmds.xform(obj, q=True, matrix=True, ws=True),
+                        matrix):
+            assert_almost_equal(a, b)
+
+
+def test_addNPOBatch_joints():
+    cmds.file(new=True, force=True)
+    # each joint is created under the previous, selected, joint
+    cmds.select(clear=True)
+    jnts = [cmds.joint(name="chain%i_jnt" % i, position=(i, i, 0))
+            for i in range(3)]
+    cmds.setAttr(jnts[0] + ".scale", 2, 2, 2)
+    cmds.setAttr(jnts[1] + ".jointOrient", 0, 0, 30)
+    world = [cmds.xform(j, q=True, matrix=True, ws=True) for j in jnts]
+
+    npos = cmds_utils.addNPOBatch(jnts[1:])
+    assert_equal(npos, ["|chain0_jnt|chain1_jnt_npo",
+                        "|chain0_jnt|chain1_jnt_npo|chain1_jnt"
+                        "|chain2_jnt_npo"])
+    # the joints under the NPOs don't compensate the parent scale
+    for jnt in jnts[1:]:
+        assert_equal(cmds.listConnections(jnt + ".inverseScale"), None)
+        assert_equal(cmds.getAttr(jnt + ".inverseScale")[0], (1.0, 1.0, 1.0))
+    for jnt, matrix in zip(jnts, world):
+        for a, b in zip(cmds.xform(jnt, q=True, matrix=True, ws=True),
+                        matrix):
+            assert_almost_equal(a, b)
+
+
+def test_addJntBatch():
+    cmds.file(new=True, force=True)
+    objs = [cmds.createNode("transform", name="arm_L0_fk%i_ctl" % i)
+            for i in range(3)]
+    cmds.setAttr(objs[1] + ".translate", 1, 2, 3)
+    jnts = cmds_utils.addJntBatch(objs, noReplace=True)
+    assert_equal(len(jnts), 3)
+    assert_equal(cmds.sets("rig_deformers_grp", q=True),
+                 ["arm_L0_fk0_ctl_jnt",
+                  "arm_L0_fk1_ctl_jnt",
+                  "arm_L0_fk2_ctl_jnt"])
+
+
+def test_addBlendedJointBatch():
+    cmds.file(new=True, force=True)
+    cmds.select(clear=True)
+    joints = [cmds.joint(name="leg_L0_%i_jnt" % i) for i in range(3)]
+    cmds.select(clear=True)
+    transform = cmds.createNode("transform")
+
+    blended = cmds_utils.addBlendedJointBatch(joints + [transform],
+                                              blend=[.5, .25, 1., 0.])
+    assert_equal(len(blended), 3)
+    assert_equal(cmds.listRelatives(blended[1], parent=True),
+                 ["leg_L0_0_jnt"])
+    pair_blends = [cmds.listConnections(j + ".rotate", type="pairBlend")[0]
+                   for j in blended]
+    assert_equal([cmds.getAttr(p + ".weight") for p in pair_blends],
+                 [.5, .25, 1.])
+    assert_equal(len(cmds.sets("rig_deformers_grp", q=True)), 3)
+    # one name per joint
+    assert_raises(ValueError, cmds_utils.addBlendedJointBatch, joints,
+                  names=["knee"])
+
+    support = cmds_utils.addSupportJointBatch(blended)
+    assert_equal(len(support), 3)
+    assert_equal(cmds.listRelatives(support[0], parent=True),
+                 ["blend_leg_L0_0_jnt"])
@@ -0,0 +1,80 @@
+import pymel.core as pm
+from maya import cmds
+from nose.tools import assert_almost_equal, assert_equal, assert_true
+
+from mgear.rigbits import cycleTweaks
+
+DEFINITIONS = [{"name": "cheek_L0", "face": 5, "mirrorAxis": False},
+               {"name": "cheek_R0", "face": 6, "mirrorAxis": True}]
+
+
+def _face_edges(mesh, face):
+    info = cmds.polyInfo("{}.f[{}]".format(mesh, face), faceToEdge=True)
+    edges = [int(e) for e in info[0].split(":")[1].split()]
+    # opposite edges of the quad
+    return [edges[0], edges[2]]
+
+
+def _setup():
+    cmds.file(new=True, force=True)
+    outMesh = pm.polyPlane(name="face", sx=4, sy=4)[0]
+    outMesh.translate.set(1, 2, 0)
+    baseMesh = pm.duplicate(outMesh, name="face_base")[0]
+    rotMesh = pm.duplicate(outMesh, name="face_rot")[0]
+    transMesh = pm.duplicate(outMesh, name="face_trans")[0]
+    staticJnt = pm.createNode("joint", name="static_jnt")
+    cycleTweaks.initCycleTweakBase(outMesh,
+                                   baseMesh,
+                                   rotMesh,
+                                   transMesh,
+                                   staticJnt)
+    setupParent = pm.createNode("transform", name="setup")
+    ctlParent = pm.createNode("transform", name="controls")
+    ctlParent.rotate.set(0, 30, 0)
+    return baseMesh, rotMesh, transMesh, setupParent, ctlParent
+
+
+def _result(tweakCtls, joints):
+    """World matrices of the controls and joints and skin influences"""
+    matrices = {}
+    for ctl, (rJoint, tJoint) in zip(tweakCtls, joints):
+        for obj in (ctl, rJoint, tJoint):
+            matrices[obj.name()] = cmds.xform(obj.longName(),
+                                              q=True,
+                                              matrix=True,
+                                              worldSpace=True)
+    influences = [sorted(cmds.skinCluster(mesh + "_skinCluster",
+                                          query=True,
+                                          influence=True))
+                  for mesh in ("face_rot", "face_trans")]
+    return matrices, influences
+
+
+def test_cycleTweakBatch():
+    args = _setup()
+    tweakCtls = []
+    joints = []
+    for d in DEFINITIONS:
+        ctl, jnts = cycleTweaks.cycleTweak(
+            d["name"], _face_edges("face_base", d["face"]), d["mirrorAxis"],
+            *args)
+        tweakCtls.append(ctl)
+        joints.append(jnts)
+    matrices, influences = _result(tweakCtls, joints)
+
+    args = _setup()
+    definitions = [{"name": d["name"],
+                    "edgePair": _face_edges("face_base", d["face"]),
+                    "mirrorAxis": d["mirrorAxis"]} for d in DEFINITIONS]
+    tweakCtls, joints, report = cycleTweaks.cycleTweakBatch(definitions,
+                                                            *args)
+    batchMatrices, batchInfluences = _result(tweakCtls, joints)
+
+    assert_equal(batchInfluences, influences)
+    assert_equal(sorted(batchMatrices), sorted(matrices))
+    for name, matrix in matrices.items():
+        for a, b in zip(batchMatrices[name], matrix):
+            assert_almost_equal(a, b, places=4)
+    assert_equal(report["tweaks"], 2)
+    assert_equal(report["nodes"]["joint"], 4)
+    assert_true("total" in report["timings"])
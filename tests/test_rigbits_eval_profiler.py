@@ -0,0 +1,43 @@
+from nose.tools import assert_almost_equal, assert_equal, assert_true
+
+from mgear.rigbits import eval_profiler
+
+
+def test_report_from_costs():
+    costs = {"rivet1": 0.4, "rivet2": 0.2, "pairBlend1": 0.1, "mm1": 0.3}
+    builders = {"rivet1": "createRivetTweak",
+                "rivet2": "createRivetTweak",
+                "pairBlend1": "addBlendedJoint",
+                "mm1": "spaceJump"}
+    node_types = {"rivet1": "loft",
+                  "rivet2": "loft",
+                  "pairBlend1": "pairBlend",
+                  "mm1": "mgear_mulMatrix"}
+    report = eval_profiler.EvalReport.from_costs(costs, builders,
+                                                 node_types, frames=2)
+
+    assert_equal(list(report.builders),
+                 ["createRivetTweak", "spaceJump", "addBlendedJoint"])
+    assert_equal(report.builders["createRivetTweak"].nodes, 2)
+    assert_almost_equal(report.builders["createRivetTweak"].total, 0.6)
+    assert_equal(list(report.node_types)[0], "loft")
+    assert_equal(list(report.nodes)[0], "rivet1")
+    assert_almost_equal(report.total, 1.0)
+    data = report.as_dict()
+    assert_almost_equal(data["builders"]["spaceJump"]["per_frame"], 0.15)
+    assert_true(report.table())
+
+
+def test_dirty_sampler():
+    from maya import cmds
+
+    cmds.file(new=True, force=True)
+    cube, poly = cmds.polyCube()
+    md = cmds.createNode("multiplyDivide")
+    cmds.connectAttr(md + ".outputX", cube + ".tx")
+    cmds.connectAttr(md + ".output", cube + ".rotate")
+
+    costs = eval_profiler.dirty_sampler([md, poly], [1, 2])
+    assert_true(costs[md] > 0.0)
+    # the geometry outputs are not pulled
+    assert_equal(costs[poly], 0.0)
@@ -0,0 +1,143 @@
+import pymel.core as pm
+from maya import cmds
+from nose.tools import assert_almost_equal, assert_equal
+
+from mgear.rigbits.facial_rigger import constraints
+
+
+def _assert_matrix(matrixA, matrixB, places=5):
+    for a, b in zip(matrixA, matrixB):
+        assert_almost_equal(a, b, places=places)
+
+
+def _scene():
+    cmds.file(new=True, force=True)
+    parents = []
+    for i in range(3):
+        parent = pm.createNode("transform", name="parent%i" % i)
+        parent.translate.set(i, 2, 0)
+        parent.rotate.set(0, 30 * i, 10)
+        parents.append(parent)
+    # the children parent inverse matrix is not the identity
+    grp = pm.createNode("transform", name="grp")
+    grp.translate.set(0, 1, 0)
+    grp.rotate.set(0, 0, 45)
+    children = []
+    for i in range(3):
+        child = pm.createNode("transform", name="child%i" % i, parent=grp)
+        child.translate.set(i, 0, 1)
+        child.rotate.set(15, 0, 0)
+        children.append(child)
+    host = pm.createNode("transform", name="host")
+    return parents, children, host
+
+
+def test_getLocalOffsets():
+    parents, children, _ = _scene()
+    parents = [parents[0], parents[1], parents[1]]
+    offsets = constraints.getLocalOffsets(parents, children)
+
+    # MMatrix fallback without numpy
+    np = constraints.np
+    constraints.np = None
+    try:
+        fallback = constraints.getLocalOffsets(parents, children)
+    finally:
+        constraints.np = np
+
+    for offset, offset2, parent, child in zip(offsets,
+                                              fallback,
+                                              parents,
+                                              children):
+        _assert_matrix(list(offset), list(offset2))
+        single = constraints.getLocalOffset(parent.name(), child.name())
+        _assert_matrix(list(offset),
+                       [single(i, j) for i in range(4) for j in range(4)])
+
+
+def test_dagPathCache():
+    cmds.file(new=True, force=True)
+    cache = constraints.DagPathCache()
+    grp = cmds.createNode("transform", name="grp")
+    cmds.createNode("transform", name="ctl")
+    assert_equal(cache.get("ctl").fullPathName(), "|ctl")
+
+    # the path is computed from the cached node
+    cmds.parent("ctl", grp)
+    assert_equal(cache.get("ctl").fullPathName(), "|grp|ctl")
+
+    # renamed node, the name is looked up again
+    cmds.rename("|grp|ctl", "ctl_old")
+    cmds.createNode("transform", name="ctl")
+    assert_equal(cache.get("ctl").fullPathName(), "|ctl")
+    assert_equal(cache.get("ctl_old").fullPathName(), "|grp|ctl_old")
+
+    # deleted node
+    cmds.delete("|ctl")
+    cmds.createNode("transform", name="ctl", parent=grp)
+    assert_equal(cache.get("ctl").fullPathName(), "|grp|ctl")
+
+
+def _build(batch):
+    """Build the constraints and return the created nodes, the children
+    world matrices after moving the parents and the host weights"""
+    parents, children, host = _scene()
+    weights = [0.2, 0.3, 0.5]
+    rest = [cmds.xform(str(c), q=True, matrix=True, worldSpace=True)
+            for c in children]
+    before = set(cmds.ls())
+    if batch:
+        constraints.matrixConstraintBatch(parents[:2],
+                                          children[:2],
+                                          "srt",
+                                          True)
+        constraints.matrixBlendConstraintBatch([parents],
+                                               [children[2]],
+                                               [weights],
+                                               "rt",
+                                               True,
+                                               hosts=[host])
+    else:
+        for parent, child in zip(parents[:2], children[:2]):
+            constraints.matrixConstraint(parent, child, "srt", True)
+        constraints.matrixBlendConstraint(parents,
+                                          children[2],
+                                          weights,
+                                          "rt",
+                                          True,
+                                          host)
+    nodes = sorted(set(cmds.ls()) - before)
+    # the offsets keep the children in place
+    for child, matrix in zip(children, rest):
+        _assert_matrix(cmds.xform(str(child),
+                                  q=True,
+                                  matrix=True,
+                                  worldSpace=True),
+                       matrix)
+
+    for i, parent in enumerate(parents):
+        parent.translate.set(i, 3, 1)
+        parent.rotate.set(20, 10 * i, 0)
+    matrices = [cmds.xform(str(c), q=True, matrix=True, worldSpace=True)
+                for c in children]
+    hostAttrs = []
+    for attr in cmds.listAttr(str(host), userDefined=True):
+        hostAttrs.append((attr,
+                          cmds.attributeQuery(attr, node="host",
+                                              minimum=True),
+                          cmds.attributeQuery(attr, node="host",
+                                              maximum=True),
+                          cmds.getAttr("host." + attr, keyable=True),
+                          round(cmds.getAttr("host." + attr), 5)))
+    return nodes, matrices, hostAttrs
+
+
+def test_matrixConstraintBatch():
+    nodes, matrices, hostAttrs = _build(batch=False)
+    batchNodes, batchMatrices, batchHostAttrs = _build(batch=True)
+
+    assert_equal(batchNodes, nodes)
+    for matrix, batchMatrix in zip(matrices, batchMatrices):
+        _assert_matrix(batchMatrix, matrix)
+    assert_equal(batchHostAttrs, hostAttrs)
+    assert_equal([a[4] for a in hostAttrs], [0.2, 0.3, 0.5])
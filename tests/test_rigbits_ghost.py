@@ -0,0 +1,142 @@
+import pymel.core as pm
+from maya import cmds
+from nose.tools import assert_almost_equal, assert_equal
+
+from mgear.rigbits import ghost, rivet
+
+
+def _controls():
+    cmds.file(new=True, force=True)
+    rig = pm.createNode("transform", name="rig")
+    ctls = []
+    for i in range(2):
+        npo = pm.createNode("transform", name="eye_L%i_npo" % i, p=rig)
+        npo.translate.set(i, 1, 0)
+        npo.rotate.set(0, 20 * i, 0)
+        ctl = pm.circle(name="eye_L%i_ctl" % i, ch=False)[0]
+        pm.parent(ctl, npo, r=True)
+        ctl.translate.set(0.5, 0, 0)
+        pm.addAttr(ctl, longName="blink", keyable=True)
+        ctls.append(ctl)
+    pm.sets(ctls, name="controllers_grp")
+    ghostParent = pm.createNode("transform", name="ghost_org")
+    ghostParent.translate.set(0, 0, 2)
+    return ctls, ghostParent
+
+
+def _world(node):
+    return cmds.xform(str(node), q=True, matrix=True, worldSpace=True)
+
+
+def _assert_matrices(matricesA, matricesB, places=4):
+    assert_equal(sorted(matricesA), sorted(matricesB))
+    for name, matrix in matricesA.items():
+        for a, b in zip(matrix, matricesB[name]):
+            assert_almost_equal(a, b, places=places)
+
+
+def _ghost_summary(newCtls):
+    summary = {}
+    matrices = {}
+    for newCtl in newCtls:
+        name = newCtl.nodeName()
+        ctlGhost = pm.PyNode(name + "_ghost")
+        cnx = cmds.listConnections(str(ctlGhost),
+                                   source=True,
+                                   destination=False,
+                                   plugs=True,
+                                   connections=True) or []
+        summary[name] = {
+            "parent": newCtl.getParent().nodeName(),
+            "grandParent": newCtl.getParent(2).nodeName(),
+            "shapes": [s.nodeName() for s in newCtl.getShapes()],
+            "sets": sorted(s.nodeName() for s in
+                           newCtl.listConnections(type="objectSet")),
+            "ghostSets": ctlGhost.listConnections(type="objectSet"),
+            "connections": sorted((dst.split(".", 1)[1], src)
+                                  for dst, src in zip(cnx[::2], cnx[1::2])
+                                  if src.startswith(name + "."))}
+        matrices[name] = _world(newCtl)
+    return summary, matrices
+
+
+def test_createGhostCtlBatch():
+    ctls, ghostParent = _controls()
+    newCtls = [ghost.createGhostCtl(ctl, ghostParent) for ctl in ctls]
+    summary, matrices = _ghost_summary(newCtls)
+
+    ctls, ghostParent = _controls()
+    newCtls = ghost.createGhostCtlBatch(ctls, ghostParent)
+    batchSummary, batchMatrices = _ghost_summary(newCtls)
+
+    assert_equal(batchSummary, summary)
+    _assert_matrices(batchMatrices, matrices)
+    assert_equal(summary["eye_L0_ctl"]["connections"],
+                 [("blink", "eye_L0_ctl.blink"),
+                  ("rotate", "eye_L0_ctl.rotate"),
+                  ("scale", "eye_L0_ctl.scale"),
+                  ("translate", "eye_L0_ctl.translate")])
+
+
+def _sliders():
+    ctls, ghostParent = _controls()
+    newCtls = [ghost.createGhostCtl(ctl, ghostParent) for ctl in ctls]
+    surface = pm.nurbsPlane(name="face_srf",
+                            axis=(0, 0, 1),
+                            width=10,
+                            constructionHistory=False)[0]
+    surface.rotate.set(10, 0, 0)
+    sliderParent = pm.createNode("transform", name="slider_org")
+    return ctls, newCtls, surface, sliderParent
+
+
+def _slider_matrices(ctls, newCtls):
+    # the ghost controls follow the controls on the surface
+    newCtls[1].translate.set(0.2, 0.3, 0)
+    newCtls[1].rotate.set(0, 0, 15)
+    matrices = {}
+    for ctl, newCtl in zip(ctls, newCtls):
+        matrices[ctl.nodeName()] = _world(ctl)
+        matrices[newCtl.nodeName() + "_slideDriven"] = _world(
+            newCtl.nodeName() + "_slideDriven")
+    return matrices
+
+
+def test_ghostSliderBatch():
+    ctls, newCtls, surface, sliderParent = _sliders()
+    ghost.ghostSlider(ctls, surface, sliderParent)
+    matrices = _slider_matrices(ctls, newCtls)
+
+    # normalConstraint sliders
+    ctls, newCtls, surface, sliderParent = _sliders()
+    ghost.ghostSliderBatch(ctls, surface, sliderParent, shared=False)
+    _assert_matrices(_slider_matrices(ctls, newCtls), matrices)
+    assert_equal(len(cmds.ls(type="normalConstraint")), 2)
+    assert_equal(cmds.ls(type="uvPin"), [])
+
+
+def test_ghostSliderBatch_shared():
+    if not rivet.hasPinSupport():
+        return
+    ctls, newCtls, surface, sliderParent = _sliders()
+    ghost.ghostSlider(ctls, surface, sliderParent)
+    matrices = _slider_matrices(ctls, newCtls)
+
+    ctls, newCtls, surface, sliderParent = _sliders()
+    ghost.ghostSliderBatch(ctls[:1], surface, sliderParent)
+    ghost.ghostSliderBatch(ctls[1:], surface, sliderParent)
+    batchMatrices = _slider_matrices(ctls, newCtls)
+
+    # the sliders share the uvPin of the surface
+    assert_equal(cmds.ls(type="uvPin"), ["face_srf" + ghost.GHOST_PIN_SUFFIX])
+    assert_equal(cmds.getAttr("face_srf_ghostPin.coordinate",
+                              multiIndices=True),
+                 [0, 1])
+    assert_equal(cmds.ls(type="normalConstraint"), [])
+    # the sliders position on the surface is the same, the orientation
+    # comes from the surface tangents instead of the normalConstraint
+    for name, matrix in matrices.items():
+        if not name.endswith("_slideDriven"):
+            continue
+        for a, b in zip(batchMatrices[name][12:15], matrix[12:15]):
+            assert_almost_equal(a, b, places=3)
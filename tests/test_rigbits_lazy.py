@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from nose.tools import assert_equal, assert_in, assert_true
+
+from mgear.rigbits import lazy
+
+
+def test_command():
+    assert_equal(lazy.command("mgear.rigbits", "createCTL", "cube", True),
+                 "from mgear.rigbits import lazy\n"
+                 "lazy.run('mgear.rigbits', 'createCTL', 'cube', True)")
+
+
+def test_lazy_module():
+    sys.modules.pop("colorsys", None)
+    module = lazy.LazyModule("colorsys")
+    assert_true("colorsys" not in sys.modules)
+    assert_equal(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+    assert_in("colorsys", lazy.import_times())
+    assert_in("colorsys", lazy.report())
+
+
+def test_package_without_pymel():
+    code = ("import sys\n"
+            "from mgear import rigbits\n"
+            "from mgear.rigbits import lazy\n"
+            "sys.exit('pymel.core' in sys.modules\n"
+            "         or not callable(rigbits.addNPO))")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    assert_equal(subprocess.call([sys.executable, "-c", code], env=env), 0)
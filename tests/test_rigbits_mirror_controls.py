@@ -0,0 +1,46 @@
+from nose.tools import assert_almost_equal, assert_equal
+
+from mgear.rigbits import mirror_controls
+
+IDENTITY = [1.0, 0.0, 0.0, 0.0,
+            0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0,
+            0.0, 0.0, 0.0, 1.0]
+
+
+def translation(x, y, z):
+    return IDENTITY[:12] + [x, y, z, 1.0]
+
+
+def assert_points_equal(points, expected):
+    assert_equal(len(points), len(expected))
+    for p, e in zip(points, expected):
+        for a, b in zip(p, e):
+            assert_almost_equal(a, b)
+
+
+def test_mirror_shapes_data():
+    shapes = [{"degree": 1,
+               "form": 0,
+               "knots": [0.0, 1.0],
+               "cvs": [(0.0, 0.0, 0.0), (1.0, 2.0, 3.0)]}]
+    # source at x=5, target at the mirror position x=-5
+    mirrored = mirror_controls.mirror_shapes_data(
+        shapes, translation(5, 0, 0), translation(5, 0, 0))
+    assert_equal(mirrored[0]["knots"], [0.0, 1.0])
+    assert_points_equal(mirrored[0]["cvs"],
+                        [(0.0, 0.0, 0.0), (-1.0, 2.0, 3.0)])
+    # source data is not modified
+    assert_equal(shapes[0]["cvs"][1], (1.0, 2.0, 3.0))
+
+
+def test_mirror_shapes_data_target_space():
+    shapes = [{"degree": 1,
+               "form": 0,
+               "knots": [0.0, 1.0],
+               "cvs": [(1.0, 0.0, 0.0)]}]
+    # target scaled -1 in X, so the local space is already mirrored
+    target_inverse = [-1.0] + IDENTITY[1:]
+    mirrored = mirror_controls.mirror_shapes_data(
+        shapes, IDENTITY, target_inverse)
+    assert_points_equal(mirrored[0]["cvs"], [(1.0, 0.0, 0.0)])
@@ -0,0 +1,68 @@
+from maya import cmds
+from nose.tools import (
+    assert_equal,
+    assert_false,
+    assert_greater_equal,
+    assert_is,
+    assert_true,
+)
+
+from mgear.rigbits import profiler
+
+
+@profiler.profiled("builder")
+def builder():
+    with profiler.stage("nodes"):
+        cmds.createNode("transform")
+        cmds.createNode("transform")
+
+
+@profiler.profiled("outer")
+def outer():
+    cmds.createNode("transform", name="outer_node")
+    with profiler.stage("inner_stage"):
+        builder()
+
+
+def test_disabled_is_noop():
+    assert_false(profiler.is_enabled())
+    assert_is(profiler.stage("a"), profiler.stage("b"))
+    builder()
+    assert_is(profiler.active_report(), None)
+
+
+def test_session_report():
+    cmds.file(new=True, force=True)
+    with profiler.session("test") as report:
+        assert_true(profiler.is_enabled())
+        builder()
+        builder()
+
+    assert_false(profiler.is_enabled())
+    assert_equal(list(report.stages), ["builder", "builder/nodes"])
+    assert_equal(report.stages["builder/nodes"].calls, 2)
+    assert_equal(report.commands["createNode"], 4)
+    assert_greater_equal(report.nodes["transform"], 4)
+    assert_true(report.table())
+    assert_equal(report.as_dict()["stages"]["builder"]["calls"], 2)
+
+
+def test_session_tag():
+    cmds.file(new=True, force=True)
+    with profiler.session("test", tag=True):
+        builder()
+    nodes = cmds.ls("*." + profiler.PROVENANCE_ATTR, objectsOnly=True)
+    assert_equal(len(nodes), 2)
+    assert_equal(cmds.getAttr(nodes[0] + "." + profiler.PROVENANCE_ATTR),
+                 "builder")
+
+
+def test_session_tag_nested():
+    cmds.file(new=True, force=True)
+    with profiler.session("test", tag=True):
+        outer()
+    nodes = cmds.ls("*." + profiler.PROVENANCE_ATTR, objectsOnly=True)
+    tags = dict((n, cmds.getAttr(n + "." + profiler.PROVENANCE_ATTR))
+                for n in nodes)
+    assert_equal(tags.pop("outer_node"), "outer")
+    assert_equal(sorted(tags.values()), ["builder", "builder"])
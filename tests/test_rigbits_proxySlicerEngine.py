@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal, assert_is_none, assert_not_equal
+
+from mgear.rigbits import proxySlicerEngine
+
+# 2 quads sharing an edge, 6 vertices and 2 influences
+COUNTS = [4, 4]
+CONNECTS = [0, 1, 4, 3, 1, 2, 5, 4]
+POINTS = [(0, 0, 0), (1, 0, 0), (2, 0, 0), (0, 1, 0), (1, 1, 0), (2, 1, 0)]
+WEIGHTS = [1.0, 0.0,
+           0.5, 0.5,
+           0.0, 1.0,
+           1.0, 0.0,
+           0.5, 0.5,
+           0.0, 1.0]
+UVS = ([0.0, 0.5, 1.0, 0.0, 0.5, 1.0],
+       [0.0, 0.0, 0.0, 1.0, 1.0, 1.0],
+       [4, 4],
+       [0, 1, 4, 3, 1, 2, 5, 4])
+
+
+def _data(points=POINTS, weights=WEIGHTS):
+    return {"influences": ["jnt_a", "jnt_b"],
+            "nInfluences": 2,
+            "weights": weights,
+            "points": points,
+            "counts": COUNTS,
+            "connects": CONNECTS,
+            "uvs": UVS}
+
+
+def _pieces(data, workers=None, cached=None):
+    influences = proxySlicerEngine.faceInfluences(data["weights"],
+                                                  2,
+                                                  COUNTS,
+                                                  CONNECTS)
+    return proxySlicerEngine.computePieces(
+        data,
+        proxySlicerEngine.faceGroups(influences, 2),
+        workers,
+        cached)
+
+
+def test_faceInfluences():
+    influences = proxySlicerEngine.faceInfluences(WEIGHTS,
+                                                  2,
+                                                  COUNTS,
+                                                  CONNECTS)
+    assert_equal(influences, [0, 1])
+    assert_equal(proxySlicerEngine.faceGroups(influences, 3),
+                 [[0], [1], []])
+
+
+def test_subMesh():
+    data = proxySlicerEngine.subMesh(POINTS, COUNTS, CONNECTS, [1], UVS)
+    assert_equal(data["counts"], [4])
+    assert_equal(data["connects"], [0, 1, 2, 3])
+    assert_equal(data["points"],
+                 [(1, 0, 0), (2, 0, 0), (2, 1, 0), (1, 1, 0)])
+    assert_equal(data["vertices"], [1, 2, 5, 4])
+    assert_equal(data["uvs"],
+                 ([0.5, 1.0, 1.0, 0.5], [0.0, 0.0, 1.0, 1.0],
+                  [4], [0, 1, 2, 3]))
+
+
+def test_computePieces_workers():
+    pieces = _pieces(_data())
+    assert_equal([name for name, mesh in pieces], ["jnt_a", "jnt_b"])
+    assert_equal(_pieces(_data(), workers=2), pieces)
+
+
+def test_pieces_cache():
+    data = _data()
+    pieces = _pieces(data)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        file_path = os.path.join(tmp_dir, "proxy.json")
+        signature = proxySlicerEngine.meshSignature(data)
+        proxySlicerEngine.exportCache(file_path, signature, pieces)
+        cached = proxySlicerEngine.importCache(file_path, signature)
+        assert_equal([name for name, mesh in cached], ["jnt_a", "jnt_b"])
+        assert_equal(cached[1][1]["connects"], [0, 1, 2, 3])
+        assert_is_none(proxySlicerEngine.importCache(file_path, "other"))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_meshSignature():
+    signature = proxySlicerEngine.meshSignature(_data())
+    # the points and weights are not part of the signature
+    points = [(x, y, 1.0) for x, y, z in POINTS]
+    assert_equal(proxySlicerEngine.meshSignature(_data(points, WEIGHTS[::-1])),
+                 signature)
+    data = _data()
+    data["influences"] = ["jnt_a", "jnt_c"]
+    assert_not_equal(proxySlicerEngine.meshSignature(data), signature)
+    data = _data()
+    data["connects"] = CONNECTS[::-1]
+    assert_not_equal(proxySlicerEngine.meshSignature(data), signature)
+
+
+def test_computePieces_cached():
+    cached = [(name, dict(mesh, connects=[]))
+              for name, mesh in _pieces(_data())]
+
+    # same faces, the cached topology is kept and the points are updated
+    points = [(x, y, 1.0) for x, y, z in POINTS]
+    pieces = _pieces(_data(points), cached=cached)
+    assert_equal(pieces[0][1]["connects"], [])
+    assert_equal(pieces[0][1]["points"],
+                 [(0, 0, 1.0), (1, 0, 1.0), (1, 1, 1.0), (0, 1, 1.0)])
+    assert_equal(pieces[0][1]["uvs"], _pieces(_data())[0][1]["uvs"])
+
+    # the faces of the pieces changed, the pieces are computed again
+    weights = [1.0, 0.0] * 6
+    pieces = _pieces(_data(points, weights), cached=cached)
+    assert_equal([name for name, mesh in pieces], ["jnt_a"])
+    assert_equal(pieces[0][1]["counts"], [4, 4])
+    assert_equal(pieces[0][1]["connects"], [0, 1, 2, 3, 1, 4, 5, 2])
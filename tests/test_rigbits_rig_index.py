@@ -0,0 +1,44 @@
+from nose.tools import assert_equal
+
+from mgear.rigbits import rig_index
+
+NAMES = ["arm_L0_fk0_ctl",
+         "arm_R0_fk0_ctl",
+         "|rig|spine_C0_ik_ctl",
+         "arm_L0_controlBuffer"]
+
+
+def test_filter_names_glob():
+    assert_equal(rig_index.filter_names(NAMES, exclude="*_R*"),
+                 ["arm_L0_fk0_ctl",
+                  "|rig|spine_C0_ik_ctl",
+                  "arm_L0_controlBuffer"])
+    assert_equal(rig_index.filter_names(NAMES,
+                                        include="arm_*",
+                                        exclude=["*controlBuffer*"]),
+                 ["arm_L0_fk0_ctl", "arm_R0_fk0_ctl"])
+
+
+def test_filter_names_regex():
+    assert_equal(rig_index.filter_names(NAMES, include=r"re:_[LR]0_fk"),
+                 ["arm_L0_fk0_ctl", "arm_R0_fk0_ctl"])
+    # the short name is matched
+    assert_equal(rig_index.filter_names(NAMES, include=r"re:^spine"),
+                 ["|rig|spine_C0_ik_ctl"])
+
+
+def test_filter_names_no_patterns():
+    assert_equal(rig_index.filter_names(NAMES), NAMES)
+
+
+def test_substring_pattern():
+    pattern = rig_index.substring_pattern("_R")
+    assert_equal(rig_index.filter_names(NAMES, exclude=pattern),
+                 ["arm_L0_fk0_ctl",
+                  "|rig|spine_C0_ik_ctl",
+                  "arm_L0_controlBuffer"])
+    # special characters are matched literally
+    assert_equal(rig_index.filter_names(["a.b_ctl", "axb_ctl"],
+                                        include=rig_index.substring_pattern(
+                                            ".b")),
+                 ["a.b_ctl"])
@@ -0,0 +1,210 @@
+from maya import cmds
+from nose.tools import assert_equal, assert_almost_equal
+
+from mgear.rigbits.sdk_manager import core as sdk_m
+
+
+def _driver_setup():
+    cmds.file(new=True, force=True)
+    driver = cmds.createNode("transform", name="jaw_C0_ctl")
+    cmds.addAttr(driver, longName="open", keyable=True)
+    cmds.addAttr(driver, longName="side", keyable=True)
+    driven = [cmds.createNode("transform", name="lip_{}_sdk".format(i))
+              for i in range(2)]
+    for value in (0.0, 1.0):
+        cmds.setAttr(driver + ".open", value)
+        for ctl in driven:
+            cmds.setAttr(ctl + ".ty", -value)
+            cmds.setDrivenKeyframe(ctl + ".ty",
+                                   currentDriver=driver + ".open")
+    cmds.setAttr(driver + ".open", 0)
+    return driver, driven
+
+
+def test_driver_summary():
+    driver, driven = _driver_setup()
+    summary = sdk_m.DriverSummary(driver)
+    assert_equal(summary.attrs(), ["open"])
+    assert_equal(summary.driven("open"), driven)
+    assert_equal(summary.driven("side"), [])
+    assert_equal(summary.keys("open"), [0.0, 1.0])
+    assert_equal(summary.driven("open"),
+                 sdk_m.get_driven_from_attr(driver + ".open"))
+
+
+def test_driver_summary_watch():
+    driver, driven = _driver_setup()
+    summary = sdk_m.DriverSummary(driver)
+    summary.watch()
+    try:
+        assert_equal(summary.attrs(), ["open"])
+        cmds.setDrivenKeyframe(driven[0] + ".tx",
+                               currentDriver=driver + ".side")
+        assert_equal(summary.attrs(), ["open", "side"])
+    finally:
+        summary.unwatch()
+
+
+class FakeKeyBackend(object):
+    """Stand-in scene: plug values and curves keys as dictionaries"""
+
+    def __init__(self, values, driver_value=0.0):
+        self.values = dict(values)
+        self.driver_value = driver_value
+        self.curves = {}
+        self.calls = []
+
+    def get_values(self, plugs):
+        self.calls.append("get_values")
+        return [self.values[p] for p in plugs]
+
+    def set_values(self, plugs, values):
+        self.calls.append("set_values")
+        self.values.update(zip(plugs, values))
+
+    def set_driven_keys(self, driverPlug, plugs, driverVal=None,
+                        drivenVal=None, inTanType="linear",
+                        outTanType="linear"):
+        self.calls.append("set_driven_keys")
+        if driverVal is None:
+            driverVal = self.driver_value
+        for plug in plugs:
+            curve = self.curves.setdefault("curve_" + plug, (plug, {}))
+            value = self.values[plug] if drivenVal is None else drivenVal
+            curve[1][driverVal] = value
+            # keying a driven value changes the plug value
+            self.values[plug] = value
+
+    def driver_curves(self, driverPlug):
+        return set(self.curves)
+
+    def curve_destinations(self, curves):
+        return dict((c, self.curves[c][0]) for c in curves)
+
+    def rename(self, node, name):
+        return name
+
+
+def test_key_driven_batch():
+    plugs = ["lip_sdk.translate" + a for a in "XYZ"]
+    plugs += ["lip_sdk.scale" + a for a in "XYZ"]
+    values = dict((p, 2.0) for p in plugs)
+    backend = FakeKeyBackend(values, driver_value=1.0)
+    curves = sdk_m.key_driven_batch(["lip_sdk"],
+                                    ["translate", "scale"],
+                                    "jaw_C0_ctl",
+                                    "open",
+                                    zeroKey=True,
+                                    backend=backend)
+    assert_equal(curves, ["jaw_C0_ctl_" + c + a
+                          for c in ("scale", "translate") for a in "XYZ"])
+    # one read, one key call per zero value, one restore, one current key
+    assert_equal(backend.calls, ["get_values",
+                                 "set_driven_keys",
+                                 "set_driven_keys",
+                                 "set_values",
+                                 "set_driven_keys"])
+    assert_equal(backend.values, values)
+    assert_equal(backend.curves["curve_lip_sdk.translateX"][1],
+                 {0: 0.0, 1.0: 2.0})
+    assert_equal(backend.curves["curve_lip_sdk.scaleX"][1],
+                 {0: 1.0, 1.0: 2.0})
+
+
+def test_key_driven_batch_blend():
+    driver, driven = _driver_setup()
+    # the ty is already driven by the open attr, the new curve is connected
+    # to a blendWeighted node
+    cmds.setAttr(driver + ".side", 1)
+    curves = sdk_m.key_driven_batch(driven[:1], ["translate"], driver, "side")
+    assert_equal(len(cmds.listConnections(driven[0] + ".ty",
+                                          type="blendWeighted")), 1)
+    assert_equal(curves, ["jaw_C0_ctl_translate" + a for a in "XYZ"])
+
+
+def test_scan_DK_nodes():
+    driver, driven = _driver_setup()
+    orphan = cmds.createNode("animCurveUL", name="orphan_curve")
+    profile = cmds.createNode("animCurveUU", name="arm_profile")
+    blend = cmds.createNode("blendWeighted", name="orphan_blend")
+    cmds.connectAttr(orphan + ".output", blend + ".input[0]")
+
+    report = sdk_m.scan_DK_nodes()
+    assert_equal(report["curves"], [orphan])
+    assert_equal(report["blendWeighted"], [blend])
+    assert_equal(sdk_m.scan_DK_nodes(white_list=[orphan])["curves"], [])
+
+    deleted = sdk_m.prune_DK_nodes(utility_nodes=True)
+    assert_equal(sorted(deleted), sorted([orphan, blend]))
+    assert_equal(cmds.ls(profile), [profile])
+    assert_equal(sdk_m.DriverSummary(driver).driven("open"), driven)
+
+
+def _limits_data():
+    return {"lip_sdk": {"value": {"x": 0.5, "y": -0.25},
+                        "limits": {"x": [-1.0, 1.0], "y": [-1.0, 1.0]},
+                        "enabled": {"x": [False, True], "y": [False, False]}}}
+
+
+def test_toggled_limits():
+    data = sdk_m.toggled_limits(_limits_data(), "x")
+    assert_equal(data["lip_sdk"]["enabled"],
+                 {"x": [True, False], "y": [False, False]})
+
+
+def test_limits_from_current():
+    data = sdk_m.limits_from_current(_limits_data(), "xy", upper=True)
+    assert_equal(data["lip_sdk"]["limits"],
+                 {"x": [-1.0, 0.5], "y": [-1.0, -0.25]})
+    assert_equal(data["lip_sdk"]["enabled"],
+                 {"x": [False, True], "y": [False, True]})
+
+
+def test_limits_preset():
+    cmds.file(new=True, force=True)
+    ctl = cmds.createNode("transform", name="lip_sdk")
+    cmds.setAttr(ctl + ".translateY", 0.5)
+    sdk_m.set_limits_from_current("y", [ctl], upperLimit=True)
+    preset = sdk_m.export_limits_preset([ctl])
+    assert_almost_equal(preset[ctl]["limits"]["y"][1], 0.5)
+
+    cmds.file(new=True, force=True)
+    ctl = cmds.createNode("transform", name="lip_sdk")
+    assert_equal(sdk_m.import_limits_preset(preset), [ctl])
+    assert_equal(cmds.transformLimits(ctl, q=True, ety=True), [False, True])
+
+
+def test_apply_limits_undo():
+    cmds.file(new=True, force=True)
+    cmds.undoInfo(state=True)
+    ctl = cmds.createNode("transform", name="lip_sdk")
+    sdk_m.apply_limits(_limits_data())
+    assert_equal(cmds.transformLimits(ctl, q=True, etx=True), [False, True])
+    assert_equal(cmds.transformLimits(ctl, q=True, tx=True), [-1.0, 1.0])
+
+    # the limits of all the axes are undone at once
+    cmds.undo()
+    assert_equal(cmds.transformLimits(ctl, q=True, etx=True), [False, False])
+    assert_equal(cmds.transformLimits(ctl, q=True, tx=True), [-1.0, 1.0])
+    assert_equal(cmds.ls(ctl), [ctl])
+
+
+def test_transfer_SDKs_existing():
+    driver, driven = _driver_setup()
+    data = sdk_m.collect_SDK_data(driven)
+    curves = sorted(cmds.ls(type="animCurveUL"))
+
+    # the SDKs are already in the target, the keys are replaced
+    sdk_m.transfer_SDKs(data)
+    assert_equal(sorted(cmds.ls(type="animCurveUL")), curves)
+    assert_equal(cmds.ls(type="blendWeighted"), [])
+    sdk_m.transfer_SDKs(data, existing="add")
+    assert_equal(len(cmds.ls(type="blendWeighted")), 2)
+
+    # the new curves are named after the driver
+    target = cmds.createNode("transform", name="lip_new_sdk")
+    sdk_m.transfer_SDKs(dict((k, v) for k, v in data.items()
+                             if v["drivenNode"] == driven[0]),
+                        remap={driven[0]: target})
+    curve = cmds.listConnections(target + ".ty", source=True)[0]
+    assert_equal(curve, "jaw_C0_ctl_translateY")
@@ -0,0 +1,53 @@
+from nose.tools import assert_equal, assert_false, assert_true
+
+from mgear.rigbits.sdk_manager import transfer_plan
+
+
+def _sdk(driver, driverAttr, driven, drivenAttr):
+    return {"driverNode": driver,
+            "driverAttr": driverAttr,
+            "drivenNode": driven,
+            "drivenAttr": drivenAttr,
+            "type": "animCurveUL",
+            "keys": [[0.0, 0.0, "linear", "linear"],
+                     [1.0, 2.0, "linear", "linear"]],
+            "preInfinity": 0,
+            "postInfinity": 0,
+            "weightedTangents": False}
+
+
+SDK_DATA = {
+    "jaw_ty": _sdk("charA:jaw_C0_ctl", "open", "charA:lip_sdk", "translateY"),
+    "jaw_tz": _sdk("charA:jaw_C0_ctl", "open", "charA:lip_sdk", "translateZ"),
+    "jaw_side": _sdk("charA:jaw_C0_ctl", "side", "charA:lip_sdk",
+                     "translateY"),
+    "brow_ty": _sdk("charA:brow_C0_ctl", "up", "charA:brow_sdk",
+                    "translateY")}
+
+TARGET = ["charB:jaw_C0_ctl", "charB:lip_sdk", "charB:browNew_sdk"]
+
+
+def test_plan_replace():
+    plan = transfer_plan.planTransfer(SDK_DATA,
+                                      TARGET,
+                                      replace=[("charA:", "charB:")])
+    assert_equal([s["source"] for s in plan.steps],
+                 ["jaw_side", "jaw_ty", "jaw_tz"])
+    assert_equal(plan.steps[1]["driverNode"], "charB:jaw_C0_ctl")
+    assert_equal(plan.steps[1]["name"], "charB:jaw_C0_ctl_translateY")
+    assert_equal(plan.unmatchedDrivers, ["charA:brow_C0_ctl"])
+    assert_equal(plan.unmatchedDriven, ["charA:brow_sdk"])
+    assert_equal(plan.skipped, ["brow_ty"])
+    assert_equal(plan.blended, ["charB:lip_sdk.translateY"])
+    assert_false(plan.valid)
+
+
+def test_plan_remap():
+    plan = transfer_plan.planTransfer(
+        SDK_DATA,
+        TARGET + ["charB:brow_C0_ctl"],
+        remap={"charA:brow_sdk": "charB:browNew_sdk"},
+        replace=[("charA:", "charB:")])
+    assert_true(plan.valid)
+    assert_equal(plan.driven["charA:brow_sdk"], "charB:browNew_sdk")
+    assert_equal(len(plan.steps), 4)
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from nose.tools import assert_equal, assert_false, assert_true
+
+from mgear.rigbits import spring_cache
+
+
+def _rotation_xyz(x, y, z):
+    """Maya row matrix of the xyz rotation in degrees"""
+    x, y, z = np.radians([x, y, z])
+    rx = np.array([[1, 0, 0],
+                   [0, np.cos(x), np.sin(x)],
+                   [0, -np.sin(x), np.cos(x)]])
+    ry = np.array([[np.cos(y), 0, -np.sin(y)],
+                   [0, 1, 0],
+                   [np.sin(y), 0, np.cos(y)]])
+    rz = np.array([[np.cos(z), np.sin(z), 0],
+                   [-np.sin(z), np.cos(z), 0],
+                   [0, 0, 1]])
+    return rx.dot(ry).dot(rz)
+
+
+def _chain(frames, links=2):
+    """Straight chain along X"""
+    sample = spring_cache.SpringSample(
+        ["link%i" % i for i in range(links)], [-1] + list(range(links - 1)))
+    sample.lvl[:, 3, 0] = 1.0
+    sample.root_parent = np.tile(np.identity(4), (frames, 1, 1, 1))
+    sample.local = np.tile(np.identity(4), (frames, links, 1, 1))
+    sample.local[:, :, 3, 0] = 1.0
+    return sample
+
+
+def test_euler_xyz():
+    rotations = [(10, 20, 30), (-45, 5, 90), (0, -60, 0)]
+    matrices = np.array([_rotation_xyz(*r) for r in rotations])
+    assert_true(np.allclose(spring_cache.euler_xyz(matrices), rotations))
+
+
+def test_simulate_static():
+    sample = _chain(10)
+    rotations = spring_cache.simulate(sample)
+    assert_equal(rotations.shape, (10, 2, 3))
+    assert_true(np.allclose(rotations, 0.0, atol=1e-4))
+
+
+def test_simulate_follow():
+    sample = _chain(40)
+    # the root moves up in Y
+    sample.root_parent[10:, 0, 3, 1] = 1.0
+    rotations = spring_cache.simulate(sample)
+    # the spring lags behind the goal, then settles
+    assert_true(np.allclose(rotations[:10], 0.0, atol=1e-4))
+    assert_true(rotations[10, 0, 2] < -10.0)
+    assert_true(np.allclose(rotations[-1], 0.0, atol=1.0))
+
+    sample.intensity[:] = 0.0
+    assert_true(np.allclose(spring_cache.simulate(sample), 0.0, atol=1e-4))
+
+
+def test_cache_file():
+    tmp = tempfile.mkdtemp()
+    try:
+        rotations = spring_cache.simulate(_chain(5))
+        path = os.path.join(tmp, "springs")
+        spring_cache.write_cache(path, rotations, ["link0", "link1"], 10)
+
+        cache = spring_cache.SpringCache(path + ".npy")
+        assert_equal(len(cache), 5)
+        assert_equal(cache.end, 14)
+        assert_true(np.allclose(cache.frame(12), rotations[2]))
+        assert_true(np.allclose(cache.frame(100), rotations[-1]))
+        assert_true(np.allclose(cache.rotation("link1", 10),
+                                rotations[0, 1]))
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_apply_cache():
+    from maya import cmds
+
+    cmds.file(new=True, force=True)
+    cns = cmds.createNode("transform", name="link0_spr_cns")
+    obj = cmds.createNode("transform", name="link0", parent=cns)
+    pairBlend = cmds.createNode("pairBlend")
+    for axis in "XYZ":
+        cmds.connectAttr("{}.outRotate{}".format(pairBlend, axis),
+                         "{}.rotate{}".format(cns, axis))
+    cmds.setKeyframe(cns, attribute="rotate")
+    rest = cmds.listConnections(pairBlend + ".inRotateX1")
+
+    tmp = tempfile.mkdtemp()
+    try:
+        rotations = np.zeros((5, 1, 3))
+        rotations[:, 0, 0] = np.arange(5) * 10.0
+        cache = spring_cache.write_cache(os.path.join(tmp, "springs"),
+                                         rotations,
+                                         cmds.ls(obj, long=True),
+                                         1)
+        spring_cache.apply_cache(cache)
+        curve = cmds.listConnections(pairBlend + ".inRotateX1")[0]
+        assert_equal(cmds.keyframe(curve, query=True, valueChange=True),
+                     [0.0, 10.0, 20.0, 30.0, 40.0])
+        cmds.undo()
+        assert_equal(cmds.listConnections(pairBlend + ".inRotateX1"), rest)
+
+        spring_cache.apply_cache(cache)
+        spring_cache.remove_cache()
+        assert_equal(cmds.listConnections(pairBlend + ".inRotateX1"), rest)
+        assert_false(cmds.objExists(curve))
+    finally:
+        shutil.rmtree(tmp)
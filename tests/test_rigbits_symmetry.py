@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+
+from maya import cmds
+from nose.tools import assert_equal, assert_is_none, assert_is_not
+
+from mgear.rigbits import symmetry
+
+POINTS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (1, 1, 0), (-1.0004, 1, 0),
+          (2, 0, 0)]
+
+
+def test_vertexSymmetry():
+    assert_equal(symmetry.vertexSymmetry(POINTS), [1, 0, 2, 4, 3, -1])
+
+
+def test_edgeSymmetry():
+    vtx_mirror = symmetry.vertexSymmetry(POINTS)
+    edges = [(0, 3), (1, 4), (2, 0), (2, 1), (5, 0)]
+    assert_equal(symmetry.edgeSymmetry(edges, vtx_mirror),
+                 [1, 0, 3, 2, -1])
+
+
+def test_symmetry_map_serialization():
+    sym_map = symmetry.SymmetryMap()
+    sym_map.setNodeMap({"arm_L0_ctl": "arm_R0_ctl"})
+    sym_map.meshes["body"] = {"signature": [6, 5, 0],
+                              "vertices": [1, 0, 2, 4, 3, -1],
+                              "edges": [1, 0, 3, 2, -1]}
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        file_path = os.path.join(tmp_dir, "asset.sym")
+        sym_map.save(file_path)
+        loaded = symmetry.SymmetryMap.load(file_path)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    assert_equal(loaded.nodes["arm_R0_ctl"], "arm_L0_ctl")
+    assert_equal(loaded.nodes["arm_L0_ctl"], "arm_R0_ctl")
+    assert_equal(loaded.meshes["body"]["edges"], [1, 0, 3, 2, -1])
+
+
+def test_symmetry_map_stale_nodes():
+    cmds.file(new=True, force=True)
+    cmds.createNode("transform", name="arm_L0_ctl")
+    cmds.createNode("transform", name="arm_R0_ctl")
+    sym_map = symmetry.getSymmetryMap()
+    assert_equal(sym_map.mirrorNode("arm_L0_ctl"), "arm_R0_ctl")
+
+    cmds.rename("arm_R0_ctl", "arm_R1_ctl")
+    assert_is_none(sym_map.mirrorNode("arm_L0_ctl"))
+
+    cmds.file(new=True, force=True)
+    assert_is_not(symmetry.getSymmetryMap(), sym_map)
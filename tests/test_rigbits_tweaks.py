@@ -0,0 +1,37 @@
+import pymel.core as pm
+from maya import cmds
+from nose.tools import assert_almost_equal, assert_equal
+
+from mgear.rigbits import rivet, tweaks
+
+
+def _face_edges(mesh, face):
+    info = cmds.polyInfo("{}.f[{}]".format(mesh, face), faceToEdge=True)
+    edges = [int(e) for e in info[0].split(":")[1].split()]
+    # opposite edges of the quad
+    return [edges[0], edges[2]]
+
+
+def test_createRivetTweak_pin():
+    cmds.file(new=True, force=True)
+    if not rivet.hasPinSupport():
+        return
+    mesh = pm.polyPlane(name="face", sx=4, sy=4)[0]
+    target = pm.duplicate(mesh, name="face_target")[0]
+    pm.blendShape(target, mesh)
+    # the rivet position only comes from the offsetParentMatrix
+    target.translate.set(3, 2, 1)
+
+    edgePair = _face_edges("face_target", 5)
+    tweaks.createRivetTweak(mesh,
+                            edgePair,
+                            "pin",
+                            gearMulMatrix=False,
+                            rivetMode=rivet.PIN)
+
+    base = pm.PyNode("pin_tweak_L")
+    npo = pm.PyNode("pin_tweak_L_npo")
+    assert_equal(base.translate.get(), pm.datatypes.Vector())
+    for a, b in zip(pm.xform(npo, q=True, worldSpace=True, translation=True),
+                    rivet.getWorldPosition(base)):
+        assert_almost_equal(a, b, places=4)